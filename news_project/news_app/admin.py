@@ -1,18 +1,74 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
-from django.contrib.auth.models import Group
 from .models import CustomUser, Publisher, Article
+from . import approval, search
+from .pagination import EstimatedCountPaginator
+
+
+# Sources offered by the publisher/journalist changelist filters.
+FILTER_CHOICES = 20
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables that grow without bound.
+
+    The unfiltered total comes from the table statistics and filtered
+    changelists skip the second, unfiltered ``COUNT(*)``.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class TopSourceFilter(admin.SimpleListFilter):
+    """
+    Related-field filter listing only the busiest sources.
+
+    ``RelatedFieldListFilter`` loads every publisher or journalist to build
+    the sidebar; this offers the ``FILTER_CHOICES`` with the most articles
+    (from the denormalized ``article_count``) plus the current selection.
+    Any other source can still be reached from its own change page or by
+    editing the URL, which uses the same parameter as the default filter.
+
+    Subclasses set ``source_queryset`` to the sources that can be chosen.
+    """
+    source_queryset = None
+
+    def lookups(self, request, model_admin):
+        sources = self.source_queryset.all()
+        choices = list(sources.order_by('-article_count', 'pk')[:FILTER_CHOICES])
+        selected = self.value()
+        if selected and selected.isdigit() and all(str(source.pk) != selected for source in choices):
+            choices += list(sources.filter(pk=selected))
+        return [(str(source.pk), str(source)) for source in choices]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class PublisherFilter(TopSourceFilter):
+    title = 'publisher'
+    parameter_name = 'publisher__id__exact'
+    source_queryset = Publisher.objects.only('name')
+
+
+class JournalistFilter(TopSourceFilter):
+    title = 'journalist'
+    parameter_name = 'journalist__id__exact'
+    source_queryset = CustomUser.objects.filter(role='journalist').only('username')
 
 
 # Custom User Admin
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ScalableAdmin, UserAdmin):
     model = CustomUser
-    list_display = ('username', 'email', 'role', 'is_staff', 'is_active')
+    list_display = ('username', 'email', 'role', 'follower_count', 'article_count', 'is_staff', 'is_active')
     list_filter = ('role', 'is_staff', 'is_active')
     fieldsets = (
         (None, {'fields': ('username', 'email', 'password', 'role')}),
         ('Permissions', {'fields': ('is_staff', 'is_active', 'groups', 'user_permissions')}),
-        ('Subscriptions', {'fields': ('subscribed_publishers', 'subscribed_journalists')}),
+        ('Subscriptions', {'fields': ('subscribed_publishers', 'subscribed_journalists', 'notification_frequency')}),
         ('Journalist Info', {'fields': ('bio', 'published_articles')}),
     )
     add_fieldsets = (
@@ -23,29 +79,67 @@ class CustomUserAdmin(UserAdmin):
     )
     search_fields = ('username', 'email')
     ordering = ('username',)
+    # Search-as-you-type instead of <select>s holding every row.
+    autocomplete_fields = ('groups', 'subscribed_publishers', 'subscribed_journalists', 'published_articles')
 
 admin.site.register(CustomUser, CustomUserAdmin)
 
 
 # Publisher Admin
-class PublisherAdmin(admin.ModelAdmin):
-    list_display = ('name', 'description')
+class PublisherAdmin(ScalableAdmin):
+    list_display = ('name', 'description', 'subscriber_count', 'article_count')
     search_fields = ('name',)
+    ordering = ('name',)
 
 admin.site.register(Publisher, PublisherAdmin)
 
 
 # Article Admin
-class ArticleAdmin(admin.ModelAdmin):
-    list_display = ('title', 'publisher', 'journalist', 'is_approved', 'created_at')
-    list_filter = ('is_approved', 'publisher', 'journalist')
+class ArticleAdmin(ScalableAdmin):
+    list_display = ('title', 'publisher', 'journalist', 'word_count', 'is_approved', 'is_rejected', 'created_at')
+    list_filter = ('is_approved', 'is_rejected', PublisherFilter, JournalistFilter)
+    list_select_related = ('publisher', 'journalist')
     search_fields = ('title', 'content')
-    actions = ['approve_articles']
+    autocomplete_fields = ('publisher', 'journalist')
+    ordering = ('-created_at', '-id')
+    actions = ['approve_articles', 'reject_articles']
+
+    def get_queryset(self, request):
+        # Only the change form shows the body; it loads the article by pk.
+        queryset = super().get_queryset(request)
+        url_name = request.resolver_match and request.resolver_match.url_name
+        if url_name and (url_name.endswith('_changelist') or url_name == 'autocomplete'):
+            queryset = queryset.defer('content')
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE '%term%' scans over content.
+        if not search_term:
+            return queryset, False
+        limit = search.ADMIN_MATCH_LIMIT
+        # One extra ID tells whether the ranked matches were cut off.
+        ids = search.ranked_ids(search_term, limit + 1, approved_only=False)
+        if len(ids) > limit:
+            ids = ids[:limit]
+            url_name = request.resolver_match and request.resolver_match.url_name
+            if url_name and url_name.endswith('_changelist'):
+                self.message_user(
+                    request,
+                    f"Only the {limit} best matches are listed; refine the search to see the others.",
+                    messages.WARNING,
+                )
+        return queryset.filter(id__in=ids), False
 
     # Custom action to approve selected articles
     def approve_articles(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        # One UPDATE plus set-based fan-out and notification queueing.
+        updated = approval.approve(queryset)
         self.message_user(request, f"{updated} article(s) successfully approved.")
     approve_articles.short_description = "Approve selected articles"
 
+    def reject_articles(self, request, queryset):
+        rejected = approval.reject(queryset)
+        self.message_user(request, f"{rejected} article(s) rejected.")
+    reject_articles.short_description = "Reject selected articles"
+
 admin.site.register(Article, ArticleAdmin)
@@ -0,0 +1,175 @@
+"""
+Read-only REST API for approved articles, publishers and journalists.
+
+List endpoints use cursor pagination and the lightweight
+``ArticleListSerializer`` (no ``content``, publisher and journalist joined
+in the same query); only the article detail endpoint returns the body.
+Listings answer ``If-None-Match``/``If-Modified-Since`` with 304 using the
+stamps in ``conditional.py``.
+"""
+
+from django.utils.decorators import method_decorator
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from . import conditional, readership, search, subscriptions
+from .models import Article, CustomUser, Publisher
+from .serializers import (
+    ArticleListSerializer, ArticleSerializer, JournalistSerializer, PublisherSerializer,
+)
+
+
+class ArticleCursorPagination(CursorPagination):
+    """Newest-first cursor pagination backed by the ``created_at`` indexes."""
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+
+class IdCursorPagination(CursorPagination):
+    """Cursor pagination in primary key order."""
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    ordering = 'id'
+
+
+def approved_articles():
+    """
+    Return approved articles with publisher and journalist joined and the
+    body deferred, as used by every list endpoint.
+    """
+    return (
+        Article.objects.filter(is_approved=True)
+        .select_related('publisher', 'journalist')
+        .defer('content')
+    )
+
+
+def approved_stamps(request, *args, **kwargs):
+    return ['approved', 'directory']
+
+
+def directory_stamps(request, *args, **kwargs):
+    return ['directory', 'counts']
+
+
+def source_stamps(kind):
+    def stamps(request, pk=None, **kwargs):
+        if not str(pk).isdigit():
+            return ['directory']
+        return [f'{kind}:{pk}', 'directory']
+    return stamps
+
+
+class SubscriptionContextMixin:
+    """Expose the requesting user's cached subscription state to serializers."""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['subscriptions'] = subscriptions.get_state(self.request.user)
+        return context
+
+
+class ArticleListMixin:
+    """Serve a cursor-paginated article listing from a viewset action."""
+
+    def paginated_articles(self, queryset):
+        paginator = ArticleCursorPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = ArticleListSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Approved articles.
+
+    ``list`` returns the lightweight representation; ``retrieve`` returns
+    the full article including its content.
+    """
+    pagination_class = ArticleCursorPagination
+
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            return Article.objects.filter(is_approved=True).select_related('publisher', 'journalist')
+        return approved_articles()
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ArticleSerializer
+        return ArticleListSerializer
+
+    @method_decorator(conditional.conditional_page(approved_stamps))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        article = self.get_object()
+        readership.record(article)
+        return Response(self.get_serializer(article).data)
+
+    @action(detail=False)
+    def trending(self, request):
+        """Precomputed trending list, site-wide or ``?publisher=<id>``."""
+        publisher = request.query_params.get('publisher', '')
+        articles = readership.trending(int(publisher) if publisher.isdigit() else None)
+        return Response({'results': self.get_serializer(articles, many=True).data})
+
+    @action(detail=False)
+    def search(self, request):
+        """Ranked full-text search: ``?q=<terms>&page=<n>``."""
+        page_number = request.query_params.get('page', '1')
+        page = search.search(
+            request.query_params.get('q', ''), page_number if page_number.isdigit() else 1
+        )
+        serializer = self.get_serializer(page.items, many=True)
+        return Response({
+            'page': page.number,
+            'has_next': page.has_next,
+            'results': serializer.data,
+        })
+
+
+class PublisherViewSet(SubscriptionContextMixin, ArticleListMixin, viewsets.ReadOnlyModelViewSet):
+    """Publishers and their approved articles."""
+    queryset = Publisher.objects.all()
+    serializer_class = PublisherSerializer
+    pagination_class = IdCursorPagination
+    # ``?ordering=-subscriber_count`` walks ``publisher_popularity_idx``.
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['id', 'subscriber_count', 'article_count']
+
+    @method_decorator(conditional.conditional_page(directory_stamps))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=True)
+    @method_decorator(conditional.conditional_page(source_stamps('publisher')))
+    def articles(self, request, pk=None):
+        publisher = self.get_object()
+        return self.paginated_articles(approved_articles().filter(publisher=publisher))
+
+
+class JournalistViewSet(SubscriptionContextMixin, ArticleListMixin, viewsets.ReadOnlyModelViewSet):
+    """Journalists and their approved articles."""
+    queryset = CustomUser.objects.filter(role='journalist')
+    serializer_class = JournalistSerializer
+    pagination_class = IdCursorPagination
+    # ``?ordering=-follower_count`` walks ``user_role_followers_idx``.
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['id', 'follower_count', 'article_count']
+
+    @method_decorator(conditional.conditional_page(directory_stamps))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=True)
+    @method_decorator(conditional.conditional_page(source_stamps('journalist')))
+    def articles(self, request, pk=None):
+        journalist = self.get_object()
+        return self.paginated_articles(approved_articles().filter(journalist=journalist))
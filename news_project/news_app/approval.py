@@ -0,0 +1,89 @@
+"""
+Bulk article approval and rejection.
+
+``approve`` flips any number of articles to approved with one UPDATE and
+queues the rest with one outbox upsert, so its cost does not depend on the
+size of the audience: the outbox worker (or the background task started by
+the approval views) fans the articles out to reader timelines and sends
+the notifications. Open reader dashboards are told about the new articles
+over SSE (``push``). The
+admin action, the editor's single approve link and the editor's
+multi-select form all go through here, so none of them depends on per-row
+``post_save`` signals. Both operations release the editors' claims on the
+articles and keep the ``pending`` tally in step.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import conditional, counters, digests, outbox, push
+from .models import Article
+
+
+def approve(articles):
+    """
+    Approve articles and run their side effects in batches.
+
+    Args:
+        articles (QuerySet | Iterable[int]): Articles, or their IDs, to approve.
+            Articles that are already approved are left alone.
+
+    Returns:
+        int: Number of articles that were newly approved.
+    """
+    queryset = articles if hasattr(articles, 'model') else Article.objects.filter(id__in=list(articles))
+
+    with transaction.atomic():
+        rows = list(
+            queryset.filter(is_approved=False).select_for_update().values_list('id', 'is_rejected')
+        )
+        if not rows:
+            return 0
+        pending_ids = [pk for pk, _ in rows]
+        Article.objects.filter(id__in=pending_ids).update(
+            is_approved=True, is_rejected=False, claimed_by=None, claimed_until=None,
+            version=F('version') + 1, updated_at=timezone.now(),
+        )
+        counters.bump('pending', -sum(1 for _, rejected in rows if not rejected))
+
+        approved = list(
+            Article.objects.filter(id__in=pending_ids).only(
+                'id', 'publisher_id', 'journalist_id', 'is_approved', 'created_at', 'version'
+            )
+        )
+        outbox.enqueue_many(approved)
+        digests.enqueue(approved)
+    conditional.touch(conditional.article_stamps(approved))
+    transaction.on_commit(lambda: push.publish_approved(pending_ids))
+    return len(pending_ids)
+
+
+def reject(articles):
+    """
+    Turn down pending articles so they leave the moderation queue.
+
+    Args:
+        articles (QuerySet | Iterable[int]): Articles, or their IDs, to reject.
+            Approved and already rejected articles are left alone.
+
+    Returns:
+        int: Number of articles that were rejected.
+    """
+    queryset = articles if hasattr(articles, 'model') else Article.objects.filter(id__in=list(articles))
+
+    with transaction.atomic():
+        pending_ids = list(
+            queryset.filter(is_approved=False, is_rejected=False)
+            .select_for_update().values_list('id', flat=True)
+        )
+        if not pending_ids:
+            return 0
+        Article.objects.filter(id__in=pending_ids).update(
+            is_rejected=True, claimed_by=None, claimed_until=None,
+            version=F('version') + 1, updated_at=timezone.now(),
+        )
+        counters.bump('pending', -len(pending_ids))
+        rejected = list(Article.objects.filter(id__in=pending_ids).only('id', 'publisher_id', 'journalist_id'))
+    conditional.touch(conditional.article_stamps(rejected))
+    return len(pending_ids)
@@ -6,4 +6,16 @@ class NewsAppConfig(AppConfig):
     name = 'news_app'
 
     def ready(self):
-        import news_app.signals
\ No newline at end of file
+        import news_app.signals
+        from django.contrib.auth.signals import user_logged_in
+        from django.db.backends.signals import connection_created
+        from news_app.backends import record_login
+        from news_app.middleware import install_query_recorder
+
+        # Only write last_login when it is stale, not on every sign-in.
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        user_logged_in.connect(record_login, dispatch_uid='news_app_record_login')
+
+        # Every connection reports its queries to the current request's
+        # metrics, including connections opened by async views' threads.
+        connection_created.connect(install_query_recorder, dispatch_uid='news_app_query_recorder')
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+Authentication backend that serves session users from the cache.
+
+``ModelBackend.get_user`` loads the ``CustomUser`` row on every
+authenticated request. ``CachedModelBackend`` keeps the loaded user in the
+cache under a key that carries ``CACHE_VERSION`` (bump it when the model's
+fields change, so old pickles are ignored after a deploy) and the user's
+primary key. The entry is dropped whenever the user is saved or deleted,
+and again when that transaction commits (see ``signals.py``), and callers that change users with
+``update()`` call :func:`forget` themselves.
+
+Login no longer writes on every sign-in either: ``record_login`` replaces
+Django's ``update_last_login`` and only touches ``last_login`` when the
+stored value is older than ``NEWS_LAST_LOGIN_INTERVAL`` seconds.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+
+CACHE_VERSION = 1
+CACHE_TIMEOUT = getattr(settings, 'NEWS_USER_CACHE_TIMEOUT', 60 * 15)
+LAST_LOGIN_INTERVAL = timedelta(seconds=getattr(settings, 'NEWS_LAST_LOGIN_INTERVAL', 60 * 60))
+
+
+def user_key(pk):
+    return f'news_app:user:v{CACHE_VERSION}:{pk}'
+
+
+def forget(pks):
+    """
+    Drop cached users now and again when the current transaction commits.
+
+    A request that runs before the commit still reads the old row and may
+    cache it again; the second delete removes that copy.
+
+    Args:
+        pks (Iterable[int]): User primary keys.
+    """
+    keys = [user_key(pk) for pk in pks]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ``ModelBackend`` whose ``get_user`` is answered from the cache.
+    """
+
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, CACHE_TIMEOUT)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+def record_login(sender, user, **kwargs):
+    """
+    Update ``last_login`` at most once per ``LAST_LOGIN_INTERVAL``.
+    """
+    now = timezone.now()
+    if user.last_login is not None and now - user.last_login < LAST_LOGIN_INTERVAL:
+        return
+    user.last_login = now
+    type(user)._default_manager.filter(pk=user.pk).update(last_login=now)
+    forget([user.pk])
@@ -0,0 +1,258 @@
+"""
+Load benchmarks for the dashboards, article views, suggestions, duplicate
+lookups, approval path and admin pages.
+
+Each selected dataset size is generated with ``news_app.seeding`` and every
+scenario is run several times while recording wall time and the number of
+SQL queries. Results are written as JSON so runs on different commits can
+be compared.
+
+Run with::
+
+    pytest -m benchmark news_app/benchmarks.py
+
+Environment variables:
+    NEWS_BENCH_SIZES: Comma-separated sizes to run (default ``small,medium``).
+    NEWS_BENCH_REPEAT: Timed runs per scenario (default 5).
+    NEWS_BENCH_REPORT: Path of the JSON report (default ``benchmark_report.json``).
+    NEWS_BENCH_CONCURRENCY: Workers in the WSGI/ASGI throughput comparison (default 8).
+    NEWS_BENCH_REQUESTS: Requests per handler in that comparison (default 200).
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from asgiref.sync import ThreadSensitiveContext, async_to_sync
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import duplicates, outbox, readership, recommendations, seeding
+from .models import Article, CustomUser
+
+
+SIZES = {
+    'small': dict(publishers=10, journalists=30, readers=200, articles=1000),
+    'medium': dict(publishers=50, journalists=200, readers=2000, articles=10000),
+    'large': dict(publishers=200, journalists=1000, readers=20000, articles=100000),
+}
+REPEAT = int(os.environ.get('NEWS_BENCH_REPEAT', 5))
+REPORT_PATH = os.environ.get('NEWS_BENCH_REPORT', 'benchmark_report.json')
+CONCURRENCY = int(os.environ.get('NEWS_BENCH_CONCURRENCY', 8))
+REQUESTS = int(os.environ.get('NEWS_BENCH_REQUESTS', 200))
+
+results = []
+
+
+def selected_sizes():
+    return [size.strip() for size in os.environ.get('NEWS_BENCH_SIZES', 'small,medium').split(',')]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(size, scenario, func, repeat=REPEAT):
+    """
+    Time ``func`` ``repeat`` times and record wall time and query count.
+
+    Args:
+        size (str): Dataset size label.
+        scenario (str): Scenario label.
+        func (callable): Code under test; receives the run number.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The recorded result.
+    """
+    timings = []
+    queries = []
+    for run in range(repeat):
+        with CaptureQueriesContext(connections['default']) as captured:
+            start = time.perf_counter()
+            func(run)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured.captured_queries))
+
+    result = {
+        'size': size,
+        'scenario': scenario,
+        'runs': repeat,
+        'median_ms': round(statistics.median(timings), 2),
+        'min_ms': round(min(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'queries': max(queries),
+    }
+    results.append(result)
+    return result
+
+
+def throughput(size, scenario, run, requests=REQUESTS, concurrency=CONCURRENCY):
+    """
+    Time one batch of ``requests`` spread over ``concurrency`` workers.
+
+    Args:
+        size (str): Dataset size label.
+        scenario (str): Scenario label.
+        run (callable): Sends the batch; receives the per-worker request counts.
+        requests (int): Total requests in the batch.
+        concurrency (int): Number of workers.
+
+    Returns:
+        dict: The recorded result.
+    """
+    counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    start = time.perf_counter()
+    run(counts)
+    elapsed = time.perf_counter() - start
+    result = {
+        'size': size,
+        'scenario': scenario,
+        'requests': requests,
+        'concurrency': concurrency,
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'requests_per_s': round(requests / elapsed, 1),
+    }
+    results.append(result)
+    return result
+
+
+@pytest.fixture(scope='module', autouse=True)
+def benchmark_report():
+    yield
+    if not results:
+        return
+    with open(REPORT_PATH, 'w') as report:
+        json.dump({
+            'commit': git_commit(),
+            'generated_at': timezone.now().isoformat(),
+            'results': results,
+        }, report, indent=2)
+
+
+def get_ok(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return response
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', selected_sizes())
+def test_benchmark(size, client, settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    settings.NEWS_INSTRUMENTATION = True
+    seeding.seed(prefix=size, **SIZES[size])
+
+    # Benchmark the heaviest users: the fullest timeline and the longest history.
+    reader = (
+        CustomUser.objects.filter(role='reader', username__startswith=size)
+        .annotate(entries=Count('feed_entries')).order_by('-entries').first()
+    )
+    journalist = (
+        CustomUser.objects.filter(role='journalist', username__startswith=size)
+        .annotate(written=Count('article')).order_by('-written').first()
+    )
+    editor = CustomUser.objects.create_user(username=f'{size}_editor', password='pass', role='editor')
+    admin = CustomUser.objects.create_superuser(username=f'{size}_admin', password='pass', role='editor')
+
+    # Near-duplicate lookups read LSH buckets, so their cost should not grow with the archive.
+    samples = list(Article.objects.order_by('?').values_list('title', 'content')[:REPEAT])
+    measure(size, 'duplicate_lookup', lambda run: duplicates.find(*samples[run % len(samples)]))
+
+    if recommendations.np is not None:
+        measure(size, 'build_suggestions', lambda run: recommendations.build(), repeat=1)
+
+    client.force_login(reader)
+    measure(size, 'reader_dashboard', lambda run: get_ok(client, reverse('reader_dashboard')))
+    viewed = list(Article.objects.filter(is_approved=True).order_by('id').only('id', 'publisher_id')[:50])
+    readership.drain()
+    measure(size, 'article_detail', lambda run: get_ok(client, reverse('article_detail', args=[viewed[run % len(viewed)].id])))
+    for article in viewed:
+        readership.record(article)
+    measure(size, 'flush_views', lambda run: readership.flush(), repeat=1)
+
+    client.force_login(journalist)
+    measure(size, 'journalist_dashboard', lambda run: get_ok(client, reverse('journalist_dashboard')))
+
+    client.force_login(editor)
+    measure(size, 'editor_dashboard', lambda run: get_ok(client, reverse('editor_dashboard')))
+
+    pending = iter(Article.objects.filter(is_approved=False).order_by('id').values_list('id', flat=True))
+    measure(size, 'approve_article', lambda run: client.get(reverse('approve_article', args=[next(pending)])))
+    measure(size, 'send_notifications', lambda run: outbox.drain(limit=1), repeat=REPEAT)
+
+    client.force_login(admin)
+    for changelist in ('article', 'publisher', 'customuser'):
+        url = reverse(f'admin:news_app_{changelist}_changelist')
+        measure(size, f'admin_{changelist}_changelist', lambda run, url=url: get_ok(client, url))
+    # Change forms must not render a <select> row per related object.
+    article = Article.objects.order_by('id').first()
+    url = reverse('admin:news_app_article_change', args=[article.pk])
+    measure(size, 'admin_article_change', lambda run: get_ok(client, url))
+    url = reverse('admin:news_app_customuser_change', args=[journalist.pk])
+    measure(size, 'admin_customuser_change', lambda run: get_ok(client, url))
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True, databases='__all__')
+@pytest.mark.parametrize('size', selected_sizes())
+def test_benchmark_wsgi_vs_asgi(size):
+    """
+    Compare sync (WSGI) and async (ASGI) request handling at the same
+    worker count: ``CONCURRENCY`` threads with the sync test client against
+    ``CONCURRENCY`` concurrent requests on one event loop.
+    """
+    seeding.seed(prefix=size, **SIZES[size])
+    reader = (
+        CustomUser.objects.filter(role='reader', username__startswith=size)
+        .annotate(entries=Count('feed_entries')).order_by('-entries').first()
+    )
+    url = reverse('reader_dashboard')
+    login = Client()
+    login.force_login(reader)
+
+    def wsgi(counts):
+        def worker(count):
+            client = Client()
+            client.cookies = login.cookies
+            try:
+                for _ in range(count):
+                    get_ok(client, url)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(len(counts)) as pool:
+            list(pool.map(worker, counts))
+
+    def asgi(counts):
+        async def worker(count):
+            client = AsyncClient()
+            client.cookies = login.cookies
+            for _ in range(count):
+                # As under an ASGI server, each request's sync work gets its own thread.
+                async with ThreadSensitiveContext():
+                    response = await client.get(url)
+                assert response.status_code == 200, url
+
+        async def run():
+            await asyncio.gather(*(worker(count) for count in counts))
+
+        async_to_sync(run)()
+
+    throughput(size, 'reader_dashboard_wsgi', wsgi)
+    throughput(size, 'reader_dashboard_asgi', asgi)
@@ -0,0 +1,57 @@
+"""
+Fragment cache for rendered article cards.
+
+Each dashboard renders its article list through ``{% article_cards %}``.
+Cards are cached per article under a key built from the article ID and its
+``version`` column, which is bumped on every article save and approval and
+for all of a publisher's or journalist's articles when the publisher is
+renamed or the journalist changes username. Since the key is known from the
+row itself, a whole page of cards is fetched with one ``get_many`` and only
+the misses are rendered.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+CARD_TEMPLATES = {
+    'reader': 'news_app/cards/reader_card.html',
+    'editor': 'news_app/cards/editor_card.html',
+    'journalist': 'news_app/cards/journalist_card.html',
+}
+CACHE_TIMEOUT = getattr(settings, 'NEWS_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+# Bump when the card templates change so cached markup is not reused.
+TEMPLATE_VERSION = 3
+
+
+def card_key(variant, article):
+    return f'news_app:card:v{TEMPLATE_VERSION}:{variant}:{article.id}:{article.version}'
+
+
+def render_cards(articles, variant):
+    """
+    Return the concatenated card markup for ``articles``.
+
+    Args:
+        articles (Iterable[Article]): Articles in display order.
+        variant (str): Key of ``CARD_TEMPLATES``.
+
+    Returns:
+        SafeString: Markup of every card.
+    """
+    template = CARD_TEMPLATES[variant]
+    articles = list(articles)
+    keys = [card_key(variant, article) for article in articles]
+    cached = cache.get_many(keys)
+
+    missing = {}
+    fragments = []
+    for key, article in zip(keys, articles):
+        if key not in cached:
+            cached[key] = missing[key] = render_to_string(template, {'article': article})
+        fragments.append(cached[key])
+    if missing:
+        cache.set_many(missing, CACHE_TIMEOUT)
+    return mark_safe(''.join(fragments))
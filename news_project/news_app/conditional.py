@@ -0,0 +1,189 @@
+"""
+Cheap validators for conditional GET on dashboards and API listings.
+
+Every source of content has a "last changed" stamp in the cache:
+
+* ``publisher:<id>`` and ``journalist:<id>`` for each article source,
+* ``approved`` for the set of approved articles,
+* ``queue`` for the editors' moderation queue,
+* ``editor:<id>`` for the batch an editor has claimed from that queue,
+* ``directory`` for the publisher and journalist lists,
+* ``reader:<id>`` for a reader's own subscriptions, so pages validated by
+  ``If-Modified-Since`` alone also change when the reader subscribes.
+
+Stamps are touched from the article/publisher/user signals and by the bulk
+approval service, once the surrounding transaction commits. A request's ``ETag`` and ``Last-Modified`` are computed
+from the stamps of the sources it shows plus the reader's cached
+subscription sets, so a matching ``If-None-Match``/``If-Modified-Since``
+is answered with 304 before the article table is queried or a template is
+rendered. On a cache miss a stamp is recovered from ``Article.updated_at``.
+"""
+
+import hashlib
+from asyncio import iscoroutinefunction
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from . import subscriptions
+from .models import Article
+
+
+STAMP_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def _cache_key(name):
+    return f'news_app:changed:{name}'
+
+
+def _load(name):
+    # Fallback used when a stamp has been evicted from the cache. Stamps
+    # that have no durable source are treated as changed just now.
+    kind, _, pk = name.partition(':')
+    if kind == 'approved':
+        articles = Article.objects.filter(is_approved=True)
+    elif kind == 'queue':
+        articles = Article.objects.all()
+    elif kind == 'publisher':
+        articles = Article.objects.filter(publisher_id=int(pk))
+    elif kind == 'journalist':
+        articles = Article.objects.filter(journalist_id=int(pk))
+    else:
+        return timezone.now()
+    changed = articles.aggregate(changed=Max('updated_at'))['changed']
+    return changed or datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def article_stamps(articles):
+    """
+    Return the stamp names affected by a change to ``articles``.
+
+    Args:
+        articles (Iterable[Article]): Changed articles.
+
+    Returns:
+        set[str]: Stamp names.
+    """
+    names = {'approved', 'queue'}
+    for article in articles:
+        names.add(f'publisher:{article.publisher_id}')
+        if article.journalist_id:
+            names.add(f'journalist:{article.journalist_id}')
+    return names
+
+
+def touch(names):
+    """
+    Mark the given sources as changed when the current transaction commits.
+
+    Stamping before the commit would let a request that runs in between
+    cache the old content under the new validators.
+
+    Args:
+        names (Iterable[str]): Stamp names.
+    """
+    keys = [_cache_key(name) for name in names]
+
+    def stamp():
+        now = timezone.now()
+        cache.set_many({key: now for key in keys}, STAMP_TIMEOUT)
+
+    transaction.on_commit(stamp)
+
+
+def last_modified(names):
+    """
+    Return the most recent change across the given sources.
+
+    Args:
+        names (Iterable[str]): Stamp names.
+
+    Returns:
+        datetime: Latest stamp.
+    """
+    names = list(names)
+    found = cache.get_many([_cache_key(name) for name in names])
+    missing = {}
+    stamps = []
+    for name in names:
+        stamp = found.get(_cache_key(name))
+        if stamp is None:
+            stamp = missing[_cache_key(name)] = _load(name)
+        stamps.append(stamp)
+    if missing:
+        cache.set_many(missing, STAMP_TIMEOUT)
+    return max(stamps)
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def conditional_page(stamp_names):
+    """
+    Decorator adding ETag/Last-Modified validation to a view.
+
+    ``stamp_names(request, *args, **kwargs)`` returns the stamp names the
+    page depends on. The ETag also covers the user, the reader's
+    subscription sets and the query string, since those change the page.
+    Validators are computed once per request. Async views are supported.
+    """
+    def validators(request, *args, **kwargs):
+        cached = getattr(request, '_news_app_validators', None)
+        if cached is None:
+            state = subscriptions.get_state(request.user)
+            changed = last_modified(stamp_names(request, *args, **kwargs))
+            etag = make_etag(
+                request.user.pk,
+                sorted(state.publisher_ids),
+                sorted(state.journalist_ids),
+                changed.timestamp(),
+                request.GET.urlencode(),
+            )
+            cached = request._news_app_validators = (etag, changed)
+        return cached
+
+    check = condition(
+        etag_func=lambda request, *args, **kwargs: validators(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: validators(request, *args, **kwargs)[1],
+    )
+
+    def decorator(view):
+        wrapped = check(view)
+        if not iscoroutinefunction(view):
+            return wrapped
+
+        @wraps(view)
+        async def async_view(request, *args, **kwargs):
+            # Share the user loaded by ``auser()`` with sync code instead of
+            # letting ``request.user`` load it again.
+            request.user = await request.auser()
+            # ``condition`` calls the validator functions synchronously; load
+            # them (cache and possibly database reads) off the event loop first.
+            await sync_to_async(validators)(request, *args, **kwargs)
+            return await wrapped(request, *args, **kwargs)
+        return async_view
+
+    return decorator
+
+
+def reader_stamps(request, *args, **kwargs):
+    state = subscriptions.get_state(request.user)
+    names = ['directory', f'reader:{request.user.pk}']
+    names += [f'publisher:{pk}' for pk in state.publisher_ids]
+    names += [f'journalist:{pk}' for pk in state.journalist_ids]
+    return names
+
+
+def journalist_stamps(request, *args, **kwargs):
+    return [f'journalist:{request.user.pk}']
+
+
+def editor_stamps(request, *args, **kwargs):
+    return ['queue', f'editor:{request.user.pk}']
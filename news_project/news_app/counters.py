@@ -0,0 +1,149 @@
+"""
+Denormalized popularity counters.
+
+``Publisher.subscriber_count``/``article_count`` and
+``CustomUser.follower_count``/``article_count`` replace ``Count()``
+aggregates over the subscription tables and the article table, and the
+``pending`` :class:`~news_app.models.Tally` row holds the size of the
+moderation queue for the editors' badge. They are
+kept exact by the ``m2m_changed``, ``post_save`` and ``post_delete``
+receivers in ``signals.py``, which apply atomic ``F()`` increments, and by
+bulk writers (``importing``) calling :func:`count_articles`. Anything that
+bypasses both, such as raw SQL or a restored backup, is repaired by
+``manage.py reconcile_counters``.
+"""
+
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import backends, conditional
+from .models import Article, CustomUser, Publisher, Tally
+
+
+PublisherSubscription = CustomUser.subscribed_publishers.through
+JournalistFollow = CustomUser.subscribed_journalists.through
+
+# (model, counter field, related table, foreign key on that table)
+COUNTERS = (
+    (Publisher, 'subscriber_count', PublisherSubscription, 'publisher_id'),
+    (Publisher, 'article_count', Article, 'publisher_id'),
+    (CustomUser, 'follower_count', JournalistFollow, 'to_customuser_id'),
+    (CustomUser, 'article_count', Article, 'journalist_id'),
+)
+
+# Tally name -> queryset counted by ``reconcile``.
+TALLIES = {
+    'pending': lambda: Article.objects.filter(is_approved=False, is_rejected=False),
+}
+
+
+def is_pending(article):
+    return not article.is_approved and not article.is_rejected
+
+
+def bump(name, delta):
+    """
+    Add ``delta`` to a tally, creating it on first use.
+
+    Args:
+        name (str): Tally name.
+        delta (int): Amount to add; zero is ignored.
+    """
+    if not delta:
+        return
+    if not Tally.objects.filter(name=name).update(value=F('value') + delta):
+        # First use: start from the real count, which already includes this change.
+        Tally.objects.get_or_create(name=name, defaults={'value': TALLIES[name]().count()})
+    conditional.touch(['counts'])
+
+
+def tally(name):
+    """
+    Return a tally's value, counting it once if it does not exist yet.
+    """
+    row = Tally.objects.filter(name=name).values_list('value', flat=True).first()
+    if row is None:
+        row = Tally.objects.get_or_create(name=name, defaults={'value': TALLIES[name]().count()})[0].value
+    return row
+
+
+def adjust(model, field, deltas):
+    """
+    Apply counter changes with one ``UPDATE ... SET f = f + n`` per distinct delta.
+
+    Args:
+        model (type): ``Publisher`` or ``CustomUser``.
+        field (str): Counter field.
+        deltas (dict): ``{pk: delta}``; zero deltas and ``None`` keys are ignored.
+    """
+    by_delta = {}
+    for pk, delta in deltas.items():
+        if pk is not None and delta:
+            by_delta.setdefault(delta, []).append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+        if model is CustomUser:
+            backends.forget(pks)
+    if by_delta:
+        conditional.touch(['counts'])
+
+
+def count_articles(articles, sign=1):
+    """
+    Add (or with ``sign=-1`` remove) articles from their sources' counters.
+
+    Args:
+        articles (Iterable[Article]): Articles created or deleted.
+        sign (int): ``1`` for created, ``-1`` for deleted.
+    """
+    publishers, journalists = Counter(), Counter()
+    pending = 0
+    for article in articles:
+        publishers[article.publisher_id] += sign
+        journalists[article.journalist_id] += sign
+        pending += sign if is_pending(article) else 0
+    adjust(Publisher, 'article_count', publishers)
+    adjust(CustomUser, 'article_count', journalists)
+    bump('pending', pending)
+
+
+def reconcile(fix=True):
+    """
+    Compare every counter with a fresh aggregate and optionally repair it.
+
+    Args:
+        fix (bool): Write the correct values back.
+
+    Returns:
+        dict: ``{'<model>.<field>': rows_out_of_date}``.
+    """
+    drift = {}
+    for model, field, table, key in COUNTERS:
+        actual = Coalesce(
+            Subquery(
+                table.objects.filter(**{key: OuterRef('pk')})
+                .values(key).annotate(n=Count('*')).values('n')
+            ),
+            Value(0),
+        )
+        stale = model.objects.annotate(actual=actual).exclude(**{field: F('actual')})
+        label = f'{model._meta.model_name}.{field}'
+        if fix and model is CustomUser:
+            pks = list(stale.values_list('pk', flat=True))
+            drift[label] = model.objects.filter(pk__in=pks).update(**{field: actual})
+            backends.forget(pks)
+        elif fix:
+            drift[label] = stale.update(**{field: actual})
+        else:
+            drift[label] = stale.count()
+    for name, counted in TALLIES.items():
+        actual = counted().count()
+        label = f'tally.{name}'
+        drift[label] = int(tally(name) != actual)
+        if fix and drift[label]:
+            Tally.objects.filter(name=name).update(value=actual)
+    if fix and any(drift.values()):
+        conditional.touch(['counts'])
+    return drift
@@ -0,0 +1,207 @@
+"""
+Hourly and daily notification digests.
+
+Readers whose ``notification_frequency`` is ``hourly`` or ``daily`` get no
+per-article emails from the outbox. Instead every approval appends one
+``DigestEntry`` per article (not per reader), and the scheduled
+``send_digests`` command sends each due reader a single message listing the
+articles approved since their previous digest.
+
+Periods are aligned to clock boundaries (the top of the hour, local
+midnight). A run walks the due readers in primary key batches; for each
+batch one query per subscription table pairs the readers with the entries
+in their window, the articles are loaded once without their bodies, and
+the messages go out over one mail connection before the batch's
+``digest_sent_until`` moves forward with one UPDATE. A failed run resends
+the unfinished batch next time rather than losing it.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Min
+from django.utils import timezone
+
+from . import backends
+from .models import Article, CustomUser, DigestEntry
+from .outbox import FROM_EMAIL
+
+
+BATCH_SIZE = 500
+PERIODS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+}
+# Entries are kept at least this long for readers who have not had a digest yet.
+RETENTION = max(PERIODS.values()) * 2
+
+PublisherSubscription = CustomUser.subscribed_publishers.through
+JournalistFollow = CustomUser.subscribed_journalists.through
+
+
+def enqueue(articles):
+    """
+    Add approved articles to the pending digests with one INSERT.
+
+    Articles that are already queued are skipped.
+
+    Args:
+        articles (Iterable[Article]): The approved articles.
+    """
+    DigestEntry.objects.bulk_create(
+        [DigestEntry(article_id=article.id) for article in articles],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def period_end(frequency, now=None):
+    """
+    Return the boundary that closes the latest complete period.
+
+    Args:
+        frequency (str): ``'hourly'`` or ``'daily'``.
+        now (datetime, optional): Reference time.
+
+    Returns:
+        datetime: Top of the current hour, or the current local midnight.
+    """
+    now = timezone.localtime(now or timezone.now())
+    if frequency == 'hourly':
+        return now.replace(minute=0, second=0, microsecond=0)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def due_readers(frequency, until):
+    """
+    Return readers on ``frequency`` whose last digest ends before ``until``.
+    """
+    return CustomUser.objects.filter(
+        role='reader', notification_frequency=frequency, digest_sent_until__lt=until,
+    ).exclude(email='')
+
+
+def pending_articles(reader_ids, until):
+    """
+    Pair readers with the digest entries inside their window.
+
+    Args:
+        reader_ids (list[int]): Readers of one batch.
+        until (datetime): End of the period being sent.
+
+    Returns:
+        dict: ``{reader_id: set(article_id)}``.
+    """
+    pairs = PublisherSubscription.objects.filter(
+        customuser_id__in=reader_ids,
+        publisher__articles__digest__approved_at__gt=F('customuser__digest_sent_until'),
+        publisher__articles__digest__approved_at__lte=until,
+    ).values_list('customuser_id', 'publisher__articles__id').union(
+        JournalistFollow.objects.filter(
+            from_customuser_id__in=reader_ids,
+            to_customuser__article__digest__approved_at__gt=F('from_customuser__digest_sent_until'),
+            to_customuser__article__digest__approved_at__lte=until,
+        ).values_list('from_customuser_id', 'to_customuser__article__id')
+    )
+    found = defaultdict(set)
+    for reader_id, article_id in pairs:
+        found[reader_id].add(article_id)
+    return found
+
+
+def build_digest(email, frequency, articles):
+    """
+    Build one reader's digest.
+
+    Args:
+        email (str): Recipient address.
+        frequency (str): ``'hourly'`` or ``'daily'``.
+        articles (list[Article]): Articles to list, newest first.
+
+    Returns:
+        EmailMessage: The unsent message.
+    """
+    sections = []
+    for article in articles:
+        byline = article.publisher.name
+        if article.journalist:
+            byline = f"{article.journalist.username}, {byline}"
+        sections.append(f"{article.title}\n{byline}\n\n{article.excerpt}")
+    count = len(articles)
+    return EmailMessage(
+        subject=f"Your {frequency} digest: {count} new article{'s' if count != 1 else ''}",
+        body="\n\n---\n\n".join(sections),
+        from_email=FROM_EMAIL,
+        to=[email],
+    )
+
+
+def send(frequency, now=None, batch_size=BATCH_SIZE, connection=None):
+    """
+    Send the digests of every due reader on ``frequency``.
+
+    Args:
+        frequency (str): ``'hourly'`` or ``'daily'``.
+        now (datetime, optional): Reference time.
+        batch_size (int): Readers handled per batch.
+        connection: Mail backend connection; one is opened if omitted.
+
+    Returns:
+        tuple[int, int]: Readers whose period was closed, digests sent.
+    """
+    until = period_end(frequency, now)
+    # Readers new to digests start with the period that just ended.
+    # Cached session users (backends.py) are dropped after each update.
+    starting = list(CustomUser.objects.filter(
+        notification_frequency=frequency, digest_sent_until__isnull=True,
+    ).values_list('pk', flat=True))
+    if starting:
+        CustomUser.objects.filter(pk__in=starting).update(digest_sent_until=until - PERIODS[frequency])
+        backends.forget(starting)
+
+    readers = due_readers(frequency, until).order_by('pk').values_list('pk', 'email')
+    connection = connection or get_connection()
+    closed = sent = 0
+    last_pk = 0
+    with connection:
+        while True:
+            batch = list(readers.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            reader_ids = [pk for pk, _ in batch]
+            found = pending_articles(reader_ids, until)
+            ordered = list(
+                Article.objects.filter(id__in={pk for ids in found.values() for pk in ids})
+                .select_related('publisher', 'journalist').defer('content')
+                .order_by('-created_at', '-id')
+            )
+            messages = [
+                build_digest(email, frequency, [a for a in ordered if a.id in found[pk]])
+                for pk, email in batch if found.get(pk)
+            ]
+            if messages:
+                connection.send_messages(messages)
+            CustomUser.objects.filter(id__in=reader_ids).update(digest_sent_until=until)
+            backends.forget(reader_ids)
+            closed += len(batch)
+            sent += len(messages)
+    return closed, sent
+
+
+def prune(now=None):
+    """
+    Delete entries every digest reader has already been sent.
+
+    Returns:
+        int: Number of entries deleted.
+    """
+    oldest = (
+        CustomUser.objects.filter(role='reader').exclude(notification_frequency='instant')
+        .exclude(email='').aggregate(oldest=Min('digest_sent_until'))['oldest']
+    )
+    cutoff = (now or timezone.now()) - RETENTION
+    if oldest is not None:
+        cutoff = min(cutoff, oldest)
+    return DigestEntry.objects.filter(approved_at__lte=cutoff).delete()[0]
@@ -0,0 +1,223 @@
+"""
+Near-duplicate detection for submitted and imported articles.
+
+Every article's title and content are cut into overlapping word
+``SHINGLE_WORDS``-grams and summarized by a MinHash signature of ``SLOTS``
+values: two signatures agree in a slot with probability equal to the
+Jaccard similarity of the shingle sets. The signature is built with
+one-permutation hashing (one hash per shingle; its top bits pick the slot
+and the slot keeps its minimum, empty slots borrowing from the next filled
+one), so fingerprinting an article is a single pass over its words.
+
+For locality-sensitive hashing the signature is cut into ``BANDS`` bands
+of ``ROWS`` values and each band is hashed to a ``FingerprintBand.bucket``.
+A lookup reads the rows sharing one of the text's buckets through the
+``bucket`` index, so its cost depends on the number of candidates rather
+than the size of the archive. The ``CANDIDATE_LIMIT`` articles sharing the
+most buckets (the likeliest near-duplicates) are then compared slot by
+slot and kept when the estimated similarity reaches ``THRESHOLD``.
+
+``ArticleForm`` refuses submissions that duplicate an article that was not
+rejected, and ``importing`` rejects such records. The index follows article
+saves (``signals.py``) and bulk writes, and is rebuilt with
+``manage.py rebuild_duplicate_index``.
+"""
+
+import re
+import struct
+from collections import defaultdict
+from hashlib import blake2b
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Fingerprint, FingerprintBand
+
+
+SHINGLE_WORDS = 3
+SLOTS = 64
+BANDS = 16
+ROWS = SLOTS // BANDS
+THRESHOLD = getattr(settings, 'NEWS_DUPLICATE_THRESHOLD', 0.8)
+# Most candidates read for a single lookup.
+CANDIDATE_LIMIT = 50
+BATCH_SIZE = 1000
+
+_SLOT_SHIFT = 64 - (SLOTS - 1).bit_length()
+_MASK = (1 << 64) - 1
+# Odd constant mixed into borrowed slots so they differ from their source.
+_BORROW = 0x9E3779B97F4A7C15
+_PACK = struct.Struct(f'<{SLOTS}Q')
+
+
+def _hash(data):
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), 'little')
+
+
+def shingles(title, content):
+    """
+    Return the set of word shingles of an article's text.
+    """
+    words = re.findall(r'\w+', f'{title} {content}'.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(title, content):
+    """
+    Compute the MinHash signature of an article's text.
+
+    Args:
+        title (str): Article title.
+        content (str): Article body.
+
+    Returns:
+        tuple[int] | None: ``SLOTS`` 64-bit values, or ``None`` for empty text.
+    """
+    found = shingles(title, content)
+    if not found:
+        return None
+    slots = [None] * SLOTS
+    for shingle in found:
+        value = _hash(shingle.encode())
+        slot = value >> _SLOT_SHIFT
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+    dense = list(slots)
+    for slot in range(SLOTS):
+        if slots[slot] is None:
+            distance = next(d for d in range(1, SLOTS) if slots[(slot + d) % SLOTS] is not None)
+            dense[slot] = (slots[(slot + distance) % SLOTS] + distance * _BORROW) & _MASK
+    return tuple(dense)
+
+
+def similarity(first, second):
+    """
+    Return the fraction of slots two signatures agree on.
+    """
+    return sum(a == b for a, b in zip(first, second)) / SLOTS
+
+
+def buckets(sig):
+    """
+    Return the LSH bucket of every band of a signature.
+    """
+    return [
+        # Shifted to fit a signed 64-bit column.
+        _hash(struct.pack(f'<B{ROWS}Q', band, *sig[band * ROWS:(band + 1) * ROWS])) >> 1
+        for band in range(BANDS)
+    ]
+
+
+def _unpack(packed):
+    return _PACK.unpack(bytes(packed))
+
+
+def _indexed(bucket_values):
+    # Rows of articles that were not rejected sharing one of the buckets.
+    return FingerprintBand.objects.filter(
+        bucket__in=bucket_values, fingerprint__article__is_rejected=False,
+    ).values_list('bucket', 'fingerprint_id', 'fingerprint__signature')
+
+
+def find(title, content, exclude=None):
+    """
+    Return indexed articles that near-duplicate the given text.
+
+    Args:
+        title (str): Title to check.
+        content (str): Body to check.
+        exclude (int, optional): Article to ignore, e.g. the one being edited.
+
+    Returns:
+        list[tuple[int, float]]: ``(article_id, similarity)``, most similar first.
+    """
+    sig = signature(title, content)
+    if sig is None:
+        return []
+    bands = FingerprintBand.objects.filter(bucket__in=buckets(sig), fingerprint__article__is_rejected=False)
+    if exclude is not None:
+        bands = bands.exclude(fingerprint_id=exclude)
+    # Articles sharing more bands are likelier to be near-duplicates.
+    candidates = (
+        bands.values('fingerprint_id').annotate(shared=Count('bucket'))
+        .order_by('-shared', 'fingerprint_id').values_list('fingerprint_id', flat=True)[:CANDIDATE_LIMIT]
+    )
+    packed = Fingerprint.objects.filter(pk__in=list(candidates)).values_list('pk', 'signature')
+    scores = {pk: similarity(sig, _unpack(value)) for pk, value in packed}
+    return sorted(
+        ((pk, score) for pk, score in scores.items() if score >= THRESHOLD),
+        key=lambda match: (-match[1], match[0]),
+    )
+
+
+def batch_duplicates(articles):
+    """
+    Find the near-duplicates in a batch of unsaved articles.
+
+    An article is a duplicate when it matches an indexed article or an
+    earlier, non-duplicate article of the same batch. The index is read with
+    one query per ``BATCH_SIZE`` buckets.
+
+    Args:
+        articles (list[Article]): Articles with ``title`` and ``content``.
+
+    Returns:
+        dict: ``{position: original}`` where ``original`` is the ID of the
+        indexed article or the earlier ``Article`` of the batch.
+    """
+    sigs = [signature(article.title, article.content) for article in articles]
+    bands = [buckets(sig) if sig else [] for sig in sigs]
+
+    indexed = defaultdict(set)
+    indexed_sigs = {}
+    wanted = iter(sorted({bucket for article_bands in bands for bucket in article_bands}))
+    while chunk := list(islice(wanted, BATCH_SIZE)):
+        for bucket, pk, packed in _indexed(chunk):
+            indexed[bucket].add(pk)
+            if pk not in indexed_sigs:
+                indexed_sigs[pk] = _unpack(packed)
+
+    found = {}
+    kept = defaultdict(set)
+    for position, (sig, article_bands) in enumerate(zip(sigs, bands)):
+        best, original = THRESHOLD, None
+        for pk in set().union(*(indexed[bucket] for bucket in article_bands)):
+            score = similarity(sig, indexed_sigs[pk])
+            if score >= best:
+                best, original = score, pk
+        if original is None:
+            for earlier in sorted(set().union(*(kept[bucket] for bucket in article_bands))):
+                score = similarity(sig, sigs[earlier])
+                if score >= best:
+                    best, original = score, articles[earlier]
+        if original is None:
+            for bucket in article_bands:
+                kept[bucket].add(position)
+        else:
+            found[position] = original
+    return found
+
+
+def index_articles(articles):
+    """
+    Add or refresh saved articles in the duplicate index.
+
+    Args:
+        articles (Iterable[Article]): Saved articles with ``title`` and ``content``.
+    """
+    rows = [(article.pk, signature(article.title, article.content)) for article in articles]
+    if not rows:
+        return
+    with transaction.atomic():
+        Fingerprint.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+        Fingerprint.objects.bulk_create(
+            [Fingerprint(article_id=pk, signature=_PACK.pack(*sig)) for pk, sig in rows if sig]
+        )
+        FingerprintBand.objects.bulk_create(
+            [FingerprintBand(fingerprint_id=pk, bucket=bucket) for pk, sig in rows if sig for bucket in buckets(sig)],
+            batch_size=BATCH_SIZE,
+        )
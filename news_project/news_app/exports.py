@@ -0,0 +1,119 @@
+"""
+Streaming exports of approved articles.
+
+Rows are read in primary key order, ``CHUNK_SIZE`` at a time, with keyset
+pagination (``id > last ORDER BY id LIMIT n``): every chunk is a short
+indexed query, whatever the driver does with server-side cursors, and a
+full archive export holds one chunk in memory. Both generators are meant
+to be passed to ``StreamingHttpResponse``: ``aexport`` under ASGI, where
+each chunk is sent before the next one is read, and ``export`` under WSGI,
+which would otherwise collect an async iterator into memory before sending
+any of it.
+"""
+
+import csv
+import json
+
+from .models import Article
+
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+FIELDS = (
+    'id', 'title', 'content', 'created_at', 'updated_at',
+    'publisher_id', 'publisher__name', 'journalist_id', 'journalist__username',
+)
+HEADERS = (
+    'id', 'title', 'content', 'created_at', 'updated_at',
+    'publisher_id', 'publisher_name', 'journalist_id', 'journalist_username',
+)
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def _rows():
+    return Article.objects.filter(is_approved=True).order_by('id').values_list(*FIELDS)
+
+
+def export_chunks(chunk_size=CHUNK_SIZE):
+    """
+    Yield approved articles as lists of tuples ordered by ID.
+
+    Args:
+        chunk_size (int): Rows read per query.
+
+    Yields:
+        list[tuple]: Values in ``HEADERS`` order.
+    """
+    rows = _rows()
+    last = 0
+    while chunk := list(rows.filter(id__gt=last)[:chunk_size].iterator()):
+        last = chunk[-1][0]
+        yield chunk
+
+
+async def aexport_chunks(chunk_size=CHUNK_SIZE):
+    """
+    Async version of :func:`export_chunks`.
+    """
+    rows = _rows()
+    last = 0
+    while chunk := [row async for row in rows.filter(id__gt=last)[:chunk_size]]:
+        last = chunk[-1][0]
+        yield chunk
+
+
+def ndjson_line(row):
+    """
+    Encode a row as a newline-terminated JSON object.
+    """
+    record = dict(zip(HEADERS, row))
+    for field in ('created_at', 'updated_at'):
+        if record[field] is not None:
+            record[field] = record[field].isoformat()
+    return json.dumps(record) + '\n'
+
+
+def _encoder(fmt):
+    # Returns the header line ('' for NDJSON) and the row encoder.
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        return writer.writerow(HEADERS), writer.writerow
+    return '', ndjson_line
+
+
+def export(fmt, chunk_size=CHUNK_SIZE):
+    """
+    Yield the encoded export, one chunk of rows at a time.
+
+    Args:
+        fmt (str): ``'ndjson'`` or ``'csv'`` (header first).
+        chunk_size (int): Rows read per query.
+
+    Yields:
+        str: Encoded rows.
+    """
+    header, encode = _encoder(fmt)
+    if header:
+        yield header
+    for chunk in export_chunks(chunk_size):
+        yield ''.join(encode(row) for row in chunk)
+
+
+async def aexport(fmt, chunk_size=CHUNK_SIZE):
+    """
+    Async version of :func:`export`.
+    """
+    header, encode = _encoder(fmt)
+    if header:
+        yield header
+    async for chunk in aexport_chunks(chunk_size):
+        yield ''.join(encode(row) for row in chunk)
@@ -0,0 +1,144 @@
+"""
+RSS and Atom feeds of approved articles per publisher and per journalist.
+
+Feed aggregators poll these URLs constantly, so the rendered XML is cached
+under a key that includes the source's own ``<kind>:<id>`` change stamp
+from ``conditional.py``. Approving, editing or deleting one of the source's
+articles, or renaming the source, touches the stamp, which moves the feed to
+a new key; until then every poll is a cache hit, or a 304 when the
+aggregator sends validators. Changes to other sources leave it alone.
+"""
+
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from . import conditional
+from .models import Article, CustomUser, Publisher
+
+
+FEED_LENGTH = 50
+FEED_TIMEOUT = 60 * 60 * 24
+DESCRIPTION_WORDS = 60
+
+
+class SourceFeed(Feed):
+    """
+    Base RSS feed for the approved articles of one source.
+
+    Subclasses set ``model``, the ``Article`` foreign key ``kind`` pointing
+    at it, and ``lookup`` to restrict which rows are sources.
+    """
+    model = None
+    kind = None
+    lookup = {}
+
+    def get_object(self, request, pk):
+        return get_object_or_404(self.model, pk=pk, **self.lookup)
+
+    def items(self, obj):
+        return (
+            Article.objects.filter(is_approved=True, **{self.kind: obj})
+            .select_related('publisher', 'journalist')
+            .order_by('-created_at', '-id')[:FEED_LENGTH]
+        )
+
+    def link(self, obj):
+        return reverse(f'{self.kind}-detail', args=[obj.pk])
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return Truncator(item.content).words(DESCRIPTION_WORDS)
+
+    def item_link(self, item):
+        return reverse('article_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.journalist.username if item.journalist else None
+
+
+class PublisherFeed(SourceFeed):
+    """Latest approved articles of one publisher."""
+    model = Publisher
+    kind = 'publisher'
+
+    def title(self, obj):
+        return f"{obj.name} – latest articles"
+
+    def description(self, obj):
+        return f"Approved articles published by {obj.name}."
+
+
+class JournalistFeed(SourceFeed):
+    """Latest approved articles of one journalist."""
+    model = CustomUser
+    kind = 'journalist'
+    lookup = {'role': 'journalist'}
+
+    def title(self, obj):
+        return f"{obj.username} – latest articles"
+
+    def description(self, obj):
+        return f"Approved articles written by {obj.username}."
+
+
+class PublisherAtomFeed(PublisherFeed):
+    feed_type = Atom1Feed
+    subtitle = PublisherFeed.description
+
+
+class JournalistAtomFeed(JournalistFeed):
+    feed_type = Atom1Feed
+    subtitle = JournalistFeed.description
+
+
+def feed_stamps(kind):
+    def stamps(request, pk, **kwargs):
+        return [f'{kind}:{pk}']
+    return stamps
+
+
+def cached_feed(feed):
+    """
+    Build a view serving ``feed`` from the cache.
+
+    Args:
+        feed (SourceFeed): Feed instance.
+
+    Returns:
+        callable: The view, taking the source ``pk``.
+    """
+    stamps = feed_stamps(feed.kind)
+
+    @conditional.conditional_page(stamps)
+    def view(request, pk):
+        changed = conditional.last_modified(stamps(request, pk))
+        # Links in the XML are absolute, so the host is part of the key.
+        key = f'news_app:feed:{type(feed).__name__}:{pk}:{request.get_host()}:{changed.timestamp()}'
+        cached = cache.get(key)
+        if cached is None:
+            response = feed(request, pk=pk)
+            cached = (response.content, response['Content-Type'])
+            cache.set(key, cached, FEED_TIMEOUT)
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    return view
+
+
+publisher_rss = cached_feed(PublisherFeed())
+publisher_atom = cached_feed(PublisherAtomFeed())
+journalist_rss = cached_feed(JournalistFeed())
+journalist_atom = cached_feed(JournalistAtomFeed())
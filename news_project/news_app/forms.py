@@ -1,5 +1,6 @@
 from django import forms
 from .models import Article
+from . import duplicates
 
 class ArticleForm(forms.ModelForm):
     """
@@ -12,4 +13,20 @@ class ArticleForm(forms.ModelForm):
     """
     class Meta:
         model = Article
-        fields = ['title', 'content', 'publisher']
\ No newline at end of file
+        fields = ['title', 'content', 'publisher']
+
+    def clean(self):
+        """
+        Refuse text that near-duplicates an article already submitted.
+        """
+        cleaned_data = super().clean()
+        title, content = cleaned_data.get('title'), cleaned_data.get('content')
+        if title and content:
+            matches = duplicates.find(title, content, exclude=self.instance.pk)
+            if matches:
+                original = Article.objects.only('title').get(pk=matches[0][0])
+                raise forms.ValidationError(
+                    'This article is a near-duplicate of "%(title)s".',
+                    code='duplicate', params={'title': original.title},
+                )
+        return cleaned_data
\ No newline at end of file
@@ -0,0 +1,359 @@
+"""
+Streaming bulk import of articles.
+
+Records are read lazily from a JSONL or CSV stream and pass through a
+generator pipeline::
+
+    read_records -> skip already imported -> build_article -> batched
+
+Only one batch is held in memory at a time. Publishers and journalists are
+resolved through in-memory maps loaded once up front, so building an
+article costs no queries. Each batch is written in its own transaction with
+``bulk_create`` and a bulk insert into the ``published_articles`` through
+table; the search index and reader timelines are updated set-wise in the
+batch, since an import is already offline work. Per-row signals are not
+fired.
+
+Records that near-duplicate an existing article, or an earlier record of
+the same batch, go to the reject file instead (see ``duplicates.py``).
+
+After every committed batch the number of consumed input records is written
+to an optional checkpoint file, so an interrupted import can be resumed by
+running it again with the same input. Records that fail validation are
+written as JSON lines to a reject file and skipped.
+"""
+
+import csv
+import json
+import os
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import conditional, counters, duplicates, search, timeline
+from .models import Article, CustomUser, Publisher
+
+
+BATCH_SIZE = 1000
+FAN_OUT_CHUNK = 100
+FORMATS = ('jsonl', 'csv')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't', 'on'}
+
+Authorship = CustomUser.published_articles.through
+
+
+class ImportResult:
+    """
+    Counters for one import run.
+
+    Attributes:
+        consumed (int): Input records read, including skipped and rejected ones.
+        imported (int): Articles created.
+        rejected (int): Records written to the reject file.
+    """
+
+    def __init__(self, consumed=0):
+        self.consumed = consumed
+        self.imported = 0
+        self.rejected = 0
+
+
+class Rejected(Exception):
+    """Raised while building an article from an invalid record."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def read_records(stream, fmt='jsonl'):
+    """
+    Yield ``(line_number, record)`` pairs from a text stream.
+
+    Blank JSONL lines are skipped. A JSONL line that is not a JSON object is
+    yielded as ``{'_error': ...}`` so it ends up in the reject file.
+
+    Args:
+        stream (TextIO): Open input.
+        fmt (str): ``'jsonl'`` or ``'csv'`` (with a header row).
+
+    Yields:
+        tuple[int, dict]: Input position and the raw record.
+    """
+    if fmt == 'csv':
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, record
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            record = {'_error': f"Invalid JSON: {exc}", '_raw': line.rstrip('\n')}
+        if not isinstance(record, dict):
+            record = {'_error': "Expected a JSON object.", '_raw': line.rstrip('\n')}
+        yield number, record
+
+
+def batched(iterable, size):
+    """
+    Yield lists of up to ``size`` items from ``iterable``.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Resolver:
+    """
+    In-memory maps from publisher names and journalist usernames to IDs.
+
+    Args:
+        create_publishers (bool): Create publishers missing from the map
+            instead of rejecting their articles.
+    """
+
+    def __init__(self, create_publishers=False):
+        self.create_publishers = create_publishers
+        self.publishers = dict(Publisher.objects.values_list('name', 'id'))
+        self.journalists = dict(
+            CustomUser.objects.filter(role='journalist').values_list('username', 'id')
+        )
+
+    def publisher_id(self, name):
+        if name in self.publishers:
+            return self.publishers[name]
+        if not self.create_publishers:
+            raise KeyError(name)
+        self.publishers[name] = Publisher.objects.create(name=name).id
+        return self.publishers[name]
+
+    def journalist_id(self, username):
+        return self.journalists[username]
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in TRUE_VALUES
+
+
+def _datetime(value):
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def build_article(record, resolver):
+    """
+    Validate one raw record and turn it into an unsaved ``Article``.
+
+    Recognised keys: ``title``, ``content``, ``publisher`` (name),
+    ``journalist`` (username, optional), ``is_approved`` and ``created_at``
+    (ISO 8601, optional).
+
+    Args:
+        record (dict): Raw input record.
+        resolver (Resolver): Publisher/journalist lookup.
+
+    Returns:
+        Article: The article, not yet saved.
+
+    Raises:
+        Rejected: If the record is invalid.
+    """
+    if '_error' in record:
+        raise Rejected({'record': [record['_error']]})
+
+    errors = {}
+    article = Article(
+        title=(record.get('title') or '').strip(),
+        content=record.get('content') or '',
+        is_approved=_flag(record.get('is_approved')),
+    )
+
+    publisher = (record.get('publisher') or '').strip()
+    if not publisher:
+        errors['publisher'] = ["This field is required."]
+    else:
+        try:
+            article.publisher_id = resolver.publisher_id(publisher)
+        except KeyError:
+            errors['publisher'] = [f"Unknown publisher {publisher!r}."]
+
+    journalist = (record.get('journalist') or '').strip()
+    if journalist:
+        try:
+            article.journalist_id = resolver.journalist_id(journalist)
+        except KeyError:
+            errors['journalist'] = [f"Unknown journalist {journalist!r}."]
+
+    try:
+        article.created_at = _datetime(record.get('created_at'))
+    except ValueError:
+        errors['created_at'] = [f"Invalid datetime {record.get('created_at')!r}."]
+
+    try:
+        # Foreign keys are already resolved; skip their per-row queries.
+        article.full_clean(
+            exclude=['publisher', 'journalist', 'created_at'],
+            validate_unique=False, validate_constraints=False,
+        )
+    except ValidationError as exc:
+        errors.update(exc.message_dict)
+
+    if errors:
+        raise Rejected(errors)
+    article.summarize()
+    return article
+
+
+def _assign_ids(articles, after_id):
+    # MySQL does not return primary keys from bulk_create. Within the batch's
+    # transaction the new rows are the ones above the previous maximum ID,
+    # in insertion order; match them back by title.
+    if all(article.pk for article in articles):
+        return
+    rows = (
+        Article.objects.filter(pk__gt=after_id or 0, title__in={a.title for a in articles})
+        .order_by('pk').values_list('title', 'pk')
+    )
+    ids = {}
+    for title, pk in rows:
+        ids.setdefault(title, []).append(pk)
+    for article in articles:
+        article.pk = ids[article.title].pop(0)
+
+
+def write_batch(articles, fan_out=True):
+    """
+    Insert one batch of articles in a single transaction.
+
+    Args:
+        articles (list[Article]): Validated, unsaved articles.
+        fan_out (bool): Add approved articles to reader timelines.
+    """
+    with transaction.atomic():
+        after_id = None
+        if not connection.features.can_return_rows_from_bulk_insert:
+            after_id = Article.objects.aggregate(last=Max('pk'))['last']
+        Article.objects.bulk_create(articles)
+        _assign_ids(articles, after_id)
+        Authorship.objects.bulk_create(
+            [Authorship(customuser_id=a.journalist_id, article_id=a.pk) for a in articles if a.journalist_id],
+            ignore_conflicts=True,
+        )
+        search.index_articles(articles)
+        duplicates.index_articles(articles)
+        counters.count_articles(articles)
+        if fan_out:
+            # Bound the size of the fan-out rows built in memory.
+            for chunk in batched((a for a in articles if a.is_approved), FAN_OUT_CHUNK):
+                timeline.fan_out(chunk)
+    conditional.touch(conditional.article_stamps(articles))
+
+
+def _duplicate_message(original):
+    if isinstance(original, Article):
+        return f"Near-duplicate of {original.title!r} earlier in this import."
+    return f"Near-duplicate of article {original}."
+
+
+def read_checkpoint(path):
+    """
+    Return the number of input records consumed by a previous run.
+    """
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint:
+        return json.load(checkpoint)['consumed']
+
+
+def write_checkpoint(path, result):
+    if not path:
+        return
+    # Write then rename so an interruption never leaves a torn file.
+    with open(f'{path}.tmp', 'w') as checkpoint:
+        json.dump({
+            'consumed': result.consumed,
+            'imported': result.imported,
+            'rejected': result.rejected,
+            'updated_at': timezone.now().isoformat(),
+        }, checkpoint)
+    os.replace(f'{path}.tmp', path)
+
+
+def import_articles(
+    stream, fmt='jsonl', batch_size=BATCH_SIZE, rejects=None, checkpoint=None,
+    create_publishers=False, fan_out=True, progress=None, skip_duplicates=True,
+):
+    """
+    Stream articles from ``stream`` into the database.
+
+    Args:
+        stream (TextIO): JSONL or CSV input.
+        fmt (str): Input format, one of ``FORMATS``.
+        batch_size (int): Articles per ``bulk_create`` and transaction.
+        rejects (TextIO): Where invalid records are written as JSON lines.
+        checkpoint (str): Path of the checkpoint file; when it exists the
+            records it covers are skipped.
+        create_publishers (bool): Create unknown publishers on the fly.
+        fan_out (bool): Add approved articles to reader timelines.
+        progress (callable): Called with the ``ImportResult`` after each batch.
+        skip_duplicates (bool): Reject records that near-duplicate an
+            existing article or an earlier record.
+
+    Returns:
+        ImportResult: Counters for this run.
+    """
+    result = ImportResult(consumed=read_checkpoint(checkpoint))
+    resolver = Resolver(create_publishers=create_publishers)
+    records = read_records(stream, fmt)
+    # Skip what an earlier run already committed.
+    records = (item for item in records if item[0] > result.consumed)
+
+    def reject(number, record, errors):
+        result.rejected += 1
+        if rejects is not None:
+            rejects.write(json.dumps({'line': number, 'errors': errors, 'record': record}) + '\n')
+
+    def articles():
+        for number, record in records:
+            try:
+                article = build_article(record, resolver)
+            except Rejected as exc:
+                reject(number, record, exc.errors)
+                continue
+            finally:
+                result.consumed = number
+            yield number, record, article
+
+    # The generator is paused on the batch's last article while it is
+    # written, so ``result.consumed`` is exactly what the batch covers.
+    for batch in batched(articles(), batch_size):
+        found = duplicates.batch_duplicates([article for _, _, article in batch]) if skip_duplicates else {}
+        for position, original in found.items():
+            number, record, _ = batch[position]
+            reject(number, record, {'duplicate_of': [_duplicate_message(original)]})
+        fresh = [article for position, (_, _, article) in enumerate(batch) if position not in found]
+        if fresh:
+            write_batch(fresh, fan_out=fan_out)
+        result.imported += len(fresh)
+        write_checkpoint(checkpoint, result)
+        if progress:
+            progress(result)
+
+    write_checkpoint(checkpoint, result)
+    return result
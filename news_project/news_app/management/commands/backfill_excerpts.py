@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app.models import Article
+
+
+class Command(BaseCommand):
+    """
+    Compute the stored excerpt and word count of existing articles.
+
+    Walks the article table in primary key order, one batch at a time, and
+    writes the new columns with ``bulk_update`` so ``version`` and
+    ``updated_at`` are left alone. Safe to re-run.
+
+    Usage:
+        python manage.py backfill_excerpts
+        python manage.py backfill_excerpts --batch-size 500 --all
+    """
+    help = "Fill Article.excerpt and Article.word_count for existing rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Articles per batch.")
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Recompute every article, not only those without an excerpt.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        articles = Article.objects.order_by('pk').only('pk', 'content')
+        if not options['all']:
+            articles = articles.filter(excerpt='').exclude(content='')
+        updated, last_pk = 0, 0
+        while True:
+            batch = list(articles.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for article in batch:
+                article.summarize()
+            Article.objects.bulk_update(batch, ['excerpt', 'word_count'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} article(s)."))
@@ -0,0 +1,34 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app import recommendations
+
+
+class Command(BaseCommand):
+    """
+    Recompute every reader's "suggested for you" publishers and journalists.
+
+    Meant to run from a scheduler, e.g. nightly. Requires NumPy.
+
+    Usage:
+        python manage.py build_suggestions
+        python manage.py build_suggestions --chunk-size 5000 --limit 10
+    """
+    help = "Suggest publishers and journalists to readers from co-subscriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=recommendations.CHUNK_SIZE,
+            help="Readers loaded per chunk.",
+        )
+        parser.add_argument(
+            '--limit', type=int, default=recommendations.TOP_K,
+            help="Publishers and journalists suggested to each reader.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            written = recommendations.build(chunk_size=options['chunk_size'], limit=options['limit'])
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} suggestion(s)."))
@@ -0,0 +1,67 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app import importing
+
+
+class Command(BaseCommand):
+    """
+    Stream articles from a JSONL or CSV file (or stdin) into the database.
+
+    Usage:
+        python manage.py import_articles feed.jsonl --checkpoint feed.ckpt --rejects feed.rejects
+        zcat feed.csv.gz | python manage.py import_articles - --format csv
+    """
+    help = "Bulk import articles in batches, with checkpoints and a reject file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin.")
+        parser.add_argument('--format', choices=importing.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=importing.BATCH_SIZE)
+        parser.add_argument('--checkpoint', help="File recording progress; an existing one resumes the import.")
+        parser.add_argument('--rejects', help="File that invalid records are appended to as JSON lines.")
+        parser.add_argument(
+            '--create-publishers', action='store_true', help="Create unknown publishers instead of rejecting.",
+        )
+        parser.add_argument(
+            '--skip-feeds', action='store_true',
+            help="Do not fan approved articles out to timelines (run rebuild_feeds afterwards).",
+        )
+        parser.add_argument(
+            '--allow-duplicates', action='store_true',
+            help="Import records that near-duplicate an existing article instead of rejecting them.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        fmt = options['format']
+        if fmt is None:
+            fmt = 'csv' if options['path'].endswith('.csv') else 'jsonl'
+
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        rejects = open(options['rejects'], 'a', encoding='utf-8') if options['rejects'] else None
+        try:
+            result = importing.import_articles(
+                stream,
+                fmt=fmt,
+                batch_size=options['batch_size'],
+                rejects=rejects,
+                checkpoint=options['checkpoint'],
+                create_publishers=options['create_publishers'],
+                fan_out=not options['skip_feeds'],
+                skip_duplicates=not options['allow_duplicates'],
+                progress=lambda result: self.stdout.write(
+                    f"{result.consumed} record(s) read, {result.imported} imported, {result.rejected} rejected."
+                ),
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects is not None:
+                rejects.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.imported} article(s); rejected {result.rejected}."
+        ))
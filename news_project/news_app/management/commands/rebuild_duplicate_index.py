@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from news_app import duplicates
+from news_app.models import Article
+
+
+class Command(BaseCommand):
+    """
+    Recompute the near-duplicate fingerprints of every article.
+
+    Usage:
+        python manage.py rebuild_duplicate_index
+        python manage.py rebuild_duplicate_index --batch-size 500
+    """
+    help = "Rebuild the MinHash/LSH index used to detect near-duplicate articles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=duplicates.BATCH_SIZE,
+            help="Articles fingerprinted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        articles = Article.objects.order_by('pk').only('id', 'title', 'content')
+        indexed = last_pk = 0
+        while batch := list(articles.filter(pk__gt=last_pk)[:options['batch_size']]):
+            duplicates.index_articles(batch)
+            indexed += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} article(s)."))
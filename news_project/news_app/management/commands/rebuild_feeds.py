@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from news_app import timeline
+from news_app.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Rebuild materialized reader timelines from current subscriptions.
+
+    Usage:
+        python manage.py rebuild_feeds
+        python manage.py rebuild_feeds --reader 12 --reader 40
+    """
+    help = "Rebuild reader timelines from their publisher and journalist subscriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reader', action='append', type=int, dest='readers',
+            help="Only rebuild the timeline of this reader ID (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        reader_ids = options['readers']
+        if not reader_ids:
+            reader_ids = CustomUser.objects.filter(role='reader').values_list('pk', flat=True)
+            reader_ids = reader_ids.order_by('pk').iterator(chunk_size=timeline.BATCH_SIZE)
+
+        rebuilt = timeline.rebuild(reader_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} reader timeline(s)."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from news_app import search
+
+
+class Command(BaseCommand):
+    """
+    Create or rebuild the article full-text index.
+
+    Usage:
+        python manage.py rebuild_search_index
+        python manage.py rebuild_search_index --database replica
+    """
+    help = "Rebuild the full-text search index over article titles and content."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias to index.")
+
+    def handle(self, *args, **options):
+        search.rebuild_index(options['database'])
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
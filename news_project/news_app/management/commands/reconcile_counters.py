@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app import counters
+
+
+class Command(BaseCommand):
+    """
+    Recompute denormalized subscriber, follower and article counters.
+
+    Usage:
+        python manage.py reconcile_counters
+        python manage.py reconcile_counters --check
+    """
+    help = "Repair drift in publisher and journalist counter columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report counters that are out of date; exit 1 if any are.",
+        )
+
+    def handle(self, *args, **options):
+        check = options['check']
+        drift = counters.reconcile(fix=not check)
+        for label, rows in drift.items():
+            self.stdout.write(f"{label}: {rows} row(s) {'out of date' if check else 'repaired'}")
+        if check and any(drift.values()):
+            raise CommandError("Counters are out of date; run reconcile_counters to repair them.")
+        self.stdout.write(self.style.SUCCESS("Counters checked." if check else "Counters reconciled."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from news_app import readership
+
+
+class Command(BaseCommand):
+    """
+    Recompute the cached site-wide and per-publisher trending lists.
+
+    Flushes only refresh the lists of the publishers with the most views, so
+    this is meant to run from a scheduler, e.g. every few minutes.
+
+    Usage:
+        python manage.py refresh_trending
+    """
+    help = "Recompute every cached trending list."
+
+    def handle(self, *args, **options):
+        refreshed = readership.refresh_all()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} publisher list(s)."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news_app import seeding
+
+
+class Command(BaseCommand):
+    """
+    Generate a synthetic dataset for load testing.
+
+    Usage:
+        python manage.py seed_data --readers 10000 --articles 200000
+    """
+    help = "Create publishers, journalists, readers, subscriptions and articles with skewed popularity."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--publishers', type=int, default=10)
+        parser.add_argument('--journalists', type=int, default=50)
+        parser.add_argument('--readers', type=int, default=500)
+        parser.add_argument('--articles', type=int, default=2000)
+        parser.add_argument('--subscriptions-per-reader', type=int, default=5)
+        parser.add_argument('--follows-per-reader', type=int, default=10)
+        parser.add_argument('--approved-ratio', type=float, default=0.8)
+        parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent for popularity.")
+        parser.add_argument('--prefix', default='seed', help="Prefix for generated names.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+        parser.add_argument('--skip-feeds', action='store_true', help="Do not rebuild reader timelines.")
+
+    def handle(self, *args, **options):
+        if options['articles'] and not options['publishers']:
+            raise CommandError("Articles need at least one publisher.")
+
+        counts = seeding.seed(
+            publishers=options['publishers'],
+            journalists=options['journalists'],
+            readers=options['readers'],
+            articles=options['articles'],
+            subscriptions_per_reader=options['subscriptions_per_reader'],
+            follows_per_reader=options['follows_per_reader'],
+            approved_ratio=options['approved_ratio'],
+            skew=options['skew'],
+            prefix=options['prefix'],
+            random_seed=options['seed'],
+            build_feeds=not options['skip_feeds'],
+        )
+        summary = ', '.join(f"{count} {kind}" for kind, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from news_app import digests
+
+
+class Command(BaseCommand):
+    """
+    Send hourly and daily digests to readers who chose them.
+
+    Meant to run from a scheduler at least once per period; extra runs send
+    nothing until the next period closes.
+
+    Usage:
+        python manage.py send_digests
+        python manage.py send_digests --frequency daily --batch-size 200
+    """
+    help = "Send each due reader one email listing the articles approved in their period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequency', action='append', choices=sorted(digests.PERIODS), dest='frequencies',
+            help="Only send this frequency (repeatable). Defaults to all.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=digests.BATCH_SIZE,
+            help="Readers handled per batch.",
+        )
+
+    def handle(self, *args, **options):
+        for frequency in options['frequencies'] or sorted(digests.PERIODS):
+            closed, sent = digests.send(frequency, batch_size=options['batch_size'])
+            self.stdout.write(f"{frequency}: closed {closed} reader period(s), sent {sent} digest(s).")
+        pruned = digests.prune()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} digest entr{'y' if pruned == 1 else 'ies'}."))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from news_app import outbox
+
+
+class Command(BaseCommand):
+    """
+    Fan out approved articles and deliver their notifications from the outbox.
+
+    Usage:
+        python manage.py send_outbox
+        python manage.py send_outbox --loop --interval 10
+    """
+    help = "Send pending subscriber notifications in chunks over one mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help="Outbox rows per pass.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=outbox.CHUNK_SIZE,
+            help="Recipients fetched and sent per round-trip.",
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=outbox.MAX_ATTEMPTS,
+            help="Failed attempts after which a row is given up on.",
+        )
+        parser.add_argument('--loop', action='store_true', help="Keep draining until interrupted.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when idle.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed, sent = outbox.drain(
+                limit=options['limit'],
+                chunk_size=options['chunk_size'],
+                max_attempts=options['max_attempts'],
+            )
+            if processed:
+                self.stdout.write(f"Processed {processed} outbox row(s), sent {sent} email(s).")
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
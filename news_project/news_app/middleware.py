@@ -0,0 +1,195 @@
+"""
+Request instrumentation middleware.
+
+``QueryInstrumentationMiddleware`` records, for every request, the number
+of SQL queries, the time spent in the database, the time spent rendering
+templates and the total time. The figures are returned to the client as a
+``Server-Timing`` header and written as one JSON log line on the
+``news_app.metrics`` logger.
+
+Per-view query budgets are configured with ``NEWS_QUERY_BUDGETS``, a dict
+mapping URL names (e.g. ``'reader_dashboard'`` or
+``'admin:news_app_article_changelist'``) to a maximum query count. A request
+over budget is logged as a warning, or raises ``QueryBudgetExceeded`` when
+``NEWS_QUERY_BUDGET_STRICT`` is on (useful in tests).
+
+The middleware works under both WSGI and ASGI. Queries are recorded by a
+wrapper installed once on every database connection, which reports to the
+metrics of the request in the current context, so queries that async views
+run in worker threads are counted too.
+"""
+
+import json
+import logging
+import time
+from asyncio import iscoroutinefunction
+from contextvars import ContextVar
+
+from asgiref.sync import markcoroutinefunction
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+
+logger = logging.getLogger('news_app.metrics')
+
+_current = ContextVar('news_app_request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a view runs more queries than its budget."""
+
+
+class RequestMetrics:
+    """
+    Counters collected while one request is being handled.
+
+    Attributes:
+        queries (int): Number of SQL statements executed.
+        db_time (float): Seconds spent executing SQL.
+        template_time (float): Seconds spent rendering top-level templates.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._render_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database ``execute_wrapper`` hook."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    """``connection_created`` receiver adding the query recorder to a connection."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _instrumented_render(render):
+    def wrapper(self, context):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, context)
+        # Only time the outermost template; includes render inside it.
+        metrics._render_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics._render_depth -= 1
+            if not metrics._render_depth:
+                metrics.template_time += time.perf_counter() - start
+    wrapper._news_app_instrumented = True
+    return wrapper
+
+
+def _install_template_timer():
+    if not getattr(Template.render, '_news_app_instrumented', False):
+        Template.render = _instrumented_render(Template.render)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Measure queries, DB time, template time and total time per request.
+
+    Place it first in ``MIDDLEWARE`` so the totals include the work done by
+    the other middleware (session and user loading). Disabled unless
+    ``NEWS_INSTRUMENTATION`` is true.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NEWS_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _install_template_timer()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections opened before the signal was connected.
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, total):
+        """
+        Add the ``Server-Timing`` header, log the metrics and check the budget.
+        """
+        view = self.view_name(request)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }))
+        self.check_budget(view, metrics.queries)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        """
+        Return the namespaced URL name of the resolved view, if any.
+        """
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None
+        return match.view_name
+
+    @staticmethod
+    def check_budget(view, queries):
+        """
+        Log, or raise in strict mode, when a view exceeds its query budget.
+        """
+        budget = getattr(settings, 'NEWS_QUERY_BUDGETS', {}).get(view)
+        if budget is None or queries <= budget:
+            return
+        message = f"{view} ran {queries} queries (budget {budget})"
+        if getattr(settings, 'NEWS_QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
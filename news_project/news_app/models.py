@@ -1,6 +1,7 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser, Group
+from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
+from django.utils.text import Truncator
 
 
 ROLE_CHOICES = [
@@ -9,6 +10,38 @@ ROLE_CHOICES = [
     ('journalist', 'Journalist'),
 ]
 
+NOTIFICATION_CHOICES = [
+    ('instant', 'One email per article'),
+    ('hourly', 'Hourly digest'),
+    ('daily', 'Daily digest'),
+]
+
+# Article excerpts hold the words shown on list pages (the longest card shows
+# 30) and are capped in characters so they stay an inline VARCHAR.
+EXCERPT_WORDS = 30
+EXCERPT_LENGTH = 500
+
+
+def exclude_counters(instance, kwargs, counters):
+    """
+    Keep a full ``save()`` of an existing row from writing counter columns.
+
+    The counters are changed with ``F()`` updates behind the instance's back
+    (see ``counters.py``), so writing the in-memory values would undo them.
+
+    Args:
+        instance (Model): The instance being saved.
+        kwargs (dict): ``save()`` keyword arguments, updated in place.
+        counters (tuple): Names of the counter fields.
+    """
+    if instance._state.adding or kwargs.get('update_fields') is not None or kwargs.get('force_insert'):
+        return
+    skip = set(counters) | instance.get_deferred_fields()
+    kwargs['update_fields'] = [
+        field.attname for field in instance._meta.concrete_fields
+        if not field.primary_key and field.attname not in skip
+    ]
+
 
 class Publisher(models.Model):
     """
@@ -17,15 +50,32 @@ class Publisher(models.Model):
     Attributes:
         name (str): Name of the publisher.
         description (str): Optional description of the publisher.
+        subscriber_count (int): Number of subscribed readers (denormalized).
+        article_count (int): Number of articles (denormalized).
     """
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
+    subscriber_count = models.PositiveIntegerField(default=0, editable=False)
+    article_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # "Most popular" listings read this index instead of aggregating.
+        indexes = [
+            models.Index(fields=['-subscriber_count'], name='publisher_popularity_idx'),
+        ]
 
     def __str__(self):
         """
         Returns the name of the publisher.
         """
         return self.name
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the publisher without overwriting its counters.
+        """
+        exclude_counters(self, kwargs, ('subscriber_count', 'article_count'))
+        super().save(*args, **kwargs)
     
 
 class CustomUser(AbstractUser):
@@ -38,15 +88,26 @@ class CustomUser(AbstractUser):
         subscribed_journalists (ManyToMany): Journalists followed by a reader.
         bio (str): Optional biography for journalists.
         published_articles (ManyToMany): Articles authored by the journalist.
+        follower_count (int): Number of readers following the journalist (denormalized).
+        article_count (int): Number of articles written as journalist (denormalized).
+        notification_frequency (str): How a reader is told about approvals,
+            one of NOTIFICATION_CHOICES.
+        digest_sent_until (datetime): End of the last period covered by the
+            reader's digest.
     """
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    notification_frequency = models.CharField(
+        max_length=10, choices=NOTIFICATION_CHOICES, default='instant'
+    )
+    digest_sent_until = models.DateTimeField(null=True, blank=True, editable=False)
 
     # Reader-specific fields
     subscribed_publishers = models.ManyToManyField(
         Publisher, blank=True, related_name='subscribers'
     )
     subscribed_journalists = models.ManyToManyField(
-        'self', blank=True, symmetrical=False, related_name='followers'
+        'self', blank=True, symmetrical=False, related_name='followers',
+        limit_choices_to={'role': 'journalist'},
     )
 
     # Journalist-specific fields
@@ -54,13 +115,24 @@ class CustomUser(AbstractUser):
     published_articles = models.ManyToManyField(
         'Article', blank=True, related_name='authors'
     )
+    follower_count = models.PositiveIntegerField(default=0, editable=False)
+    article_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['role', '-follower_count'], name='user_role_followers_idx'),
+            models.Index(
+                fields=['notification_frequency', 'digest_sent_until'], name='user_digest_due_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         """
         Overrides the save method to perform additional actions before saving a user.
 
-        Adjusts the user's fields based on their role and adds the user to the corresponding
-        Django Group.
+        Adjusts the user's fields based on their role. Membership of the role's
+        Django Group is kept in sync by a ``post_save`` receiver, only when the
+        user is created or their role changes (see ``roles.py``).
 
         :param args: Additional arguments passed to the parent save method.
         :param kwargs: Additional keyword arguments passed to the parent save method.
@@ -71,12 +143,8 @@ class CustomUser(AbstractUser):
             
             pass
 
+        exclude_counters(self, kwargs, ('follower_count', 'article_count'))
         super().save(*args, **kwargs)
-
- 
-        group, created = Group.objects.get_or_create(name=self.role)
-        if not self.groups.filter(name=self.role).exists():
-            self.groups.add(group)
             
 
 class Article(models.Model):
@@ -86,13 +154,28 @@ class Article(models.Model):
     Attributes:
         title (str): The title of the article.
         content (str): The main text of the article.
+        excerpt (str): The first ``EXCERPT_WORDS`` words of ``content``,
+            stored so list pages never load the body.
+        word_count (int): Number of words in ``content``.
         publisher (ForeignKey): Publisher of the article.
         journalist (ForeignKey): Journalist who wrote the article.
         is_approved (bool): Whether the article has been approved.
+        is_rejected (bool): Whether an editor turned the article down.
+        claimed_by (ForeignKey): Editor currently reviewing the article.
+        claimed_until (datetime): When that editor's claim lapses.
         created_at (datetime): When the article was created.
+        version (int): Bumped whenever the article, its publisher's name or
+            its journalist's username changes; part of the card cache key.
+        updated_at (datetime): When the article was last changed; the durable
+            fallback for the conditional GET validators.
+        view_count (int): Detail page and API views (flushed from a buffer).
+        trending_score (float): Forward-decayed view score relative to the
+            ``trending_epoch`` tally; see ``readership.py``.
     """
     title = models.CharField(max_length=255)
     content = models.TextField()
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
     publisher = models.ForeignKey(
         Publisher, on_delete=models.CASCADE, related_name='articles'
     )
@@ -101,10 +184,330 @@ class Article(models.Model):
         limit_choices_to={'role': 'journalist'}
     )
     is_approved = models.BooleanField(default=False)
+    is_rejected = models.BooleanField(default=False)
+    claimed_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='claimed_articles',
+    )
+    claimed_until = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(default=timezone.now)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    view_count = models.PositiveBigIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
+
+    class Meta:
+        # Composite indexes backing the keyset-paginated dashboards. InnoDB
+        # appends the primary key to every secondary index, so each one also
+        # covers the ``(created_at, id)`` tie-breaker.
+        indexes = [
+            models.Index(fields=['is_approved', 'created_at'], name='article_approved_created_idx'),
+            models.Index(
+                fields=['publisher', 'is_approved', 'created_at'],
+                name='article_pub_approved_idx',
+            ),
+            models.Index(fields=['journalist', 'created_at'], name='article_journalist_created_idx'),
+            # Moderation queue: pending (not approved, not rejected) oldest first.
+            models.Index(
+                fields=['is_approved', 'is_rejected', 'created_at'],
+                name='article_queue_idx',
+            ),
+            # Trending lists: site-wide and per publisher, best first.
+            models.Index(fields=['is_approved', '-trending_score'], name='article_trending_idx'),
+            models.Index(
+                fields=['publisher', 'is_approved', '-trending_score'],
+                name='article_pub_trending_idx',
+            ),
+        ]
 
     def __str__(self):
         """
         Returns the title of the article.
         """
         return self.title
+
+    def save(self, *args, **kwargs):
+        """
+        Bumps ``version`` so cached article cards are replaced, and refreshes
+        the excerpt when the body is loaded. The view counters are left to
+        the ``F()`` updates in ``readership.flush``.
+
+        An existing row's version is incremented in SQL, like approval does,
+        so concurrent saves never write the same version; the new value is
+        read back from the primary afterwards.
+        """
+        exclude_counters(self, kwargs, ('view_count', 'trending_score'))
+        bump = not self._state.adding and not kwargs.get('force_insert')
+        self.version = models.F('version') + 1 if bump else (self.version or 0) + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = {*update_fields, 'version'}
+            if 'content' in update_fields:
+                update_fields |= {'excerpt', 'word_count'}
+            kwargs['update_fields'] = update_fields
+        if 'content' in self.__dict__:
+            self.summarize()
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(using=self._state.db, fields=['version'])
+
+    def summarize(self):
+        """
+        Compute ``excerpt`` and ``word_count`` from ``content``.
+
+        Called by ``save()``; bulk writers call it before ``bulk_create``.
+        """
+        content = self.content or ''
+        self.word_count = len(content.split())
+        excerpt = Truncator(content).words(EXCERPT_WORDS, truncate=' …')
+        self.excerpt = Truncator(excerpt).chars(EXCERPT_LENGTH)
+
+
+class FeedEntry(models.Model):
+    """
+    A single row in a reader's materialized timeline.
+
+    Entries are written when an article is approved and when a reader
+    subscribes to a new source, so the reader dashboard can be served by
+    one range read over ``(reader, created_at)`` instead of joining the
+    subscription tables against the whole article table.
+
+    Attributes:
+        reader (ForeignKey): Reader who owns this timeline entry.
+        article (ForeignKey): Article shown in the timeline.
+        created_at (datetime): Copy of ``article.created_at`` used for ordering.
+    """
+    reader = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    article = models.ForeignKey(
+        Article, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reader', 'article'], name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['reader', '-created_at', '-article'],
+                name='feed_reader_created_idx',
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Returns a readable description of the entry.
+        """
+        return f"{self.reader} <- {self.article}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Pending subscriber notification for an approved article.
+
+    One row is written in the same transaction as the approval; the
+    ``send_outbox`` worker later fans the article out to its followers'
+    timelines, resolves the audience and delivers the emails in chunks, so
+    approving an article costs the same whatever the number of subscribers.
+
+    Attributes:
+        article (OneToOne): Article whose approval is being announced.
+        status (str): One of ``pending``, ``sent`` or ``failed``.
+        attempts (int): Number of failed delivery attempts so far.
+        next_attempt_at (datetime): Earliest time the worker may retry.
+        last_recipient_id (int): Highest user ID already delivered to, so a
+            retry resumes where the previous attempt stopped.
+        last_error (str): Error message of the last failed attempt.
+        created_at (datetime): When the row was queued.
+        sent_at (datetime): When delivery finished.
+        fanned_out (bool): Whether the article has been added to its
+            followers' timelines since it was last approved.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    article = models.OneToOneField(
+        Article, on_delete=models.CASCADE, related_name='outbox'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_recipient_id = models.BigIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    fanned_out = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+            models.Index(fields=['fanned_out', 'next_attempt_at'], name='outbox_fan_out_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a readable description of the queued notification.
+        """
+        return f"{self.article} ({self.status})"
+
+
+
+class DigestEntry(models.Model):
+    """
+    An approved article waiting to go out in reader digests.
+
+    One row per article, written with the approval; each reader's digest is
+    the entries approved within their period. Rows older than every digest
+    reader's last period are pruned by ``send_digests``.
+
+    Attributes:
+        article (OneToOne): The approved article.
+        approved_at (datetime): When the article was approved.
+    """
+    article = models.OneToOneField(
+        Article, on_delete=models.CASCADE, related_name='digest'
+    )
+    approved_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        """
+        Returns the article title and approval time.
+        """
+        return f"{self.article} ({self.approved_at:%Y-%m-%d %H:%M})"
+
+class Tally(models.Model):
+    """
+    A named site-wide counter, such as the number of articles pending review.
+
+    Updated with ``F()`` increments by ``counters.bump`` so reading it is a
+    primary key lookup instead of a ``COUNT(*)``.
+
+    Attributes:
+        name (str): Counter name.
+        value (int): Current value.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        """
+        Returns the counter name and value.
+        """
+        return f"{self.name}={self.value}"
+
+
+class Suggestion(models.Model):
+    """
+    A publisher or journalist suggested to a reader.
+
+    Written in bulk by the ``build_suggestions`` command from the readers'
+    co-subscriptions (see ``recommendations.py``); exactly one of
+    ``publisher`` and ``journalist`` is set.
+
+    Attributes:
+        reader (ForeignKey): Reader the suggestion is for.
+        publisher (ForeignKey): Suggested publisher.
+        journalist (ForeignKey): Suggested journalist.
+        score (float): Summed similarity to the reader's subscriptions.
+    """
+    reader = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='suggestions'
+    )
+    publisher = models.ForeignKey(
+        Publisher, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    journalist = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['reader', '-score'], name='suggestion_reader_score_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns the reader and the suggested source.
+        """
+        return f"{self.reader} -> {self.publisher or self.journalist}"
+
+
+class Fingerprint(models.Model):
+    """
+    MinHash signature of an article's title and content.
+
+    Maintained by ``duplicates.index_articles`` on save and import, and
+    rebuilt with ``manage.py rebuild_duplicate_index``.
+
+    Attributes:
+        article (OneToOne): The fingerprinted article; also the primary key.
+        signature (bytes): ``duplicates.SLOTS`` packed 64-bit minimums.
+    """
+    article = models.OneToOneField(
+        Article, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint'
+    )
+    signature = models.BinaryField()
+
+    def __str__(self):
+        """
+        Returns the fingerprinted article.
+        """
+        return f"fingerprint of {self.article_id}"
+
+
+class FingerprintBand(models.Model):
+    """
+    One locality-sensitive hashing bucket of a fingerprint.
+
+    Each signature is cut into ``duplicates.BANDS`` bands and every band is
+    hashed to a bucket. Articles sharing any bucket are candidate
+    near-duplicates, so a lookup is an index read on ``bucket`` whatever the
+    size of the archive.
+
+    Attributes:
+        fingerprint (ForeignKey): Fingerprint the band belongs to.
+        bucket (int): Hash of the band's position and values.
+    """
+    fingerprint = models.ForeignKey(
+        Fingerprint, on_delete=models.CASCADE, related_name='bands'
+    )
+    bucket = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        """
+        Returns the article and bucket.
+        """
+        return f"{self.fingerprint_id}: {self.bucket}"
+
+
+class PushMessage(models.Model):
+    """
+    A push event shared between server processes.
+
+    Written by ``push.DatabaseBroker`` and read by every process that has
+    open event streams, in primary key order. Rows older than
+    ``push.RETENTION`` seconds are pruned as new ones are written.
+
+    Attributes:
+        payload (dict): The broker message.
+        created_at (datetime): When it was published.
+    """
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        """
+        Returns the message type and ID.
+        """
+        return f"{self.payload.get('type')} #{self.pk}"
@@ -0,0 +1,121 @@
+"""
+Editor moderation work queue.
+
+Pending articles (neither approved nor rejected) are reviewed oldest
+first. Instead of every editor seeing the whole backlog, an editor claims
+the next batch: the rows are picked with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` along ``article_queue_idx`` and stamped with ``claimed_by`` and a
+lease in ``claimed_until``. Concurrent editors therefore skip each other's
+rows instead of waiting on them, and a batch abandoned by an editor who
+walked away becomes claimable again once its lease expires.
+
+Decisions go through ``approval.approve`` / ``approval.reject`` in batches,
+limited to rows the editor holds or that nobody holds any more, so two
+editors never decide the same article.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import approval, conditional, counters
+from .models import Article
+
+
+BATCH_SIZE = getattr(settings, 'NEWS_MODERATION_BATCH', 20)
+LEASE = timedelta(seconds=getattr(settings, 'NEWS_MODERATION_LEASE', 15 * 60))
+
+
+def pending():
+    """
+    Return the moderation queue in review order.
+    """
+    return Article.objects.filter(is_approved=False, is_rejected=False).order_by('created_at', 'id')
+
+
+def held_by(editor, now=None):
+    """
+    Return the pending articles whose claim ``editor`` currently holds.
+    """
+    return pending().filter(claimed_by=editor, claimed_until__gt=now or timezone.now())
+
+
+def available(editor, now=None):
+    """
+    Return pending articles ``editor`` may decide: their own or unclaimed ones.
+    """
+    now = now or timezone.now()
+    return pending().filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lte=now) | Q(claimed_by=editor)
+    )
+
+
+def claim(editor, limit=BATCH_SIZE, lease=LEASE):
+    """
+    Top the editor's batch up to ``limit`` articles and renew its lease.
+
+    Args:
+        editor (CustomUser): The claiming editor.
+        limit (int): Size of the batch to hold.
+        lease (timedelta): How long the claims last.
+
+    Returns:
+        int: Number of articles held after the claim.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        held = list(held_by(editor, now).select_for_update().values_list('id', flat=True))
+        wanted = limit - len(held)
+        fresh = []
+        if wanted > 0:
+            fresh = list(
+                pending().filter(Q(claimed_until__isnull=True) | Q(claimed_until__lte=now))
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:wanted]
+            )
+        Article.objects.filter(id__in=held + fresh).update(claimed_by=editor, claimed_until=now + lease)
+    conditional.touch([f'editor:{editor.pk}'])
+    return len(held) + len(fresh)
+
+
+def release(editor):
+    """
+    Give back every claim the editor holds.
+
+    Returns:
+        int: Number of articles released.
+    """
+    released = Article.objects.filter(claimed_by=editor).update(claimed_by=None, claimed_until=None)
+    conditional.touch([f'editor:{editor.pk}'])
+    return released
+
+
+def decide(editor, article_ids, approve=True):
+    """
+    Approve or reject a batch of articles on behalf of ``editor``.
+
+    Articles claimed by another editor with a live lease are skipped; the
+    claim check is part of the approval service's locking read.
+
+    Args:
+        editor (CustomUser): The deciding editor.
+        article_ids (Iterable[int]): Articles to decide.
+        approve (bool): Approve when true, reject otherwise.
+
+    Returns:
+        int: Number of articles that were decided.
+    """
+    articles = available(editor).filter(id__in=list(article_ids))
+    decided = approval.approve(articles) if approve else approval.reject(articles)
+    conditional.touch([f'editor:{editor.pk}'])
+    return decided
+
+
+def pending_count():
+    """
+    Return the size of the queue from the maintained ``pending`` tally.
+    """
+    return counters.tally('pending')
@@ -0,0 +1,327 @@
+"""
+Transactional email outbox for approval notifications.
+
+Approving an article only writes one ``EmailOutbox`` row. The
+``send_outbox`` management command drains due rows: it first adds each
+article to its followers' timelines (``timeline.fan_out``), then streams
+the audience as ``(id, email)`` pairs in chunks and hands every chunk to a
+single reused SMTP connection. Failures are retried with exponential
+backoff, resuming after the last recipient that was delivered. A
+re-approved article is fanned out again but not announced twice.
+
+When the app is served over ASGI, approval views also start delivery of the
+new rows right away as a background task on the event loop (``dispatch``);
+the worker remains the fallback for anything that task does not finish.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import timeline
+from .models import CustomUser, EmailOutbox
+
+
+logger = logging.getLogger(__name__)
+
+FROM_EMAIL = getattr(settings, 'NEWS_NOTIFICATION_FROM_EMAIL', 'noreply@newsapp.com')
+CHUNK_SIZE = 500
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 60
+MAX_BACKOFF_SECONDS = 60 * 60
+
+# Strong references to running delivery tasks; the event loop keeps only weak ones.
+_tasks = set()
+
+
+def enqueue(article):
+    """
+    Queue the approval notification for an article.
+
+    Must be called inside the transaction that approves the article. An
+    article is only ever announced once, however many times it is saved.
+    Saves fan the article out themselves (see ``signals.py``), so the row is
+    queued as already fanned out.
+
+    Args:
+        article (Article): The approved article.
+
+    Returns:
+        EmailOutbox: The queued (or already existing) outbox row.
+    """
+    entry, _ = EmailOutbox.objects.get_or_create(article=article, defaults={'fanned_out': True})
+    return entry
+
+
+def audience(article):
+    """
+    Return the users to notify about an article, without joining duplicates.
+
+    Args:
+        article (Article): The approved article.
+
+    Returns:
+        QuerySet: ``CustomUser`` rows subscribed to the publisher or
+        following the journalist, ordered by ID. Readers who chose a digest
+        are left out; ``digests`` covers them.
+    """
+    subscribed = Q(id__in=CustomUser.subscribed_publishers.through.objects.filter(
+        publisher_id=article.publisher_id
+    ).values('customuser_id'))
+    if article.journalist_id:
+        subscribed |= Q(id__in=CustomUser.subscribed_journalists.through.objects.filter(
+            to_customuser_id=article.journalist_id
+        ).values('from_customuser_id'))
+    return (
+        CustomUser.objects.filter(subscribed, notification_frequency='instant')
+        .exclude(email='').order_by('id')
+    )
+
+
+def build_message(article, email):
+    """
+    Build the notification sent to one subscriber.
+
+    Args:
+        article (Article): The approved article.
+        email (str): Recipient address.
+
+    Returns:
+        EmailMessage: The unsent message.
+    """
+    return EmailMessage(
+        subject=f"New Article: {article.title}",
+        body=article.content,
+        from_email=FROM_EMAIL,
+        to=[email],
+    )
+
+
+def backoff(attempts):
+    """
+    Return the delay before retry number ``attempts``.
+
+    Args:
+        attempts (int): Failed attempts so far (1 for the first retry).
+
+    Returns:
+        timedelta: Exponential delay capped at ``MAX_BACKOFF_SECONDS``.
+    """
+    return timedelta(seconds=min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def deliver(entry, connection, chunk_size=CHUNK_SIZE):
+    """
+    Fan out one outbox row's article and send its outstanding emails.
+
+    Progress is saved after each step and chunk, so if the connection drops
+    the next attempt starts from the first undelivered recipient. Rows that
+    were already announced only get the fan-out.
+
+    Args:
+        entry (EmailOutbox): Row to deliver.
+        connection: Open mail backend connection.
+        chunk_size (int): Recipients fetched and sent per round-trip.
+
+    Returns:
+        int: Number of emails sent.
+    """
+    article = entry.article
+    if not entry.fanned_out:
+        timeline.fan_out([article])
+        entry.fanned_out = True
+        entry.save(update_fields=['fanned_out'])
+    if entry.status != EmailOutbox.PENDING:
+        return 0
+
+    recipients = audience(article).values_list('id', 'email')
+    sent = 0
+    while True:
+        chunk = list(recipients.filter(id__gt=entry.last_recipient_id)[:chunk_size])
+        if not chunk:
+            break
+        connection.send_messages([build_message(article, email) for _, email in chunk])
+        sent += len(chunk)
+        entry.last_recipient_id = chunk[-1][0]
+        entry.save(update_fields=['last_recipient_id'])
+
+    entry.status = EmailOutbox.SENT
+    entry.sent_at = timezone.now()
+    entry.save(update_fields=['status', 'sent_at'])
+    return sent
+
+
+def claim(limit, lease=timedelta(minutes=10), article_ids=None):
+    """
+    Claim due outbox rows for this worker.
+
+    Claimed rows have ``next_attempt_at`` pushed forward by ``lease`` in a
+    short transaction (using ``SKIP LOCKED`` where the database supports it),
+    so concurrent workers never pick the same row and a crashed worker's rows
+    become due again once the lease expires.
+
+    Args:
+        limit (int): Maximum number of rows to claim.
+        lease (timedelta): How long the claim is held.
+        article_ids (Iterable[int], optional): Only claim rows for these articles.
+
+    Returns:
+        list[EmailOutbox]: Claimed rows with their articles joined.
+    """
+    now = timezone.now()
+    rows = EmailOutbox.objects.filter(
+        Q(status=EmailOutbox.PENDING) | Q(fanned_out=False), next_attempt_at__lte=now,
+    )
+    if article_ids is not None:
+        rows = rows.filter(article_id__in=list(article_ids))
+    with transaction.atomic():
+        due = list(
+            rows.select_for_update(skip_locked=True)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        EmailOutbox.objects.filter(id__in=due).update(next_attempt_at=now + lease)
+    return list(EmailOutbox.objects.filter(id__in=due).select_related('article'))
+
+
+def drain(limit=100, chunk_size=CHUNK_SIZE, max_attempts=MAX_ATTEMPTS, article_ids=None):
+    """
+    Deliver due outbox rows over a single mail connection.
+
+    Args:
+        limit (int): Maximum number of outbox rows to process.
+        chunk_size (int): Recipients sent per round-trip.
+        max_attempts (int): Attempts after which a row is marked failed.
+        article_ids (Iterable[int], optional): Only deliver rows for these articles.
+
+    Returns:
+        tuple: ``(rows_processed, emails_sent)``.
+    """
+    due = claim(limit, article_ids=article_ids)
+    if not due:
+        return 0, 0
+
+    sent = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        for entry in due:
+            fail(entry, exc, max_attempts)
+        raise
+    try:
+        for position, entry in enumerate(due):
+            try:
+                sent += deliver(entry, connection, chunk_size)
+            except Exception as exc:
+                fail(entry, exc, max_attempts)
+                # Start the next row on a fresh connection. If the server
+                # cannot be reached, give the rest of the batch back now
+                # rather than leaving it claimed until the lease expires.
+                try:
+                    connection.close()
+                    connection.open()
+                except Exception as reconnect_exc:
+                    for remaining in due[position + 1:]:
+                        fail(remaining, reconnect_exc, max_attempts)
+                    raise
+    finally:
+        connection.close()
+    return len(due), sent
+
+
+def fail(entry, exc, max_attempts=MAX_ATTEMPTS):
+    """
+    Record a failed attempt and schedule the row's retry.
+
+    Args:
+        entry (EmailOutbox): Claimed row.
+        exc (Exception): The error.
+        max_attempts (int): Attempts after which a pending row is marked failed.
+    """
+    entry.attempts += 1
+    entry.last_error = str(exc)
+    entry.next_attempt_at = timezone.now() + backoff(entry.attempts)
+    if entry.attempts >= max_attempts and entry.status == EmailOutbox.PENDING:
+        entry.status = EmailOutbox.FAILED
+    entry.save(update_fields=['attempts', 'last_error', 'next_attempt_at', 'status'])
+    logger.warning(
+        "Outbox delivery for article %s failed (attempt %s): %s",
+        entry.article_id, entry.attempts, exc,
+    )
+
+
+def enqueue_many(articles):
+    """
+    Queue the fan-out and notifications of several articles with one upsert.
+
+    Articles that were already announced keep their row and are only
+    marked for fan-out again, due now.
+
+    Args:
+        articles (Iterable[Article]): The approved articles.
+    """
+    EmailOutbox.objects.bulk_create(
+        [EmailOutbox(article_id=article.id) for article in articles],
+        batch_size=CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=['article'],
+        update_fields=['fanned_out', 'next_attempt_at'],
+    )
+
+
+def _drain_in_thread(article_ids):
+    try:
+        return drain(limit=len(article_ids), article_ids=article_ids)
+    finally:
+        # Pool threads outlive the task; don't leave their connections open.
+        connections.close_all()
+
+
+def _task_done(task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background outbox delivery failed: %s", task.exception())
+
+
+async def adeliver(article_ids):
+    """
+    Deliver the outbox rows of the given articles without blocking the loop.
+
+    SMTP and the outbox bookkeeping are blocking, so they run in a pool
+    thread with its own database connection while the event loop keeps
+    serving requests.
+
+    Args:
+        article_ids (list[int]): Newly approved articles.
+
+    Returns:
+        tuple: ``(rows_processed, emails_sent)``.
+    """
+    return await sync_to_async(_drain_in_thread, thread_sensitive=False)(list(article_ids))
+
+
+def dispatch(article_ids):
+    """
+    Start delivering notifications for ``article_ids`` as a background task.
+
+    Only call this from code running on a long-lived event loop (an ASGI
+    server); rows the task does not deliver are picked up by ``send_outbox``.
+
+    Args:
+        article_ids (Iterable[int]): Newly approved articles.
+
+    Returns:
+        asyncio.Task: The delivery task.
+    """
+    task = asyncio.get_running_loop().create_task(adeliver(article_ids))
+    _tasks.add(task)
+    task.add_done_callback(_task_done)
+    return task
@@ -0,0 +1,223 @@
+"""
+Keyset (cursor) pagination for the dashboards, and an estimated-count
+paginator for the admin.
+
+Pages are addressed by the ``(created_at, id)`` of the row at their edge
+instead of an OFFSET, so fetching page 1 or page 10,000 is the same index
+range scan and pages stay stable while new articles are being approved.
+
+The admin changelists keep Django's numbered pages, but the unfiltered
+total comes from the database's table statistics instead of a
+``COUNT(*)`` over the whole table (see ``EstimatedCountPaginator``).
+"""
+
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+PAGE_SIZE = getattr(settings, 'NEWS_PAGE_SIZE', 20)
+
+
+def encode_cursor(created_at, pk):
+    """
+    Encode a row position as an opaque URL-safe token.
+
+    Args:
+        created_at (datetime): Timestamp of the row.
+        pk (int): Tie-breaking primary key of the row.
+
+    Returns:
+        str: The cursor token.
+    """
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a token produced by :func:`encode_cursor`.
+
+    Args:
+        token (str): The cursor token, possibly empty or tampered with.
+
+    Returns:
+        tuple | None: ``(created_at, pk)``, or None if the token is invalid.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """
+    One page of results plus the cursors of its neighbours.
+
+    Attributes:
+        items (list): Rows on this page, newest first.
+        next_cursor (str): Cursor for the page of older rows, or None.
+        previous_cursor (str): Cursor for the page of newer rows, or None.
+    """
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def _window(queryset, request, per_page, keys):
+    # The query for the requested page, fetching one extra row to tell
+    # whether another page follows.
+    time_key, id_key = keys
+    before = decode_cursor(request.GET.get('before'))
+    after = None if before else decode_cursor(request.GET.get('after'))
+    if after:
+        created_at, pk = after
+        queryset = queryset.filter(
+            Q(**{f'{time_key}__gt': created_at})
+            | Q(**{time_key: created_at, f'{id_key}__gt': pk})
+        ).order_by(time_key, id_key)
+    else:
+        if before:
+            created_at, pk = before
+            queryset = queryset.filter(
+                Q(**{f'{time_key}__lt': created_at})
+                | Q(**{time_key: created_at, f'{id_key}__lt': pk})
+            )
+        queryset = queryset.order_by(f'-{time_key}', f'-{id_key}')
+    return queryset[:per_page + 1], before, after
+
+
+def _page(rows, per_page, keys, before, after):
+    time_key, id_key = keys
+
+    def position(row):
+        return encode_cursor(getattr(row, time_key), getattr(row, id_key))
+
+    if after:
+        has_newer = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=position(items[-1]) if items else None,
+            previous_cursor=position(items[0]) if items and has_newer else None,
+        )
+
+    has_older = len(rows) > per_page
+    items = rows[:per_page]
+    return KeysetPage(
+        items,
+        next_cursor=position(items[-1]) if items and has_older else None,
+        previous_cursor=position(items[0]) if items and before else None,
+    )
+
+
+def paginate(queryset, request, per_page=None, keys=('created_at', 'id')):
+    """
+    Return one keyset page of ``queryset``, newest first.
+
+    The request may carry ``?before=<cursor>`` (older rows) or
+    ``?after=<cursor>`` (newer rows); without either the newest page is
+    returned.
+
+    Args:
+        queryset (QuerySet): Rows to paginate; any ordering is replaced.
+        request (HttpRequest): Request carrying the cursor parameters.
+        per_page (int, optional): Page size, defaults to ``NEWS_PAGE_SIZE``.
+        keys (tuple): Timestamp field and tie-breaking ID field.
+
+    Returns:
+        KeysetPage: The requested page.
+    """
+    per_page = per_page or PAGE_SIZE
+    window, before, after = _window(queryset, request, per_page, keys)
+    return _page(list(window), per_page, keys, before, after)
+
+
+async def apaginate(queryset, request, per_page=None, keys=('created_at', 'id')):
+    """
+    Async version of :func:`paginate`, fetching the page with the async ORM.
+    """
+    per_page = per_page or PAGE_SIZE
+    window, before, after = _window(queryset, request, per_page, keys)
+    return _page([row async for row in window], per_page, keys, before, after)
+
+
+# Below this many rows an exact COUNT(*) is cheap and preferred.
+ESTIMATE_THRESHOLD = getattr(settings, 'NEWS_ADMIN_ESTIMATE_THRESHOLD', 10000)
+
+
+def estimated_count(model, using='default'):
+    """
+    Return the row count of ``model``'s table from the planner statistics.
+
+    Args:
+        model (type): Model whose table is counted.
+        using (str): Database alias.
+
+    Returns:
+        int | None: The estimate, or ``None`` where the backend keeps no
+        statistics (SQLite) or they have not been gathered yet.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count of an unfiltered queryset is the table estimate.
+
+    Filtered and searched querysets, and tables smaller than
+    ``ESTIMATE_THRESHOLD``, are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
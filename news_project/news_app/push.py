@@ -0,0 +1,335 @@
+"""
+Server-Sent Events push of newly approved articles.
+
+Open reader dashboards keep one ``text/event-stream`` connection to
+``reader_events``. Each connection is a small ``Listener`` object with a
+bounded queue, parked on the event loop, so one ASGI process can hold
+thousands of idle connections without a thread per connection.
+
+The ``Hub`` (one per process) keeps an in-memory index from publisher and
+journalist IDs to the listeners whose readers follow them, built from the
+cached subscription state when a connection opens. An approval event is
+routed with two dict lookups; no query per event or per connection.
+
+Events travel through a broker chosen by ``NEWS_PUSH_BROKER``. The default
+``DatabaseBroker`` writes each message to the ``PushMessage`` table, and
+every process with open streams polls it every ``POLL_INTERVAL`` seconds
+(one primary key range query, whatever the number of connections), so an
+approval in one worker reaches readers connected to any other. The
+``LocalBroker`` delivers within the process only and is meant for a single
+server process; it logs a warning when ``WEB_CONCURRENCY`` asks for more.
+Other shared pub/sub systems plug in by subclassing ``Broker``.
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import subscriptions
+from .models import Article, PushMessage
+
+
+KEEPALIVE_SECONDS = getattr(settings, 'NEWS_PUSH_KEEPALIVE', 15)
+POLL_INTERVAL = getattr(settings, 'NEWS_PUSH_POLL_INTERVAL', 1)
+QUEUE_SIZE = 100
+# Seconds a PushMessage is kept, and how often (in messages) old ones are pruned.
+RETENTION = 5 * 60
+PRUNE_EVERY = 100
+
+logger = logging.getLogger(__name__)
+
+
+class Listener:
+    """
+    One open event stream.
+
+    Attributes:
+        reader_id (int): The connected reader.
+        publisher_ids (frozenset[int]): Publishers the reader subscribes to.
+        journalist_ids (frozenset[int]): Journalists the reader follows.
+        queue (asyncio.Queue): Events waiting to be written.
+    """
+
+    def __init__(self, reader_id, state):
+        self.reader_id = reader_id
+        self.publisher_ids = state.publisher_ids
+        self.journalist_ids = state.journalist_ids
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def send(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client misses events rather than growing memory.
+            pass
+
+
+class Hub:
+    """
+    Per-process registry of listeners indexed by what they follow.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.by_publisher = defaultdict(set)
+        self.by_journalist = defaultdict(set)
+        self.by_reader = defaultdict(set)
+        self._refreshing = set()
+
+    def __len__(self):
+        return sum(len(listeners) for listeners in self.by_reader.values())
+
+    def _index(self, listener):
+        for publisher_id in listener.publisher_ids:
+            self.by_publisher[publisher_id].add(listener)
+        for journalist_id in listener.journalist_ids:
+            self.by_journalist[journalist_id].add(listener)
+
+    def _unindex(self, listener):
+        for index, keys in (
+            (self.by_publisher, listener.publisher_ids),
+            (self.by_journalist, listener.journalist_ids),
+        ):
+            for key in keys:
+                index[key].discard(listener)
+                if not index[key]:
+                    del index[key]
+
+    def add(self, listener):
+        self.loop = asyncio.get_running_loop()
+        self.by_reader[listener.reader_id].add(listener)
+        self._index(listener)
+        get_broker().listen()
+
+    def remove(self, listener):
+        self._unindex(listener)
+        self.by_reader[listener.reader_id].discard(listener)
+        if not self.by_reader[listener.reader_id]:
+            del self.by_reader[listener.reader_id]
+
+    def listeners_for(self, publisher_id, journalist_id):
+        """
+        Return the listeners following an article's publisher or journalist.
+        """
+        found = set(self.by_publisher.get(publisher_id, ()))
+        if journalist_id is not None:
+            found |= self.by_journalist.get(journalist_id, set())
+        return found
+
+    def dispatch(self, message):
+        """
+        Route one broker message; runs on the hub's event loop.
+        """
+        if message['type'] == 'article':
+            for event in message['articles']:
+                for listener in self.listeners_for(event['publisher_id'], event['journalist_id']):
+                    listener.send(event)
+        elif message['type'] == 'subscriptions':
+            for reader_id in message['reader_ids']:
+                if reader_id in self.by_reader:
+                    task = asyncio.ensure_future(self.refresh(reader_id))
+                    self._refreshing.add(task)
+                    task.add_done_callback(self._refreshing.discard)
+
+    async def refresh(self, reader_id):
+        """
+        Re-index a reader's listeners after their subscriptions changed.
+        """
+        state = await subscriptions.aget_state(_Reader(reader_id))
+        for listener in self.by_reader.get(reader_id, ()):
+            self._unindex(listener)
+            listener.publisher_ids = state.publisher_ids
+            listener.journalist_ids = state.journalist_ids
+            self._index(listener)
+
+    def deliver(self, message):
+        """
+        Hand a message to the hub from any thread.
+        """
+        if self.loop is None or self.loop.is_closed() or not self.by_reader:
+            return
+        self.loop.call_soon_threadsafe(self.dispatch, message)
+
+
+class _Reader:
+    # Minimal stand-in accepted by ``subscriptions.aget_state``.
+    is_authenticated = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class Broker(abc.ABC):
+    """
+    Transport for push messages between processes.
+
+    Subclasses implement ``publish``; every process must pass each message
+    it receives to ``hub.deliver``. ``listen`` is called on the event loop
+    whenever a stream opens, for brokers that receive by polling.
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    @abc.abstractmethod
+    def publish(self, message):
+        """
+        Send a message to the hub of every process.
+
+        Args:
+            message (dict): JSON-serializable message.
+        """
+
+    def listen(self):
+        pass
+
+
+class LocalBroker(Broker):
+    """Deliver messages to this process's hub only."""
+
+    def __init__(self, hub):
+        super().__init__(hub)
+        workers = os.environ.get('WEB_CONCURRENCY', '1')
+        if workers.isdigit() and int(workers) > 1:
+            logger.warning(
+                "LocalBroker only reaches streams in its own process, but WEB_CONCURRENCY=%s; "
+                "readers connected to other workers will miss events. Use DatabaseBroker.",
+                workers,
+            )
+
+    def publish(self, message):
+        self.hub.deliver(message)
+
+
+class DatabaseBroker(Broker):
+    """
+    Share messages between processes through the ``PushMessage`` table.
+
+    A process starts polling when its first stream opens and stops once it
+    has none, so idle workers do not query. Polls read the primary, which
+    sees every committed message without replication lag.
+    """
+
+    def __init__(self, hub):
+        super().__init__(hub)
+        self._task = None
+
+    def publish(self, message):
+        row = PushMessage.objects.create(payload=message)
+        if row.pk % PRUNE_EVERY == 0:
+            PushMessage.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=RETENTION)).delete()
+
+    def listen(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._poll())
+
+    async def _poll(self):
+        messages = PushMessage.objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+        # Messages published before the first stream opened are not replayed.
+        last = (await messages.aaggregate(last=Max('pk')))['last'] or 0
+        while self.hub.by_reader:
+            await asyncio.sleep(POLL_INTERVAL)
+            async for row in messages.filter(pk__gt=last):
+                last = row.pk
+                self.hub.dispatch(row.payload)
+
+
+hub = Hub()
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            path = getattr(settings, 'NEWS_PUSH_BROKER', 'news_app.push.DatabaseBroker')
+            _broker = import_string(path)(hub)
+        return _broker
+
+
+def publish_approved(article_ids):
+    """
+    Announce newly approved articles to connected readers.
+
+    Args:
+        article_ids (Iterable[int]): Approved article IDs.
+    """
+    if not hub.by_reader and isinstance(get_broker(), LocalBroker):
+        return
+    rows = Article.objects.filter(id__in=list(article_ids)).values(
+        'id', 'title', 'created_at', 'publisher_id', 'publisher__name',
+        'journalist_id', 'journalist__username',
+    )
+    events = [
+        {
+            'id': row['id'],
+            'title': row['title'],
+            'created_at': row['created_at'].isoformat(),
+            'publisher_id': row['publisher_id'],
+            'publisher': row['publisher__name'],
+            'journalist_id': row['journalist_id'],
+            'journalist': row['journalist__username'],
+        }
+        for row in rows
+    ]
+    if events:
+        get_broker().publish({'type': 'article', 'articles': events})
+
+
+def publish_subscriptions_changed(reader_ids):
+    """
+    Tell hubs to re-index the given readers' open connections.
+
+    Args:
+        reader_ids (Iterable[int]): Readers whose subscriptions changed.
+    """
+    reader_ids = list(reader_ids)
+    if isinstance(get_broker(), LocalBroker):
+        # Only this process's hub listens, so readers it has no stream for
+        # need no message.
+        reader_ids = [pk for pk in reader_ids if pk in hub.by_reader]
+    if reader_ids:
+        get_broker().publish({'type': 'subscriptions', 'reader_ids': reader_ids})
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: article\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream(reader, keepalive=KEEPALIVE_SECONDS):
+    """
+    Yield SSE frames for one reader until the client disconnects.
+
+    Args:
+        reader (CustomUser): The connected reader.
+        keepalive (float): Seconds of silence before a comment frame is sent.
+
+    Yields:
+        str: Event-stream frames.
+    """
+    listener = Listener(reader.pk, await subscriptions.aget_state(reader))
+    hub.add(listener)
+    try:
+        yield f"retry: {int(keepalive * 1000)}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(listener.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        hub.remove(listener)
@@ -0,0 +1,246 @@
+"""
+Buffered article view counts and trending lists.
+
+Writing a row per page view would put every read on the primary. Instead
+``record`` adds the view to an in-process buffer, and once
+``NEWS_VIEW_FLUSH_INTERVAL`` seconds have passed (or ``BUFFER_LIMIT``
+distinct articles are waiting) the request that notices runs ``flush``:
+one ``UPDATE ... SET view_count = view_count + n`` per distinct ``n``. A
+failed flush is logged and its views stay buffered for the next one; the
+page is served either way. Views buffered by a worker that is killed before
+its next flush are lost, which is an acceptable trade for a popularity
+signal.
+
+Trending uses forward decay. A view at time ``t`` adds
+``2 ** ((t - epoch) / HALF_LIFE)`` to ``Article.trending_score``, where
+``epoch`` is the ``trending_epoch`` tally. Dividing every score by the same
+``2 ** ((now - epoch) / HALF_LIFE)`` gives the decayed score, so ordering by
+the stored value is ordering by the decayed one and old scores never have
+to be rewritten as time passes. When the weights would grow large the
+epoch moves forward and the scores are rescaled once (``rebase``).
+
+After each flush the site-wide list and the lists of the (at most
+``REFRESH_LIMIT``) most viewed publishers are recomputed from
+``article_trending_idx`` / ``article_pub_trending_idx`` and cached as lists
+of IDs, so serving a trending list is a cache read and a primary key
+lookup, and a flush costs the request a bounded number of queries. The
+``refresh_trending`` command recomputes every publisher's list from a
+scheduler.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Article, Tally
+
+
+FLUSH_INTERVAL = getattr(settings, 'NEWS_VIEW_FLUSH_INTERVAL', 30)
+BUFFER_LIMIT = 1000
+HALF_LIFE = getattr(settings, 'NEWS_TRENDING_HALF_LIFE', 6 * 60 * 60)
+TOP_N = getattr(settings, 'NEWS_TRENDING_SIZE', 20)
+# Publisher lists recomputed by one flush.
+REFRESH_LIMIT = getattr(settings, 'NEWS_TRENDING_REFRESH_LIMIT', 20)
+LIST_TIMEOUT = 60 * 60
+# Rebase once view weights reach 2 ** REBASE_HALF_LIVES.
+REBASE_HALF_LIVES = 16
+# Scores below this (in views at the new epoch) are dropped when rebasing.
+SCORE_FLOOR = 1e-3
+EPOCH = 'trending_epoch'
+
+_buffer = Counter()
+_publishers = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+logger = logging.getLogger(__name__)
+
+
+def record(article):
+    """
+    Count one view of ``article``, flushing the buffer when it is due.
+
+    Flush errors are logged rather than raised, so counting a view never
+    fails the page.
+
+    Args:
+        article (Article): The viewed article.
+    """
+    with _lock:
+        _buffer[article.id] += 1
+        _publishers[article.id] = article.publisher_id
+        due = len(_buffer) >= BUFFER_LIMIT or time.monotonic() - _last_flush >= FLUSH_INTERVAL
+    if due:
+        try:
+            flush()
+        except Exception:
+            logger.exception("Flushing buffered article views failed")
+
+
+def drain():
+    """
+    Take the buffered views, leaving the buffer empty.
+
+    Returns:
+        tuple[Counter, dict]: ``{article_id: views}`` and
+        ``{article_id: publisher_id}``.
+    """
+    global _last_flush
+    with _lock:
+        views, publishers = _buffer.copy(), dict(_publishers)
+        _buffer.clear()
+        _publishers.clear()
+        _last_flush = time.monotonic()
+    return views, publishers
+
+
+def flush(now=None):
+    """
+    Write the buffered views and refresh the affected trending lists.
+
+    Views are put back into the buffer if the write fails. Only the
+    ``REFRESH_LIMIT`` publishers with the most views get their list
+    recomputed.
+
+    Args:
+        now (datetime, optional): Time the views are scored at.
+
+    Returns:
+        int: Number of views written.
+    """
+    views, publishers = drain()
+    if not views:
+        return 0
+    now = now or timezone.now()
+    try:
+        with transaction.atomic():
+            weight = 2 ** ((now.timestamp() - epoch(now)) / HALF_LIFE)
+            by_count = {}
+            for article_id, count in views.items():
+                by_count.setdefault(count, []).append(article_id)
+            for count, ids in by_count.items():
+                Article.objects.filter(pk__in=ids).update(
+                    view_count=F('view_count') + count,
+                    trending_score=F('trending_score') + count * weight,
+                )
+    except Exception:
+        with _lock:
+            _buffer.update(views)
+            _publishers.update(publishers)
+        raise
+    by_publisher = Counter()
+    for article_id, count in views.items():
+        by_publisher[publishers[article_id]] += count
+    refresh([publisher_id for publisher_id, _ in by_publisher.most_common(REFRESH_LIMIT)])
+    return sum(views.values())
+
+
+def epoch(now):
+    """
+    Return the current epoch in Unix seconds, rebasing when it is too old.
+
+    Locks the ``trending_epoch`` tally, so concurrent flushes run one after
+    another. Must be called inside a transaction.
+    """
+    row, _ = Tally.objects.select_for_update().get_or_create(
+        name=EPOCH, defaults={'value': int(now.timestamp())}
+    )
+    if now.timestamp() - row.value >= REBASE_HALF_LIVES * HALF_LIFE:
+        rebase(row, int(now.timestamp()))
+    return row.value
+
+
+def rebase(row, new_epoch):
+    """
+    Move the locked epoch ``row`` to ``new_epoch`` and rescale every score.
+    """
+    factor = 2 ** ((row.value - new_epoch) / HALF_LIFE)
+    scored = Article.objects.filter(trending_score__gt=0)
+    scored.update(trending_score=F('trending_score') * factor)
+    scored.filter(trending_score__lt=SCORE_FLOOR).update(trending_score=0)
+    row.value = new_epoch
+    row.save(update_fields=['value'])
+
+
+def _list_key(publisher_id):
+    return f'news_app:trending:{publisher_id or "site"}'
+
+
+def top_ids(publisher_id=None, limit=TOP_N):
+    """
+    Read the best scored approved articles from the trending indexes.
+
+    Args:
+        publisher_id (int, optional): Restrict to one publisher.
+        limit (int): Length of the list.
+
+    Returns:
+        list[int]: Article IDs, best first.
+    """
+    articles = Article.objects.filter(is_approved=True, trending_score__gt=0)
+    if publisher_id is not None:
+        articles = articles.filter(publisher_id=publisher_id)
+    return list(articles.order_by('-trending_score', '-id').values_list('id', flat=True)[:limit])
+
+
+def refresh(publisher_ids=()):
+    """
+    Recompute and cache the site-wide list and the given publishers' lists.
+
+    Costs one query per list.
+    """
+    lists = {_list_key(None): top_ids()}
+    for publisher_id in publisher_ids:
+        lists[_list_key(publisher_id)] = top_ids(publisher_id)
+    cache.set_many(lists, LIST_TIMEOUT)
+
+
+def refresh_all(batch_size=REFRESH_LIMIT):
+    """
+    Recompute every list that can have articles, ``batch_size`` publishers
+    per ``cache.set_many``.
+
+    Returns:
+        int: Number of publisher lists refreshed.
+    """
+    publisher_ids = list(
+        Article.objects.filter(is_approved=True, trending_score__gt=0)
+        .order_by('publisher_id').values_list('publisher_id', flat=True).distinct()
+    )
+    refresh()
+    for start in range(0, len(publisher_ids), batch_size):
+        lists = {_list_key(pk): top_ids(pk) for pk in publisher_ids[start:start + batch_size]}
+        cache.set_many(lists, LIST_TIMEOUT)
+    return len(publisher_ids)
+
+
+def trending(publisher_id=None):
+    """
+    Return the cached trending list.
+
+    Args:
+        publisher_id (int, optional): A publisher's list instead of the site's.
+
+    Returns:
+        list[Article]: Approved articles, best first, with publisher and
+        journalist joined and the body deferred.
+    """
+    key = _list_key(publisher_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = top_ids(publisher_id)
+        cache.set(key, ids, LIST_TIMEOUT)
+    if not ids:
+        return []
+    found = (
+        Article.objects.filter(is_approved=True, id__in=ids)
+        .select_related('publisher', 'journalist').defer('content').in_bulk()
+    )
+    return [found[pk] for pk in ids if pk in found]
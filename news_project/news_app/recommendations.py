@@ -0,0 +1,307 @@
+"""
+Co-subscription suggestions for readers.
+
+The ``build_suggestions`` command treats the subscription tables as a
+sparse reader x item matrix ``A``, where the items are every publisher
+followed by every journalist. It builds it in two passes over the readers,
+``CHUNK_SIZE`` at a time, so memory depends on the number of co-followed
+item pairs and the chunk, not on the number of subscriptions, and no
+items x items array is ever allocated:
+
+1. Each chunk is loaded as CSR arrays and its co-subscription counts
+   ``A_chunk.T @ A_chunk`` are taken as vectorized pair counts
+   (``np.unique`` over pair keys ``left * size + right``), so the cost is
+   the sum of squared reader degrees rather than a dense product. The
+   sorted ``(keys, counts)`` of every chunk are merged into one sparse
+   total.
+2. The nonzero counts become cosine similarities, each item keeps its
+   ``NEIGHBOURS`` most similar items (an items x ``NEIGHBOURS`` table), and
+   every reader of each chunk is scored against the neighbours of what they
+   already follow. Only the reader and item pairs reached that way are
+   scored, so a chunk costs its subscriptions times ``NEIGHBOURS`` rather
+   than readers x items. The best ``TOP_K`` publishers and journalists
+   they do not follow yet replace their ``Suggestion`` rows.
+
+The dashboard only reads a reader's stored rows. NumPy is needed by the
+command alone; serving suggestions works without it.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from . import conditional
+from .models import CustomUser, Publisher, Suggestion
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only ``build`` needs it.
+    np = None
+
+
+CHUNK_SIZE = getattr(settings, 'NEWS_SUGGESTION_CHUNK', 1000)
+NEIGHBOURS = 50
+TOP_K = getattr(settings, 'NEWS_SUGGESTIONS', 5)
+
+PublisherSubscription = CustomUser.subscribed_publishers.through
+JournalistFollow = CustomUser.subscribed_journalists.through
+
+
+def reader_chunks(chunk_size=CHUNK_SIZE):
+    """
+    Yield the reader IDs in primary key order, ``chunk_size`` at a time.
+    """
+    readers = CustomUser.objects.filter(role='reader').order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        chunk = list(readers.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        last = chunk[-1]
+        yield chunk
+
+
+def _positions(ids, values):
+    """
+    Locate ``values`` in the sorted array ``ids``.
+
+    Returns:
+        tuple: Positions, and a mask of the values that are present.
+    """
+    if not len(ids):
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(ids, values).clip(max=len(ids) - 1)
+    return positions, ids[positions] == values
+
+
+def _pairs(queryset, *fields):
+    return np.array(list(queryset.values_list(*fields)), dtype=np.int64).reshape(-1, 2)
+
+
+def load_chunk(readers, publishers, journalists):
+    """
+    Load a chunk of readers' subscriptions as CSR arrays.
+
+    Args:
+        readers (list[int]): Sorted reader IDs of the chunk.
+        publishers (ndarray): Sorted publisher IDs; items ``0..P-1``.
+        journalists (ndarray): Sorted journalist IDs; items ``P..``.
+
+    Returns:
+        tuple[ndarray, ndarray]: ``indptr`` (one slot per reader) and the
+        item ``indices`` of each subscription.
+    """
+    first, last = readers[0], readers[-1]
+    subscriptions = PublisherSubscription.objects.filter(customuser_id__gte=first, customuser_id__lte=last)
+    follows = JournalistFollow.objects.filter(from_customuser_id__gte=first, from_customuser_id__lte=last)
+    tables = (
+        (_pairs(subscriptions, 'customuser_id', 'publisher_id'), publishers, 0),
+        (_pairs(follows, 'from_customuser_id', 'to_customuser_id'), journalists, len(publishers)),
+    )
+    reader_ids = np.array(readers, dtype=np.int64)
+    rows, cols = [], []
+    for pairs, items, offset in tables:
+        row, is_reader = _positions(reader_ids, pairs[:, 0])
+        col, is_item = _positions(items, pairs[:, 1])
+        keep = is_reader & is_item
+        rows.append(row[keep])
+        cols.append(col[keep] + offset)
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(len(readers) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(readers)), out=indptr[1:])
+    return indptr, cols[order]
+
+
+def cooccurrence(indptr, indices, size):
+    """
+    Return the nonzero entries of ``A.T @ A`` for one chunk: how many
+    readers follow both items.
+
+    Every reader contributes each ordered pair of the items they follow;
+    the pairs are generated and counted without a Python-level loop.
+
+    Returns:
+        tuple[ndarray, ndarray]: Sorted pair keys ``left * size + right``
+        and their counts. Keys with ``left == right`` hold each item's
+        number of followers.
+    """
+    degrees = np.diff(indptr)
+    squares = degrees * degrees
+    owner = np.repeat(np.arange(len(degrees)), squares)
+    within = np.arange(int(squares.sum())) - np.repeat(np.cumsum(squares) - squares, squares)
+    start, width = indptr[:-1][owner], degrees[owner]
+    left = indices[start + within // width]
+    right = indices[start + within % width]
+    return np.unique(left * size + right, return_counts=True)
+
+
+def merge(keys, counts, more_keys, more_counts):
+    """
+    Add two sparse pair counts.
+
+    Returns:
+        tuple[ndarray, ndarray]: Sorted keys and summed counts.
+    """
+    keys, inverse = np.unique(np.concatenate((keys, more_keys)), return_inverse=True)
+    return keys, np.bincount(inverse, weights=np.concatenate((counts, more_counts))).astype(np.int64)
+
+
+def neighbours(keys, counts, size, limit=NEIGHBOURS):
+    """
+    Keep each item's ``limit`` most similar items by cosine similarity.
+
+    Only the co-followed pairs in ``keys`` are scored; rows with fewer
+    neighbours are padded with similarity zero.
+
+    Returns:
+        tuple[ndarray, ndarray]: Neighbour item indices and similarities,
+        both ``size`` x ``limit``.
+    """
+    rows, cols = np.divmod(keys, size)
+    followers = np.zeros(size)
+    itself = rows == cols
+    followers[rows[itself]] = counts[itself]
+    rows, cols, counts = rows[~itself], cols[~itself], counts[~itself]
+    similarity = counts / np.sqrt(followers[rows] * followers[cols])
+
+    # Rank every row's pairs, most similar first, and keep the first ``limit``.
+    order = np.lexsort((-similarity, rows))
+    rows, cols, similarity = rows[order], cols[order], similarity[order]
+    starts = np.searchsorted(rows, np.arange(size))
+    rank = np.arange(len(rows)) - starts[rows]
+    limit = min(limit, size)
+    keep = rank < limit
+    nearest = np.zeros((size, limit), dtype=np.int64)
+    weights = np.zeros((size, limit))
+    nearest[rows[keep], rank[keep]] = cols[keep]
+    weights[rows[keep], rank[keep]] = similarity[keep]
+    return nearest, weights
+
+
+def score(indptr, indices, nearest, weights, size):
+    """
+    Score the items near what each reader of a chunk follows.
+
+    A reader's score for an item is the summed similarity between it and
+    the items they follow. Items they already follow, and items no
+    neighbour reaches, are left out.
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray]: Reader rows, item columns and
+        scores, sorted by row and column.
+    """
+    owner = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    keys = (owner[:, None] * size + nearest[indices]).ravel()
+    reached = weights[indices].ravel()
+    # Zero weights are the padding of items with few neighbours.
+    keys, reached = keys[reached > 0], reached[reached > 0]
+    keys, inverse = np.unique(keys, return_inverse=True)
+    scores = np.bincount(inverse, weights=reached, minlength=len(keys))
+    unfollowed = ~np.isin(keys, owner * size + indices)
+    rows, cols = np.divmod(keys[unfollowed], size)
+    return rows, cols, scores[unfollowed]
+
+
+def best(rows, cols, scores, limit):
+    """
+    Return the ``limit`` best positive scores of each row.
+
+    Args:
+        rows, cols, scores (ndarray): Sparse scores, as from :func:`score`.
+        limit (int): Entries kept per row.
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray]: Rows, columns and scores, best
+        first within each row.
+    """
+    positive = scores > 0
+    rows, cols, scores = rows[positive], cols[positive], scores[positive]
+    order = np.lexsort((-scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < limit
+    return rows[keep], cols[keep], scores[keep]
+
+
+def build(chunk_size=CHUNK_SIZE, limit=TOP_K):
+    """
+    Recompute every reader's suggestions.
+
+    Args:
+        chunk_size (int): Readers loaded per chunk.
+        limit (int): Publishers and journalists suggested to each reader.
+
+    Returns:
+        int: Number of suggestions written.
+
+    Raises:
+        ImproperlyConfigured: NumPy is not installed.
+    """
+    if np is None:
+        raise ImproperlyConfigured("Building suggestions requires NumPy.")
+    publishers = np.fromiter(Publisher.objects.order_by('pk').values_list('pk', flat=True), dtype=np.int64)
+    journalists = np.fromiter(
+        CustomUser.objects.filter(role='journalist').order_by('pk').values_list('pk', flat=True), dtype=np.int64
+    )
+    size = len(publishers) + len(journalists)
+    if not size:
+        return 0
+
+    keys, counts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    for readers in reader_chunks(chunk_size):
+        keys, counts = merge(keys, counts, *cooccurrence(*load_chunk(readers, publishers, journalists), size))
+    nearest, weights = neighbours(keys, counts, size)
+    del keys, counts
+
+    written = 0
+    kinds = (('publisher_id', publishers, 0, len(publishers)), ('journalist_id', journalists, len(publishers), size))
+    for readers in reader_chunks(chunk_size):
+        indptr, indices = load_chunk(readers, publishers, journalists)
+        rows, cols, scores = score(indptr, indices, nearest, weights, size)
+        suggestions = []
+        for field, ids, start, stop in kinds:
+            kind = (cols >= start) & (cols < stop)
+            for row, col, value in zip(*best(rows[kind], cols[kind] - start, scores[kind], limit)):
+                suggestions.append(Suggestion(reader_id=readers[row], score=float(value), **{field: int(ids[col])}))
+        with transaction.atomic():
+            Suggestion.objects.filter(reader_id__in=readers).delete()
+            Suggestion.objects.bulk_create(suggestions)
+        conditional.touch([f'reader:{pk}' for pk in readers])
+        written += len(suggestions)
+    return written
+
+
+async def asuggested(reader, state, limit=TOP_K):
+    """
+    Return the publishers and journalists to suggest on a reader's dashboard.
+
+    Stored suggestions the reader has since followed are skipped. Readers
+    without suggestions (new readers, or before the first build) get the
+    most followed sources they do not follow yet.
+
+    Args:
+        reader (CustomUser): The reader.
+        state (SubscriptionState): The reader's subscriptions.
+        limit (int): Maximum number of each kind.
+
+    Returns:
+        tuple[list[Publisher], list[CustomUser]]: Best first.
+    """
+    publishers, journalists = [], []
+    stored = Suggestion.objects.filter(reader=reader).select_related('publisher', 'journalist').order_by('-score')
+    async for suggestion in stored:
+        if suggestion.publisher_id and not state.follows_publisher(suggestion.publisher_id):
+            publishers.append(suggestion.publisher)
+        elif suggestion.journalist_id and not state.follows_journalist(suggestion.journalist_id):
+            journalists.append(suggestion.journalist)
+    if not publishers:
+        popular = Publisher.objects.exclude(pk__in=state.publisher_ids).order_by('-subscriber_count', 'pk')
+        publishers = [publisher async for publisher in popular[:limit]]
+    if not journalists:
+        popular = (
+            CustomUser.objects.filter(role='journalist').exclude(pk__in=state.journalist_ids)
+            .order_by('-follower_count', 'pk')
+        )
+        journalists = [journalist async for journalist in popular[:limit]]
+    return publishers[:limit], journalists[:limit]
@@ -0,0 +1,68 @@
+"""
+Role groups.
+
+Every user belongs to the ``Group`` named after their ``role``. The group
+IDs are resolved once per process and kept in a module-level dict, and
+membership is only written when a user is created or their role changes,
+so ordinary saves (``last_login``, profile edits) cost no group queries.
+"""
+
+import threading
+
+from django.contrib.auth.models import Group
+from django.db import IntegrityError, transaction
+
+from .models import ROLE_CHOICES
+
+
+ROLES = tuple(role for role, _ in ROLE_CHOICES)
+
+_group_ids = {}
+_lock = threading.Lock()
+
+
+def group_id(role):
+    """
+    Return the ID of the group for ``role``, creating the group if needed.
+    """
+    try:
+        return _group_ids[role]
+    except KeyError:
+        pass
+    pk = Group.objects.get_or_create(name=role)[0].pk
+    # Only remember IDs that are committed; a rolled back group must not stick.
+    transaction.on_commit(lambda: _remember(role, pk))
+    return pk
+
+
+def _remember(role, pk):
+    with _lock:
+        _group_ids[role] = pk
+
+
+def forget(**kwargs):
+    """
+    Drop the cached group IDs; connected to group deletion and migrations.
+    """
+    with _lock:
+        _group_ids.clear()
+
+
+def sync(user, previous_role=None):
+    """
+    Put ``user`` in their role's group and out of the previous role's.
+
+    Args:
+        user (CustomUser): A saved user.
+        previous_role (str, optional): The role the user had before.
+    """
+    Membership = user.groups.through
+    if previous_role in ROLES and previous_role != user.role:
+        Membership.objects.filter(customuser_id=user.pk, group__name=previous_role).delete()
+    try:
+        with transaction.atomic():
+            user.groups.add(group_id(user.role))
+    except IntegrityError:
+        # The cached group was deleted by another process; look it up again.
+        forget()
+        user.groups.add(group_id(user.role))
@@ -0,0 +1,164 @@
+"""
+Read-replica database routing.
+
+``ReplicaRouter`` sends reads to one of the aliases listed in
+``NEWS_DB_REPLICAS`` only while a request that is allowed to use a replica
+is being handled: a safe (GET/HEAD/OPTIONS) request from a client that has
+not written recently. Everything else, including management commands,
+workers, writes and reads inside a transaction, uses ``default``.
+
+``ReplicaRoutingMiddleware`` opens that window per request. As soon as a
+request writes, the rest of it reads from the primary, and the response
+sets a short-lived cookie pinning the client to the primary for
+``NEWS_DB_PIN_SECONDS``. That way a reader who has just subscribed, or an
+editor who has just approved, sees their own change even if the replica
+lags behind.
+"""
+
+import random
+from asyncio import iscoroutinefunction
+from contextvars import ContextVar
+
+from asgiref.sync import markcoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+PIN_COOKIE = 'news_db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = ContextVar('news_app_db_routing', default=None)
+
+
+class RoutingState:
+    """
+    Routing decisions for one request.
+
+    Attributes:
+        replica (str): Replica alias reads may use, or ``None``.
+        wrote (bool): Whether the request has written to the primary.
+    """
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+def replicas():
+    return list(getattr(settings, 'NEWS_DB_REPLICAS', ()))
+
+
+def pin_seconds():
+    return getattr(settings, 'NEWS_DB_PIN_SECONDS', 15)
+
+
+class ReplicaRouter:
+    """
+    Route reads to a replica inside eligible requests and writes to ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see that transaction's writes and
+        # may take row locks.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe requests from unpinned clients read from a replica.
+
+    Place it before ``SessionMiddleware`` so session writes made while the
+    response is processed also pin the client. The routing state lives in a
+    context variable, so it follows async views into their ORM threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(response, state)
+
+    @staticmethod
+    def start(request):
+        aliases = replicas()
+        eligible = aliases and request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+        return RoutingState(random.choice(aliases) if eligible else None)
+
+    @staticmethod
+    def finish(response, state):
+        if response.streaming and state.replica:
+            # Streamed bodies are read after this returns; keep routing them.
+            if response.is_async:
+                response.streaming_content = _arouted(response.streaming_content, state)
+            else:
+                response.streaming_content = _routed(response.streaming_content, state)
+        if state.wrote and replicas():
+            response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds(), httponly=True, samesite='Lax')
+        return response
+
+
+def _routed(content, state):
+    iterator = iter(content)
+    while True:
+        token = _state.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _state.reset(token)
+        yield chunk
+
+
+async def _arouted(content, state):
+    iterator = aiter(content)
+    try:
+        while True:
+            token = _state.set(state)
+            try:
+                chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+            finally:
+                _state.reset(token)
+            yield chunk
+    finally:
+        if hasattr(iterator, 'aclose'):
+            await iterator.aclose()
@@ -0,0 +1,223 @@
+"""
+Full-text search over article titles and content.
+
+The backend is picked from the database vendor:
+
+* MySQL/MariaDB use a ``FULLTEXT`` index on ``(title, content)`` queried
+  with ``MATCH ... AGAINST``. InnoDB maintains the index itself.
+* SQLite uses an FTS5 table keyed by article ID, kept in sync from the
+  ``Article`` save/delete signals and ranked with ``bm25``.
+* Any other database falls back to ``icontains`` filtering.
+
+The index is created after ``migrate`` and can be rebuilt with
+``manage.py rebuild_search_index``.
+"""
+
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Article
+
+
+FTS_TABLE = 'news_app_article_fts'
+MYSQL_INDEX = 'article_fulltext_idx'
+ADMIN_MATCH_LIMIT = 1000
+
+
+class SearchPage:
+    """
+    One page of ranked search results.
+
+    Attributes:
+        items (list[Article]): Matching articles, best match first.
+        number (int): 1-based page number.
+        has_next (bool): Whether another page of matches exists.
+    """
+
+    def __init__(self, items, number, has_next):
+        self.items = items
+        self.number = number
+        self.has_next = has_next
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+    @property
+    def next_page_number(self):
+        return self.number + 1
+
+    @property
+    def previous_page_number(self):
+        return self.number - 1
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _connection(write=False):
+    alias = router.db_for_write(Article) if write else router.db_for_read(Article)
+    return connections[alias]
+
+
+def _terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+def _fts_query(query):
+    # Quote every term so user input can never be parsed as FTS5 syntax.
+    return ' '.join(f'"{term}"' for term in _terms(query))
+
+
+def ensure_index(using='default'):
+    """
+    Create the full-text index for the given database if it is missing.
+
+    Args:
+        using (str): Database alias.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT 1 FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+                [Article._meta.db_table, MYSQL_INDEX],
+            )
+            if cursor.fetchone() is None:
+                cursor.execute(
+                    f"ALTER TABLE {Article._meta.db_table} "
+                    f"ADD FULLTEXT INDEX {MYSQL_INDEX} (title, content)"
+                )
+        elif connection.vendor == 'sqlite':
+            if FTS_TABLE not in connection.introspection.table_names(cursor):
+                cursor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, content)")
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, content) "
+                    f"SELECT id, title, content FROM {Article._meta.db_table}"
+                )
+
+
+def rebuild_index(using='default'):
+    """
+    Rebuild the SQLite FTS table from scratch; a no-op on MySQL, whose
+    index is maintained by InnoDB.
+
+    Args:
+        using (str): Database alias.
+    """
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    ensure_index(using)
+
+
+def index_articles(articles):
+    """
+    Add or refresh articles in the SQLite FTS table.
+
+    Args:
+        articles (Iterable[Article]): Articles with ``title`` and ``content``.
+    """
+    connection = _connection(write=True)
+    if connection.vendor != 'sqlite':
+        return
+    rows = [(a.id, a.title, a.content) for a in articles]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)", rows
+        )
+
+
+def remove_articles(article_ids):
+    """
+    Drop articles from the SQLite FTS table.
+
+    Args:
+        article_ids (Iterable[int]): Article primary keys.
+    """
+    connection = _connection(write=True)
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in article_ids])
+
+
+def ranked_ids(query, limit, offset=0, approved_only=True):
+    """
+    Return the IDs of the best matching articles, best first.
+
+    Args:
+        query (str): Free-text search query.
+        limit (int): Maximum number of IDs to return.
+        offset (int): Number of matches to skip.
+        approved_only (bool): Restrict matches to approved articles.
+
+    Returns:
+        list[int]: Article IDs ordered by relevance.
+    """
+    if not _terms(query):
+        return []
+
+    connection = _connection()
+    table = Article._meta.db_table
+    approved = f"AND {table}.is_approved" if approved_only else ""
+
+    if connection.vendor == 'mysql':
+        sql = (
+            f"SELECT id FROM {table} "
+            f"WHERE MATCH(title, content) AGAINST (%s IN NATURAL LANGUAGE MODE) {approved} "
+            f"ORDER BY MATCH(title, content) AGAINST (%s IN NATURAL LANGUAGE MODE) DESC, id DESC "
+            f"LIMIT %s OFFSET %s"
+        )
+        params = [query, query, limit, offset]
+    elif connection.vendor == 'sqlite':
+        sql = (
+            f"SELECT {table}.id FROM {FTS_TABLE} "
+            f"JOIN {table} ON {table}.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s {approved} "
+            f"ORDER BY bm25({FTS_TABLE}), {table}.id DESC "
+            f"LIMIT %s OFFSET %s"
+        )
+        params = [_fts_query(query), limit, offset]
+    else:
+        matches = Article.objects.all()
+        for term in _terms(query):
+            matches = matches.filter(Q(title__icontains=term) | Q(content__icontains=term))
+        if approved_only:
+            matches = matches.filter(is_approved=True)
+        return list(matches.order_by('-created_at', '-id').values_list('id', flat=True)[offset:offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(query, page=1, per_page=20, approved_only=True):
+    """
+    Return one page of ranked search results.
+
+    Args:
+        query (str): Free-text search query.
+        page (int): 1-based page number.
+        per_page (int): Results per page.
+        approved_only (bool): Restrict matches to approved articles.
+
+    Returns:
+        SearchPage: The matching articles with publisher and journalist joined.
+    """
+    page = max(int(page), 1)
+    ids = ranked_ids(query, per_page + 1, (page - 1) * per_page, approved_only)
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+    articles = Article.objects.select_related('publisher', 'journalist').defer('content').in_bulk(ids)
+    return SearchPage([articles[pk] for pk in ids if pk in articles], page, has_next)
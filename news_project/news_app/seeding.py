@@ -0,0 +1,198 @@
+"""
+Synthetic dataset generator for load testing.
+
+Builds publishers, journalists, readers, subscription/follow graphs and
+articles with bulk inserts. Popularity is skewed with Zipf-like weights so
+a few publishers and journalists attract most subscribers and articles,
+which is what makes fan-out and dashboard queries expensive in practice.
+Used by ``manage.py seed_data`` and by the benchmark suite.
+"""
+
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters, duplicates, search, timeline
+from .models import Article, CustomUser, Publisher
+
+
+BATCH_SIZE = 1000
+
+WORDS = (
+    "market election climate science health policy city court energy school "
+    "budget report season league study council storm vote trade housing "
+    "transport water data security museum festival research union border "
+    "minister economy harvest coast startup award hospital rail bank"
+).split()
+
+
+def zipf_weights(n, skew):
+    """
+    Return Zipf-like weights ``1 / rank ** skew`` for ``n`` items.
+
+    Args:
+        n (int): Number of items.
+        skew (float): 0 gives uniform popularity; larger is more skewed.
+
+    Returns:
+        list[float]: One weight per item, most popular first.
+    """
+    return [1 / (rank ** skew) for rank in range(1, n + 1)]
+
+
+def weighted_sample(rng, population, weights, k):
+    """
+    Draw up to ``k`` distinct items, favouring heavily weighted ones.
+
+    Args:
+        rng (random.Random): Random source.
+        population (list): Items to draw from.
+        weights (list[float]): Weight of each item.
+        k (int): Number of draws.
+
+    Returns:
+        set: The drawn items.
+    """
+    if not population or k <= 0:
+        return set()
+    return set(rng.choices(population, weights=weights, k=k))
+
+
+def _ensure_ids(objs, key):
+    # MySQL does not return primary keys from bulk_create; look them up by a
+    # field that is unique within the generated batch.
+    if all(obj.pk for obj in objs):
+        return objs
+    model = type(objs[0])
+    ids = dict(
+        model.objects.filter(**{f'{key}__in': [getattr(obj, key) for obj in objs]})
+        .values_list(key, 'pk')
+    )
+    for obj in objs:
+        obj.pk = ids[getattr(obj, key)]
+    return objs
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(
+    publishers=10, journalists=50, readers=500, articles=2000,
+    subscriptions_per_reader=5, follows_per_reader=10, approved_ratio=0.8,
+    skew=1.1, prefix='seed', random_seed=0, build_feeds=True,
+):
+    """
+    Generate a synthetic dataset.
+
+    Args:
+        publishers (int): Number of publishers.
+        journalists (int): Number of journalist users.
+        readers (int): Number of reader users.
+        articles (int): Number of articles.
+        subscriptions_per_reader (int): Publisher subscriptions drawn per reader.
+        follows_per_reader (int): Journalist follows drawn per reader.
+        approved_ratio (float): Share of articles created already approved.
+        skew (float): Zipf exponent for publisher/journalist popularity.
+        prefix (str): Prefix for generated usernames, to allow several runs.
+        random_seed (int): Seed making the dataset reproducible.
+        build_feeds (bool): Rebuild reader timelines once data is loaded.
+
+    Returns:
+        dict: Number of rows created per kind.
+    """
+    rng = random.Random(random_seed)
+    password = make_password('password')
+    now = timezone.now()
+
+    with transaction.atomic():
+        publisher_objs = _ensure_ids(Publisher.objects.bulk_create(
+            [Publisher(name=f"{prefix} publisher {i}") for i in range(publishers)],
+            batch_size=BATCH_SIZE,
+        ), 'name')
+        journalist_objs = _ensure_ids(CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    username=f"{prefix}_journalist{i}", email=f"{prefix}_journalist{i}@example.com",
+                    role='journalist', password=password,
+                )
+                for i in range(journalists)
+            ],
+            batch_size=BATCH_SIZE,
+        ), 'username')
+        reader_objs = _ensure_ids(CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    username=f"{prefix}_reader{i}", email=f"{prefix}_reader{i}@example.com",
+                    role='reader', password=password,
+                )
+                for i in range(readers)
+            ],
+            batch_size=BATCH_SIZE,
+        ), 'username')
+
+    publisher_ids = [p.id for p in publisher_objs]
+    journalist_ids = [j.id for j in journalist_objs]
+    publisher_weights = zipf_weights(len(publisher_ids), skew)
+    journalist_weights = zipf_weights(len(journalist_ids), skew)
+
+    PublisherSubscription = CustomUser.subscribed_publishers.through
+    JournalistFollow = CustomUser.subscribed_journalists.through
+    subscriptions = follows = 0
+    for start in range(0, len(reader_objs), BATCH_SIZE):
+        subscription_rows, follow_rows = [], []
+        for reader in reader_objs[start:start + BATCH_SIZE]:
+            for publisher_id in weighted_sample(rng, publisher_ids, publisher_weights, subscriptions_per_reader):
+                subscription_rows.append(
+                    PublisherSubscription(customuser_id=reader.id, publisher_id=publisher_id)
+                )
+            for journalist_id in weighted_sample(rng, journalist_ids, journalist_weights, follows_per_reader):
+                follow_rows.append(
+                    JournalistFollow(from_customuser_id=reader.id, to_customuser_id=journalist_id)
+                )
+        PublisherSubscription.objects.bulk_create(subscription_rows, batch_size=BATCH_SIZE)
+        JournalistFollow.objects.bulk_create(follow_rows, batch_size=BATCH_SIZE)
+        subscriptions += len(subscription_rows)
+        follows += len(follow_rows)
+
+    Authorship = CustomUser.published_articles.through
+    for start in range(0, articles, BATCH_SIZE):
+        batch = []
+        for i in range(start, min(start + BATCH_SIZE, articles)):
+            batch.append(Article(
+                title=f"{_text(rng, 6).capitalize()} ({prefix}-{i})",
+                content=_text(rng, rng.randint(150, 600)),
+                publisher_id=rng.choices(publisher_ids, weights=publisher_weights)[0],
+                journalist_id=(
+                    rng.choices(journalist_ids, weights=journalist_weights)[0] if journalist_ids else None
+                ),
+                is_approved=rng.random() < approved_ratio,
+                created_at=now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+            ))
+            batch[-1].summarize()
+        with transaction.atomic():
+            batch = _ensure_ids(Article.objects.bulk_create(batch), 'title')
+            Authorship.objects.bulk_create(
+                [Authorship(customuser_id=a.journalist_id, article_id=a.id) for a in batch if a.journalist_id],
+                ignore_conflicts=True,
+            )
+            search.index_articles(batch)
+            duplicates.index_articles(batch)
+
+    # Bulk inserts skip the counter signals; recompute them once.
+    counters.reconcile()
+
+    if build_feeds:
+        timeline.rebuild(r.id for r in reader_objs)
+
+    return {
+        'publishers': len(publisher_objs),
+        'journalists': len(journalist_objs),
+        'readers': len(reader_objs),
+        'subscriptions': subscriptions,
+        'follows': follows,
+        'articles': articles,
+    }
@@ -1,14 +1,86 @@
 from rest_framework import serializers
-from .models import Article, Publisher
+from .models import Article, CustomUser, Publisher
 
 
-class PublisherSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Lets clients request a subset of fields with ``?fields=id,title``.
+
+    Unknown names are ignored; without the parameter every field is returned.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request else None
+        if not requested:
+            return
+        keep = {name.strip() for name in requested.split(',')}
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+
+class SubscriptionStateMixin:
+    """
+    Reads the requesting reader's cached subscription state from the
+    ``subscriptions`` entry of the serializer context.
+    """
+
+    def subscription_state(self):
+        return self.context.get('subscriptions')
+
+
+class PublisherSerializer(SubscriptionStateMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    is_subscribed = serializers.SerializerMethodField()
+
     class Meta:
             model = Publisher
             fields = '__all__'
 
+    def get_is_subscribed(self, publisher):
+        state = self.subscription_state()
+        return state is not None and state.follows_publisher(publisher.id)
+
+
+class JournalistSerializer(SubscriptionStateMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    is_followed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'bio', 'follower_count', 'article_count', 'is_followed']
+
+    def get_is_followed(self, journalist):
+        state = self.subscription_state()
+        return state is not None and state.follows_journalist(journalist.id)
+
+
+class ArticleListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Lightweight article representation for list endpoints.
+
+    Leaves out ``content`` and reads the publisher and journalist names from
+    the joined rows, so a page costs a single query.
+    """
+    publisher_name = serializers.CharField(source='publisher.name', read_only=True)
+    journalist_username = serializers.CharField(
+        source='journalist.username', read_only=True, default=None
+    )
 
-class ArticleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Article
-        fields = '__all__'
\ No newline at end of file
+        fields = [
+            'id', 'title', 'excerpt', 'word_count', 'publisher', 'publisher_name',
+            'journalist', 'journalist_username', 'is_approved', 'created_at', 'view_count',
+        ]
+
+
+class ArticleSerializer(ArticleListSerializer):
+    """
+    Full article representation, including ``content``.
+
+    Fields are listed explicitly so moderation, caching and counter columns
+    (``claimed_by``, ``version``, ``trending_score``...) never reach clients.
+    """
+
+    class Meta(ArticleListSerializer.Meta):
+        fields = ArticleListSerializer.Meta.fields + ['content', 'updated_at']
@@ -1,33 +1,285 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save, m2m_changed
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from .models import Article, CustomUser
+from django.contrib.auth.models import Group
+from .models import Article, CustomUser, Publisher
+from . import (
+    backends, conditional, counters, digests, duplicates, outbox, push, roles, search, subscriptions, timeline,
+)
 
 @receiver(post_save, sender=Article)
 def notify_subscribers_on_approval(sender, instance, created, **kwargs):
+    # Only queue the notification here; the send_outbox worker delivers it.
     if not created and instance.is_approved:
-        subs = set(instance.publisher.subscribers.all())
-        if instance.journalist:
-            subs.update(instance.journalist.followers.all())
-
-        
-        for user in subs:
-            send_mail(
-                subject=f"New Article: {instance.title}",
-                message=instance.content,
-                from_email='noreply@newsapp.com',
-                recipient_list=[user.email],
-                fail_silently=True,
-            )
+        outbox.enqueue(instance)
+        digests.enqueue([instance])
 
 
 @receiver(post_save, sender=CustomUser)
-def clear_irrelevant_m2m(sender, instance, created, **kwargs):
-    if created:
+def sync_role(sender, instance, created, **kwargs):
+    # New users have no relations yet; only a role change leaves stale ones.
+    original = getattr(instance, '_original_role', None)
+    changed = not created and original is not None and original != instance.role
+    if created or changed:
+        roles.sync(instance, original if changed else None)
+    if changed:
         if instance.role == 'reader':
             instance.published_articles.clear()
         elif instance.role == 'journalist':
             instance.subscribed_publishers.clear()
             instance.subscribed_journalists.clear()
+    instance._original_role = instance.role
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_cached_user(sender, instance, **kwargs):
+    backends.forget([instance.pk])
+
+
+@receiver(post_delete, sender=Group)
+def forget_role_groups(sender, **kwargs):
+    roles.forget()
+
+
+@receiver(post_save, sender=Article)
+def update_reader_timelines(sender, instance, created, **kwargs):
+    # Runs before count_saved_article replaces ``_counted_fields``. Only a
+    # change of approval or of source changes whose timelines show the
+    # article; an unknown (deferred) original is treated as a change.
+    if created:
+        if instance.is_approved:
+            timeline.fan_out([instance])
+        return
+    original = getattr(instance, '_counted_fields', {})
+    moved = any(
+        original.get(field, instance.__dict__.get(field)) != instance.__dict__.get(field)
+        for field in ('publisher_id', 'journalist_id')
+    )
+    was_approved = original.get('is_approved')
+    if instance.is_approved:
+        if was_approved is not True or moved:
+            if moved:
+                timeline.retract([instance.id])
+            timeline.fan_out([instance])
+    elif was_approved is not False:
+        timeline.retract([instance.id])
+
+
+def _sync_timelines(action, instance, reverse, pk_set, source_key, related):
+    """
+    Back-fill or prune reader timelines after a subscription change.
+
+    ``source_key`` is the ``timeline`` keyword (``publisher_ids`` or
+    ``journalist_ids``) that the source side of the relation maps to, and
+    ``related`` the reverse accessor used to find readers on a reverse clear.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_reader_ids = list(
+            getattr(instance, related).values_list('pk', flat=True)
+        )
+        return
+    if action == 'post_clear':
+        if reverse:
+            pk_set = set(getattr(instance, '_cleared_reader_ids', ()))
+            action = 'post_remove'
+        else:
+            timeline.rebuild([instance.pk])
+            return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    sync = timeline.backfill if action == 'post_add' else timeline.prune
+    if reverse:
+        for reader_id in pk_set:
+            sync(reader_id, **{source_key: [instance.pk]})
+    else:
+        sync(instance.pk, **{source_key: pk_set})
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_publishers.through)
+def sync_timeline_on_publisher_subscription(sender, instance, action, reverse, pk_set, **kwargs):
+    _sync_timelines(action, instance, reverse, pk_set, 'publisher_ids', 'subscribers')
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_journalists.through)
+def sync_timeline_on_journalist_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    _sync_timelines(action, instance, reverse, pk_set, 'journalist_ids', 'followers')
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_publishers.through)
+@receiver(m2m_changed, sender=CustomUser.subscribed_journalists.through)
+def invalidate_subscription_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        reader_ids = [instance.pk]
+    elif action == 'post_clear':
+        # Stashed by _sync_timelines on pre_clear.
+        reader_ids = getattr(instance, '_cleared_reader_ids', ())
+    else:
+        reader_ids = pk_set or ()
+    reader_ids = list(reader_ids)
+    # Dropped again on commit in case a request re-cached the old state
+    # in between; hubs are only told once the change is visible.
+    subscriptions.invalidate(reader_ids)
+    transaction.on_commit(lambda: subscriptions.invalidate(reader_ids))
+    conditional.touch(f'reader:{pk}' for pk in reader_ids)
+    transaction.on_commit(lambda: push.publish_subscriptions_changed(reader_ids))
+
+
+@receiver(post_save, sender=Article)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'title', 'content'} & set(update_fields):
+        return
+    search.index_articles([instance])
+
+
+@receiver(post_save, sender=Article)
+def update_duplicate_index(sender, instance, update_fields=None, **kwargs):
+    # Saves with the body deferred cannot have changed the text.
+    if 'content' not in instance.__dict__:
+        return
+    if update_fields and not {'title', 'content'} & set(update_fields):
+        return
+    duplicates.index_articles([instance])
+
+
+@receiver(post_delete, sender=Article)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_articles([instance.pk])
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using='default', **kwargs):
+    if sender.name == 'news_app':
+        search.ensure_index(using)
+        # A flush or migration may have recreated the role groups.
+        roles.forget()
+
+
+# Article cards are cached by article version (see cards.py). Renaming a
+# publisher or journalist changes every card that shows the name, so their
+# articles' versions are bumped. The original values are read from
+# __dict__ so deferred fields are never loaded just to remember them.
+
+@receiver(post_init, sender=Publisher)
+def remember_publisher_name(sender, instance, **kwargs):
+    instance._original_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=Publisher)
+def bump_cards_on_publisher_rename(sender, instance, created, **kwargs):
+    original = getattr(instance, '_original_name', None)
+    if not created and original is not None and original != instance.name:
+        Article.objects.filter(publisher=instance).update(version=F('version') + 1)
+    instance._original_name = instance.name
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_user_fields(sender, instance, **kwargs):
+    instance._original_username = instance.__dict__.get('username')
+    instance._original_role = instance.__dict__.get('role')
+
+
+@receiver(post_save, sender=CustomUser)
+def bump_cards_on_username_change(sender, instance, created, **kwargs):
+    original = getattr(instance, '_original_username', None)
+    renamed = not created and original is not None and original != instance.username
+    if renamed:
+        Article.objects.filter(journalist=instance).update(version=F('version') + 1)
+    if instance.role == 'journalist' and (created or renamed):
+        conditional.touch(['directory', f'journalist:{instance.pk}'])
+    instance._original_username = instance.username
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def touch_article_sources(sender, instance, **kwargs):
+    conditional.touch(conditional.article_stamps([instance]))
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+def touch_publisher_directory(sender, instance, **kwargs):
+    conditional.touch(['directory', f'publisher:{instance.pk}'])
+
+
+# Denormalized counters (see counters.py). Removals only count the rows that
+# actually existed, which are looked up before they are deleted.
+
+def _count_subscriptions(action, instance, reverse, pk_set, through, source_key, reader_key, model, field):
+    stash = f'_counted_{through._meta.model_name}'
+    if action in ('pre_remove', 'pre_clear'):
+        rows = through.objects.filter(**{reader_key if not reverse else source_key: instance.pk})
+        if action == 'pre_remove':
+            rows = rows.filter(**{f'{source_key if not reverse else reader_key}__in': pk_set or ()})
+        if reverse:
+            setattr(instance, stash, rows.count())
+        else:
+            setattr(instance, stash, list(rows.values_list(source_key, flat=True)))
+        return
+    if action == 'post_add' and pk_set:
+        added = len(pk_set) if reverse else list(pk_set)
+        sign = 1
+    elif action in ('post_remove', 'post_clear'):
+        added = getattr(instance, stash, None)
+        sign = -1
+    else:
+        return
+    if reverse:
+        counters.adjust(model, field, {instance.pk: sign * (added or 0)})
+    else:
+        counters.adjust(model, field, {pk: sign for pk in added or ()})
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_publishers.through)
+def count_publisher_subscribers(sender, instance, action, reverse, pk_set, **kwargs):
+    _count_subscriptions(
+        action, instance, reverse, pk_set, sender, 'publisher_id', 'customuser_id',
+        Publisher, 'subscriber_count',
+    )
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_journalists.through)
+def count_journalist_followers(sender, instance, action, reverse, pk_set, **kwargs):
+    _count_subscriptions(
+        action, instance, reverse, pk_set, sender, 'to_customuser_id', 'from_customuser_id',
+        CustomUser, 'follower_count',
+    )
+
+
+COUNTED_FIELDS = ('publisher_id', 'journalist_id', 'is_approved', 'is_rejected')
+
+
+@receiver(post_init, sender=Article)
+def remember_counted_fields(sender, instance, **kwargs):
+    # Deferred fields are left out so loading them later is not seen as a change.
+    instance._counted_fields = {
+        field: instance.__dict__[field] for field in COUNTED_FIELDS if field in instance.__dict__
+    }
+
+
+@receiver(post_save, sender=Article)
+def count_saved_article(sender, instance, created, **kwargs):
+    if created:
+        counters.count_articles([instance])
+    else:
+        original = getattr(instance, '_counted_fields', {})
+        changed = {
+            field for field in original
+            if original[field] != instance.__dict__.get(field, original[field])
+        }
+        for field, model in (('publisher_id', Publisher), ('journalist_id', CustomUser)):
+            if field in changed:
+                counters.adjust(model, 'article_count', {original[field]: -1, instance.__dict__[field]: 1})
+        if changed & {'is_approved', 'is_rejected'} and {'is_approved', 'is_rejected'} <= original.keys():
+            was_pending = not original['is_approved'] and not original['is_rejected']
+            counters.bump('pending', counters.is_pending(instance) - was_pending)
+    remember_counted_fields(sender, instance)
+
 
-            
\ No newline at end of file
+@receiver(post_delete, sender=Article)
+def count_deleted_article(sender, instance, **kwargs):
+    counters.count_articles([instance], sign=-1)
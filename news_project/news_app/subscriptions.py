@@ -0,0 +1,119 @@
+"""
+Cached subscription state per reader.
+
+The IDs of the publishers a reader subscribes to and the journalists they
+follow are kept as a pair of sets in Django's cache framework. Views,
+templates and the API check membership against these sets instead of
+querying the M2M relations, so on a warm cache a subscription check costs
+no queries. Entries are dropped from ``m2m_changed`` whenever either
+relation changes, and again when that transaction commits (see
+``signals.py``).
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CustomUser
+
+
+CACHE_TIMEOUT = getattr(settings, 'NEWS_SUBSCRIPTION_CACHE_TIMEOUT', 60 * 60 * 24)
+
+PublisherSubscription = CustomUser.subscribed_publishers.through
+JournalistFollow = CustomUser.subscribed_journalists.through
+
+
+class SubscriptionState:
+    """
+    The sources one reader follows.
+
+    Attributes:
+        publisher_ids (frozenset[int]): Subscribed publisher IDs.
+        journalist_ids (frozenset[int]): Followed journalist IDs.
+    """
+
+    def __init__(self, publisher_ids=(), journalist_ids=()):
+        self.publisher_ids = frozenset(publisher_ids)
+        self.journalist_ids = frozenset(journalist_ids)
+
+    def follows_publisher(self, publisher_id):
+        return publisher_id in self.publisher_ids
+
+    def follows_journalist(self, journalist_id):
+        return journalist_id in self.journalist_ids
+
+
+def cache_key(user_id):
+    return f'news_app:subscriptions:{user_id}'
+
+
+def load(user_id):
+    """
+    Read a reader's subscriptions from the database.
+
+    Args:
+        user_id (int): The reader's primary key.
+
+    Returns:
+        SubscriptionState: Fresh state (two queries).
+    """
+    return SubscriptionState(
+        PublisherSubscription.objects.filter(customuser_id=user_id).values_list('publisher_id', flat=True),
+        JournalistFollow.objects.filter(from_customuser_id=user_id).values_list('to_customuser_id', flat=True),
+    )
+
+
+def get_state(user):
+    """
+    Return a reader's subscription state, from the cache when possible.
+
+    Args:
+        user (CustomUser): The reader; anonymous users get an empty state.
+
+    Returns:
+        SubscriptionState: The cached or freshly loaded state.
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return SubscriptionState()
+    key = cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        return SubscriptionState(*cached)
+    state = load(user.pk)
+    cache.set(key, (state.publisher_ids, state.journalist_ids), CACHE_TIMEOUT)
+    return state
+
+
+async def aget_state(user):
+    """
+    Async version of :func:`get_state` for async views.
+
+    Args:
+        user (CustomUser): The reader; anonymous users get an empty state.
+
+    Returns:
+        SubscriptionState: The cached or freshly loaded state.
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return SubscriptionState()
+    key = cache_key(user.pk)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return SubscriptionState(*cached)
+    state = SubscriptionState(
+        [pk async for pk in PublisherSubscription.objects.filter(customuser_id=user.pk)
+         .values_list('publisher_id', flat=True)],
+        [pk async for pk in JournalistFollow.objects.filter(from_customuser_id=user.pk)
+         .values_list('to_customuser_id', flat=True)],
+    )
+    await cache.aset(key, (state.publisher_ids, state.journalist_ids), CACHE_TIMEOUT)
+    return state
+
+
+def invalidate(user_ids):
+    """
+    Drop the cached state of the given readers.
+
+    Args:
+        user_ids (Iterable[int]): Readers whose subscriptions changed.
+    """
+    cache.delete_many([cache_key(pk) for pk in user_ids])
@@ -0,0 +1,17 @@
+from django import template
+
+from news_app import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def article_cards(articles, variant):
+    """
+    Render a list of article cards through the fragment cache.
+
+    Usage:
+        {% load article_cards %}
+        {% article_cards articles 'reader' %}
+    """
+    return cards.render_cards(articles, variant)
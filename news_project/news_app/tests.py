@@ -1,20 +1,1209 @@
 import pytest
+from django.conf import settings as django_settings
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework.test import APIClient
-from .models import Article, Publisher, CustomUser
+from .models import Article, FeedEntry, Publisher, CustomUser
+from . import search, timeline
 
 
 @pytest.mark.django_db
 def test_reader_can_view_approved_articles():
-        publisher = Publisher.objects.create(name='Tech News')
-        article = Article.objects.create(title='Breaking', content='Content', publisher=publisher, is_approved=True )
-user = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    publisher = Publisher.objects.create(name='Tech News')
+    article = Article.objects.create(title='Breaking', content='Content', publisher=publisher, is_approved=True )
+    user = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
 
 
-client = APIClient()
-client.force_authenticate(user=user)
+    client = APIClient()
+    client.force_authenticate(user=user)
 
 
-response = client.get(reverse('article-list'))
-assert response.status_code == 200
-assert len(response.data) == 1
\ No newline at end of file
+    response = client.get(reverse('article-list'))
+    assert response.status_code == 200
+    assert len(response.data['results']) == 1
+
+
+@pytest.mark.django_db
+def test_approval_fans_out_to_reader_timelines():
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    by_publisher = CustomUser.objects.create_user(username='r1', password='pass', role='reader')
+    by_journalist = CustomUser.objects.create_user(username='r2', password='pass', role='reader')
+    by_publisher.subscribed_publishers.add(publisher)
+    by_journalist.subscribed_journalists.add(journalist)
+
+    article = Article.objects.create(title='Breaking', content='Content', publisher=publisher, journalist=journalist)
+    assert not FeedEntry.objects.exists()
+
+    article.is_approved = True
+    article.save()
+    assert timeline.reader_feed(by_publisher) == [article]
+    assert timeline.reader_feed(by_journalist) == [article]
+
+
+@pytest.mark.django_db
+def test_subscription_changes_backfill_and_prune_timeline():
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    article = Article.objects.create(
+        title='Breaking', content='Content', publisher=publisher, journalist=journalist, is_approved=True
+    )
+
+    reader.subscribed_publishers.add(publisher)
+    reader.subscribed_journalists.add(journalist)
+    assert timeline.reader_feed(reader) == [article]
+
+    reader.subscribed_publishers.remove(publisher)
+    assert timeline.reader_feed(reader) == [article]
+
+    reader.subscribed_journalists.remove(journalist)
+    assert timeline.reader_feed(reader) == []
+
+
+@pytest.mark.django_db
+def test_timeline_is_bounded_and_rebuildable(settings):
+    publisher = Publisher.objects.create(name='Tech News')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+    articles = [
+        Article.objects.create(title=f'Story {i}', content='Content', publisher=publisher, is_approved=True)
+        for i in range(5)
+    ]
+
+    timeline.trim([reader.pk], max_length=3)
+    assert timeline.reader_feed(reader) == articles[:1:-1]
+
+    FeedEntry.objects.all().delete()
+    call_command('rebuild_feeds', reader=[reader.pk])
+    assert len(timeline.reader_feed(reader)) == 5
+
+
+@pytest.mark.django_db
+def test_editor_dashboard_keyset_pagination(client, settings):
+    from .pagination import PAGE_SIZE
+
+    publisher = Publisher.objects.create(name='Tech News')
+    editor = CustomUser.objects.create_user(username='editor', password='pass', role='editor')
+    pending = [
+        Article.objects.create(title=f'Story {i}', content='Content', publisher=publisher)
+        for i in range(PAGE_SIZE + 5)
+    ]
+    client.force_login(editor)
+
+    first = client.get(reverse('editor_dashboard'))
+    assert first.context['articles'] == pending[:4:-1]
+    assert first.context['page'].has_next
+
+    second = client.get(reverse('editor_dashboard'), {'before': first.context['page'].next_cursor})
+    assert second.context['articles'] == pending[4::-1]
+    assert not second.context['page'].has_next
+
+    back = client.get(reverse('editor_dashboard'), {'after': second.context['page'].previous_cursor})
+    assert back.context['articles'] == first.context['articles']
+
+
+@pytest.mark.django_db
+def test_approval_queues_outbox_and_worker_sends_in_chunks(client, mailoutbox):
+    from .models import EmailOutbox
+
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    editor = CustomUser.objects.create_user(username='editor', password='pass', role='editor')
+    for i in range(5):
+        reader = CustomUser.objects.create_user(
+            username=f'reader{i}', email=f'reader{i}@example.com', password='pass', role='reader'
+        )
+        reader.subscribed_publishers.add(publisher)
+        reader.subscribed_journalists.add(journalist)
+    article = Article.objects.create(title='Breaking', content='Content', publisher=publisher, journalist=journalist)
+
+    client.force_login(editor)
+    client.get(reverse('approve_article', args=[article.id]))
+    assert len(mailoutbox) == 0
+    assert EmailOutbox.objects.get(article=article).status == EmailOutbox.PENDING
+
+    call_command('send_outbox', chunk_size=2)
+    assert sorted(m.to[0] for m in mailoutbox) == [f'reader{i}@example.com' for i in range(5)]
+    assert EmailOutbox.objects.get(article=article).status == EmailOutbox.SENT
+
+    call_command('send_outbox')
+    assert len(mailoutbox) == 5
+
+
+@pytest.mark.django_db
+def test_outbox_retries_with_backoff_after_failure(monkeypatch):
+    from datetime import timedelta
+    from django.utils import timezone
+    from .models import EmailOutbox
+    from . import outbox
+
+    publisher = Publisher.objects.create(name='Tech News')
+    reader = CustomUser.objects.create_user(username='reader', email='r@example.com', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+    article = Article.objects.create(title='Breaking', content='Content', publisher=publisher)
+    article.is_approved = True
+    article.save()
+
+    def refuse(self, messages):
+        raise ConnectionError('relay down')
+
+    monkeypatch.setattr('django.core.mail.backends.locmem.EmailBackend.send_messages', refuse)
+    assert outbox.drain() == (1, 0)
+    entry = EmailOutbox.objects.get(article=article)
+    assert entry.attempts == 1
+    assert entry.status == EmailOutbox.PENDING
+    assert 'relay down' in entry.last_error
+    assert outbox.drain() == (0, 0)
+
+    # When reconnecting fails too, the rest of the batch is released, not left claimed.
+    second = Article.objects.create(title='Second', content='Content', publisher=publisher)
+    second.is_approved = True
+    second.save()
+    EmailOutbox.objects.update(next_attempt_at=timezone.now())
+
+    opened = []
+
+    def open_once(self):
+        opened.append(self)
+        if len(opened) > 1:
+            raise ConnectionError('relay unreachable')
+
+    monkeypatch.setattr('django.core.mail.backends.locmem.EmailBackend.open', open_once, raising=False)
+    with pytest.raises(ConnectionError):
+        outbox.drain()
+    assert sorted(EmailOutbox.objects.values_list('attempts', flat=True)) == [1, 2]
+    assert EmailOutbox.objects.filter(last_error='relay unreachable').count() == 1
+    assert not EmailOutbox.objects.filter(next_attempt_at__gt=timezone.now() + timedelta(minutes=5)).exists()
+
+
+@pytest.mark.django_db
+def test_article_api_lists_without_content_and_without_n_plus_one(django_assert_num_queries):
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    for i in range(3):
+        Article.objects.create(
+            title=f'Story {i}', content='Body', publisher=publisher, journalist=journalist, is_approved=True
+        )
+    Article.objects.create(title='Draft', content='Body', publisher=publisher)
+    client = APIClient()
+
+    with django_assert_num_queries(1):
+        response = client.get(reverse('article-list'))
+    results = response.data['results']
+    assert [a['title'] for a in results] == ['Story 2', 'Story 1', 'Story 0']
+    assert 'content' not in results[0]
+    assert results[0]['journalist_username'] == 'writer'
+
+    detail = client.get(reverse('article-detail', args=[results[0]['id']]))
+    assert detail.data['content'] == 'Body'
+    assert not {'claimed_by', 'claimed_until', 'version', 'is_rejected', 'trending_score'} & set(detail.data)
+
+    sparse = client.get(reverse('article-list'), {'fields': 'id,title'})
+    assert set(sparse.data['results'][0]) == {'id', 'title'}
+
+    by_publisher = client.get(reverse('publisher-articles', args=[publisher.id]))
+    assert len(by_publisher.data['results']) == 3
+    by_journalist = client.get(reverse('journalist-articles', args=[journalist.id]))
+    assert len(by_journalist.data['results']) == 3
+
+
+@pytest.mark.django_db
+def test_bulk_approval_runs_side_effects_set_wise(client, django_assert_max_num_queries, mailoutbox):
+    from .models import EmailOutbox
+    from . import approval, outbox
+
+    publishers = [Publisher.objects.create(name=f'Pub {i}') for i in range(3)]
+    editor = CustomUser.objects.create_user(username='editor', password='pass', role='editor')
+    reader = CustomUser.objects.create_user(
+        username='reader', password='pass', role='reader', email='reader@example.com'
+    )
+    reader.subscribed_publishers.add(*publishers)
+    articles = [
+        Article.objects.create(title=f'Story {i}', content='Body', publisher=publishers[i % 3])
+        for i in range(30)
+    ]
+    client.force_login(editor)
+
+    with django_assert_max_num_queries(15):
+        client.post(reverse('approve_selected_articles'), {'article_ids': [a.id for a in articles]})
+
+    assert not Article.objects.filter(is_approved=False).exists()
+    assert EmailOutbox.objects.count() == 30
+    # Timelines are filled by the outbox worker, not by the approval request.
+    assert timeline.reader_feed(reader) == []
+    assert outbox.drain() == (30, 30)
+    assert len(timeline.reader_feed(reader)) == 30
+
+    # A re-approved article goes back into timelines without a second email.
+    article = Article.objects.get(pk=articles[0].pk)
+    article.is_approved = False
+    article.save()
+    assert len(timeline.reader_feed(reader)) == 29
+    approval.approve([article.id])
+    assert outbox.drain() == (1, 0)
+    assert len(timeline.reader_feed(reader)) == 30
+    assert len(mailoutbox) == 30
+
+
+@pytest.mark.django_db
+def test_full_text_search_is_ranked_and_tracks_edits(client):
+    publisher = Publisher.objects.create(name='Tech News')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    strong = Article.objects.create(
+        title='Quantum computing', content='Quantum chips and quantum errors', publisher=publisher, is_approved=True
+    )
+    weak = Article.objects.create(
+        title='Chips', content='A short quantum aside', publisher=publisher, is_approved=True
+    )
+    Article.objects.create(title='Quantum draft', content='Unapproved', publisher=publisher)
+
+    client.force_login(reader)
+    response = client.get(reverse('search_articles'), {'q': 'quantum'})
+    assert response.context['articles'] == [strong, weak]
+
+    weak.content = 'Nothing relevant'
+    weak.save()
+    api = APIClient().get(reverse('article-search'), {'q': 'quantum'})
+    assert [a['id'] for a in api.data['results']] == [strong.id]
+    assert 'content' not in api.data['results'][0]
+
+    assert search.ranked_ids('"; DROP TABLE', 10) == []
+
+
+@pytest.mark.django_db
+def test_admin_search_says_when_matches_are_capped(admin_client, monkeypatch):
+    from . import search
+
+    publisher = Publisher.objects.create(name='Tech News')
+    for i in range(3):
+        Article.objects.create(title=f'Quantum {i}', content='Quantum body', publisher=publisher)
+    url = reverse('admin:news_app_article_changelist')
+
+    response = admin_client.get(url, {'q': 'quantum'})
+    assert not list(response.context['messages'])
+    monkeypatch.setattr(search, 'ADMIN_MATCH_LIMIT', 2)
+    response = admin_client.get(url, {'q': 'quantum'})
+    assert response.context['cl'].result_count == 2
+    assert [str(m) for m in response.context['messages']] == [
+        'Only the 2 best matches are listed; refine the search to see the others.'
+    ]
+
+
+@pytest.mark.django_db
+def test_instrumentation_reports_server_timing_and_enforces_budgets(client, settings):
+    from .middleware import QueryBudgetExceeded
+
+    publisher = Publisher.objects.create(name='Tech News')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+    Article.objects.create(title='Breaking', content='Content', publisher=publisher, is_approved=True)
+    client.force_login(reader)
+
+    settings.NEWS_INSTRUMENTATION = True
+    settings.NEWS_QUERY_BUDGET_STRICT = True
+    response = client.get(reverse('reader_dashboard'))
+    timing = response['Server-Timing']
+    assert 'db;dur=' in timing and 'tpl;dur=' in timing and 'total;dur=' in timing
+
+    settings.NEWS_QUERY_BUDGETS = {'reader_dashboard': 1}
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(reverse('reader_dashboard'))
+
+
+@pytest.mark.django_db
+def test_subscription_state_is_cached_and_invalidated(
+    client, django_assert_num_queries, django_capture_on_commit_callbacks,
+):
+    from django.core.cache import cache
+    from .models import PushMessage
+    from . import subscriptions
+
+    cache.clear()
+    publisher = Publisher.objects.create(name='Tech News')
+    other = Publisher.objects.create(name='Sports')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+
+    state = subscriptions.get_state(reader)
+    assert state.publisher_ids == {publisher.id}
+    with django_assert_num_queries(0):
+        assert subscriptions.get_state(reader).follows_publisher(publisher.id)
+
+    # Push hubs hear about the change only once it commits.
+    PushMessage.objects.all().delete()
+    with django_capture_on_commit_callbacks(execute=True):
+        journalist.followers.add(reader)
+        assert not PushMessage.objects.exists()
+    assert PushMessage.objects.get().payload == {'type': 'subscriptions', 'reader_ids': [reader.id]}
+    assert subscriptions.get_state(reader).journalist_ids == {journalist.id}
+
+    client.force_login(reader)
+    client.get(reverse('subscribe_publisher', args=[other.id]))
+    response = client.get(reverse('reader_dashboard'))
+    assert response.context['subscribed_publisher_ids'] == {publisher.id, other.id}
+    assert response.content.count(b'Unsubscribe') == 2
+
+    api = APIClient()
+    api.force_authenticate(reader)
+    data = api.get(reverse('journalist-list')).data['results']
+    assert data[0]['is_followed'] is True
+
+
+@pytest.mark.django_db
+def test_article_cards_are_cached_by_version():
+    from django.core.cache import cache
+    from django.db.models import F
+    from . import cards
+
+    cache.clear()
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    article = Article.objects.create(
+        title='Breaking', content='Content', publisher=publisher, journalist=journalist, is_approved=True
+    )
+
+    first = cards.render_cards([article], 'reader')
+    assert 'Tech News' in first
+    assert cache.get(cards.card_key('reader', article)) == first
+
+    publisher.name = 'Daily Tech'
+    publisher.save()
+    journalist.username = 'columnist'
+    journalist.save()
+    article = Article.objects.select_related('publisher', 'journalist').get(pk=article.pk)
+    renamed = cards.render_cards([article], 'reader')
+    assert 'Daily Tech' in renamed and 'columnist' in renamed
+
+    article.title = 'Updated'
+    article.save()
+    assert 'Updated' in cards.render_cards([article], 'reader')
+
+    # A stale copy saved after approval bumped the row still gets a new version.
+    stale = Article.objects.get(pk=article.pk)
+    Article.objects.filter(pk=article.pk).update(version=F('version') + 1)
+    stale.title = 'Edited elsewhere'
+    stale.save()
+    assert stale.version == Article.objects.get(pk=article.pk).version == article.version + 2
+
+
+@pytest.mark.django_db
+def test_dashboards_and_api_answer_conditional_gets(
+    client, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    from django.core.cache import cache
+    from . import approval
+
+    cache.clear()
+    publisher = Publisher.objects.create(name='Tech News')
+    other = Publisher.objects.create(name='World News')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+    article = Article.objects.create(title='Pending', content='Content', publisher=publisher)
+
+    client.force_login(reader)
+    url = reverse('reader_dashboard')
+    etag = client.get(url)['ETag']
+    # The session and user come from the cache; no article query, no rendering.
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    # Stamps are touched on commit.
+    with django_capture_on_commit_callbacks(execute=True):
+        approval.approve([article.id])
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    etag = response['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.get(reverse('subscribe_publisher', args=[other.id]))
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    api = APIClient()
+    list_url = reverse('article-list')
+    etag = api.get(list_url)['ETag']
+    assert api.get(list_url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        Article.objects.create(title='Fresh', content='Content', publisher=other, is_approved=True)
+    assert api.get(list_url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_import_articles_streams_batches_with_rejects_and_resume(tmp_path):
+    import json
+
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+
+    records = [
+        {'title': f'Story {i}', 'content': 'Body', 'publisher': 'Tech News', 'journalist': 'writer',
+         'is_approved': True}
+        for i in range(5)
+    ]
+    records.insert(2, {'title': 'Orphan', 'content': 'Body', 'publisher': 'Nobody'})
+    source = tmp_path / 'articles.jsonl'
+    source.write_text(''.join(json.dumps(record) + '\n' for record in records[:4]) + 'not json\n')
+    checkpoint, rejects = tmp_path / 'import.ckpt', tmp_path / 'rejects.jsonl'
+    options = dict(batch_size=2, checkpoint=str(checkpoint), rejects=str(rejects))
+
+    call_command('import_articles', str(source), **options)
+    assert Article.objects.count() == 3
+    assert set(journalist.published_articles.values_list('title', flat=True)) == {'Story 0', 'Story 1', 'Story 2'}
+    assert FeedEntry.objects.filter(reader=reader).count() == 3
+    rejected = [json.loads(line) for line in rejects.read_text().splitlines()]
+    assert [r['line'] for r in rejected] == [3, 5]
+    assert 'publisher' in rejected[0]['errors']
+    assert json.loads(checkpoint.read_text())['consumed'] == 5
+
+    # Re-running with a longer input only imports what is new.
+    source.write_text(''.join(json.dumps(record) + '\n' for record in records[:4]) + 'not json\n'
+                      + ''.join(json.dumps(record) + '\n' for record in records[4:]))
+    call_command('import_articles', str(source), **options)
+    assert sorted(Article.objects.values_list('title', flat=True)) == [f'Story {i}' for i in range(5)]
+
+
+@pytest.mark.django_db
+def test_source_feeds_are_cached_until_an_article_is_approved(
+    client, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    from django.core.cache import cache
+    from . import approval
+
+    cache.clear()
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    Article.objects.create(title='Live', content='Body', publisher=publisher, journalist=journalist, is_approved=True)
+    pending = Article.objects.create(title='Pending', content='Body', publisher=publisher, journalist=journalist)
+
+    url = reverse('publisher_rss', args=[publisher.id])
+    response = client.get(url)
+    assert response['Content-Type'].startswith('application/rss+xml')
+    assert b'Live' in response.content and b'Pending' not in response.content
+    live = Article.objects.get(title='Live')
+    assert f"<link>http://testserver{reverse('article_detail', args=[live.id])}</link>".encode() in response.content
+    with django_assert_num_queries(0):
+        assert client.get(url).content == response.content
+    # Another source changing leaves the feed cached; renaming this one does not.
+    with django_capture_on_commit_callbacks(execute=True):
+        Publisher.objects.create(name='World News')
+    with django_assert_num_queries(0):
+        client.get(url)
+    with django_capture_on_commit_callbacks(execute=True):
+        publisher.name = 'Daily Tech'
+        publisher.save()
+    assert b'Daily Tech' in client.get(url).content
+
+    with django_capture_on_commit_callbacks(execute=True):
+        approval.approve([pending.id])
+    assert b'Pending' in client.get(url).content
+    atom = client.get(reverse('journalist_atom', args=[journalist.id]))
+    assert atom['Content-Type'].startswith('application/atom+xml') and b'Pending' in atom.content
+
+
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_export_streams_approved_articles_to_editors(client):
+    import json
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+    from . import exports
+
+    publisher = Publisher.objects.create(name='Tech News')
+    for i in range(5):
+        Article.objects.create(title=f'Story {i}', content='Body', publisher=publisher, is_approved=i != 1)
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    editor = CustomUser.objects.create_user(username='editor', password='pass', role='editor')
+
+    assert client.get(reverse('export_articles')).status_code == 302
+    client.force_login(reader)
+    assert client.get(reverse('export_articles')).status_code == 302
+
+    async def download(query):
+        client = AsyncClient()
+        await client.aforce_login(editor)
+        response = await client.get(reverse('export_articles'), query)
+        assert response.streaming
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    rows = [json.loads(line) for line in async_to_sync(download)({}).splitlines()]
+    assert [row['title'] for row in rows] == ['Story 0', 'Story 2', 'Story 3', 'Story 4']
+    assert rows[0]['publisher_name'] == 'Tech News'
+
+    lines = async_to_sync(download)({'format': 'csv'}).splitlines()
+    assert lines[0].startswith('id,title,content') and len(lines) == 5
+
+    # Under WSGI the sync generator streams the same rows.
+    client.force_login(editor)
+    response = client.get(reverse('export_articles'))
+    assert response.streaming and not response.is_async
+    assert b''.join(response.streaming_content).decode() == async_to_sync(download)({})
+
+    # Keyset chunks cover every row exactly once.
+    async def collect():
+        return [row[1] async for chunk in exports.aexport_chunks(chunk_size=2) for row in chunk]
+    assert async_to_sync(collect)() == ['Story 0', 'Story 2', 'Story 3', 'Story 4']
+    assert [row[1] for chunk in exports.export_chunks(chunk_size=2) for row in chunk] == [
+        'Story 0', 'Story 2', 'Story 3', 'Story 4',
+    ]
+
+
+@pytest.mark.skipif(
+    'replica1' not in django_settings.DATABASES, reason="Set DJANGO_DB_REPLICAS to configure a replica."
+)
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica1'])
+def test_safe_requests_read_from_replica_until_the_client_writes(client, settings):
+    from django.db import connections
+    from django.test.utils import CaptureQueriesContext
+    from . import routers
+
+    settings.NEWS_DB_REPLICAS = ['replica1']
+    publisher = Publisher.objects.create(name='Tech News')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    client.force_login(reader)
+
+    with CaptureQueriesContext(connections['replica1']) as replica:
+        response = client.get(reverse('reader_dashboard'))
+    assert response.status_code == 200
+    assert any('news_app_customuser' in query['sql'] for query in replica.captured_queries)
+    assert routers.PIN_COOKIE not in response.cookies
+
+    # Subscribing writes, so the client is pinned to the primary for a while.
+    response = client.get(reverse('subscribe_publisher', args=[publisher.id]))
+    assert response.cookies[routers.PIN_COOKIE]['max-age'] == settings.NEWS_DB_PIN_SECONDS
+    with CaptureQueriesContext(connections['replica1']) as replica:
+        response = client.get(reverse('reader_dashboard'))
+    assert response.context['subscribed_publisher_ids'] == {publisher.id}
+    assert not replica.captured_queries
+
+    # Work outside requests always uses the primary.
+    assert routers.ReplicaRouter().db_for_read(Article) == 'default'
+
+
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_async_views_serve_dashboards_and_deliver_notifications_in_background(mailoutbox, monkeypatch):
+    import asyncio
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+    from . import outbox
+
+    publisher = Publisher.objects.create(name='Tech News')
+    reader = CustomUser.objects.create_user(
+        username='reader', password='pass', role='reader', email='reader@example.com'
+    )
+    editor = CustomUser.objects.create_user(username='editor', password='pass', role='editor')
+    article = Article.objects.create(title='Breaking', content='Content', publisher=publisher)
+
+    started = []
+    dispatch = outbox.dispatch
+    monkeypatch.setattr(outbox, 'dispatch', lambda article_ids: started.append(dispatch(article_ids)))
+
+    async def scenario():
+        client = AsyncClient()
+        await client.aforce_login(reader)
+        response = await client.get(reverse('subscribe_publisher', args=[publisher.id]))
+        assert response.status_code == 302
+
+        await client.aforce_login(editor)
+        assert (await client.get(reverse('editor_dashboard'))).context['articles'] == [article]
+        await client.get(reverse('approve_article', args=[article.id]))
+        # The approval view started delivery without waiting for it. The task
+        # may already be done, so it is captured as it is created.
+        assert len(started) == 1
+        await asyncio.gather(*started)
+
+        await client.aforce_login(reader)
+        response = await client.get(reverse('reader_dashboard'))
+        assert response.context['articles'] == [article]
+        assert response.context['subscribed_publisher_ids'] == {publisher.id}
+
+    async_to_sync(scenario)()
+    assert [message.to for message in mailoutbox] == [['reader@example.com']]
+
+
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_sse_pushes_approvals_only_to_followers(monkeypatch):
+    import asyncio
+    from asgiref.sync import async_to_sync, sync_to_async
+    from django.test import AsyncClient
+    from . import approval, push
+
+    # Events go through the shared PushMessage table, as between workers.
+    assert isinstance(push.get_broker(), push.DatabaseBroker)
+    monkeypatch.setattr(push, 'POLL_INTERVAL', 0.05)
+
+    publisher = Publisher.objects.create(name='Tech News')
+    other = Publisher.objects.create(name='World News')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+    followed = Article.objects.create(title='Breaking', content='Content', publisher=publisher)
+    unfollowed = Article.objects.create(title='Elsewhere', content='Content', publisher=other)
+
+    async def scenario():
+        client = AsyncClient()
+        await client.aforce_login(reader)
+        response = await client.get(reverse('reader_events'))
+        assert response['Content-Type'] == 'text/event-stream'
+        frames = response.streaming_content
+        assert (await anext(frames)).startswith(b'retry:')
+        next_frame = asyncio.ensure_future(anext(frames))
+        await asyncio.sleep(0)
+        assert len(push.hub) == 1
+
+        await sync_to_async(approval.approve)([unfollowed.id, followed.id])
+        frame = (await asyncio.wait_for(next_frame, 5)).decode()
+        assert frame.startswith(f'id: {followed.id}\nevent: article\n')
+        assert not any(listener.queue.qsize() for listener in push.hub.by_reader[reader.id])
+
+        # A client disconnect cancels the pending read.
+        pending = asyncio.ensure_future(anext(frames))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        assert len(push.hub) == 0
+
+    async_to_sync(scenario)()
+
+
+def test_local_broker_warns_when_several_workers_run(monkeypatch, caplog):
+    from . import push
+
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    push.LocalBroker(push.Hub())
+    assert 'WEB_CONCURRENCY=4' in caplog.text
+
+
+def test_local_broker_skips_subscription_messages_nobody_listens_for(monkeypatch):
+    from . import push
+
+    broker = push.LocalBroker(push.hub)
+    sent = []
+    monkeypatch.setattr(broker, 'publish', sent.append)
+    monkeypatch.setattr(push, '_broker', broker)
+    monkeypatch.setattr(push.hub, 'by_reader', {2: set()})
+    push.publish_subscriptions_changed([1])
+    push.publish_subscriptions_changed([1, 2])
+    assert sent == [{'type': 'subscriptions', 'reader_ids': [2]}]
+
+    class Incomplete(push.Broker):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(push.hub)
+
+
+@pytest.mark.django_db
+def test_counters_follow_subscriptions_and_articles():
+    from django.core.management.base import CommandError
+    from . import counters
+
+    tech, daily = Publisher.objects.create(name='Tech News'), Publisher.objects.create(name='Daily')
+    writer = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    readers = [CustomUser.objects.create_user(username=f'r{i}', password='pass', role='reader') for i in range(3)]
+
+    for reader in readers:
+        reader.subscribed_publishers.add(tech)
+        reader.subscribed_journalists.add(writer)
+    readers[0].subscribed_publishers.add(tech)
+    daily.subscribers.add(*readers[:2])
+    readers[0].subscribed_publishers.remove(tech, daily)
+    readers[1].subscribed_journalists.clear()
+    moved = Article.objects.create(title='One', content='Body', publisher=tech, journalist=writer)
+    Article.objects.create(title='Two', content='Body', publisher=tech, journalist=writer).delete()
+    moved.publisher = daily
+    moved.save()
+    # Saving a stale in-memory instance in full must not write its counters back.
+    tech.description = 'Edited'
+    tech.save()
+
+    def counts():
+        for obj in (tech, daily, writer):
+            obj.refresh_from_db()
+        return (tech.subscriber_count, tech.article_count, daily.subscriber_count,
+                daily.article_count, writer.follower_count, writer.article_count)
+
+    assert counts() == (2, 0, 1, 1, 2, 1)
+    assert not any(counters.reconcile(fix=False).values())
+    popular = APIClient().get(reverse('publisher-list'), {'ordering': '-subscriber_count'}).json()
+    assert [p['name'] for p in popular['results']] == ['Tech News', 'Daily']
+
+    Publisher.objects.update(subscriber_count=0, article_count=0)
+    with pytest.raises(CommandError):
+        call_command('reconcile_counters', check=True)
+    call_command('reconcile_counters')
+    assert counts() == (2, 0, 1, 1, 2, 1)
+
+
+@pytest.mark.django_db
+def test_editors_claim_disjoint_batches_and_decide_them(client):
+    from datetime import timedelta
+    from django.utils import timezone
+    from . import counters, moderation
+
+    publisher = Publisher.objects.create(name='Tech News')
+    first, second = (
+        CustomUser.objects.create_user(username=name, password='pass', role='editor') for name in ('ed1', 'ed2')
+    )
+    articles = [Article.objects.create(title=f'Story {i}', content='Body', publisher=publisher) for i in range(5)]
+    assert moderation.pending_count() == 5
+
+    assert moderation.claim(first, limit=2) == 2
+    assert moderation.claim(second, limit=2) == 2
+    assert list(moderation.held_by(first)) == articles[:2]
+    assert list(moderation.held_by(second)) == articles[2:4]
+
+    # Another editor's live claim cannot be decided; an expired one can be reclaimed.
+    assert moderation.decide(first, [a.id for a in articles[:3]]) == 2
+    Article.objects.filter(claimed_by=second).update(claimed_until=timezone.now() - timedelta(seconds=1))
+    assert moderation.claim(first, limit=3) == 3
+    assert set(moderation.held_by(first)) == set(articles[2:5])
+
+    client.force_login(first)
+    response = client.get(reverse('editor_dashboard'))
+    assert response.context['batch'] == articles[2:5]
+    assert response.context['pending_count'] == 3
+    client.post(reverse('reject_selected_articles'), {'article_ids': [articles[2].id, articles[3].id]})
+    client.post(reverse('approve_selected_articles'), {'article_ids': [articles[4].id]})
+
+    assert moderation.pending_count() == 0
+    assert Article.objects.filter(is_rejected=True).count() == 2
+    assert Article.objects.filter(is_approved=True).count() == 3
+    assert not Article.objects.filter(claimed_by__isnull=False).exists()
+    assert not any(counters.reconcile(fix=False).values())
+
+
+@pytest.mark.django_db
+def test_journalist_cards_tell_rejected_from_pending(client):
+    from . import approval
+
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    pending, rejected = (
+        Article.objects.create(title=title, content='Body', publisher=publisher, journalist=journalist)
+        for title in ('Waiting', 'Refused')
+    )
+    client.force_login(journalist)
+    assert client.get(reverse('journalist_dashboard')).content.count(b'Pending Approval') == 2
+    approval.reject([rejected.id])
+    content = client.get(reverse('journalist_dashboard')).content.decode()
+    assert content.count('Pending Approval') == 1 and content.count('Rejected') == 1
+
+
+@pytest.mark.django_db
+def test_list_pages_show_stored_excerpts_without_loading_bodies(client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    publisher = Publisher.objects.create(name='Tech News')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+    body = ' '.join(f'word{i}' for i in range(100))
+    article = Article.objects.create(title='Long read', content=body, publisher=publisher, is_approved=True)
+    assert article.word_count == 100
+    assert article.excerpt == ' '.join(f'word{i}' for i in range(30)) + ' …'
+
+    article.content = 'Rewritten short body'
+    article.save(update_fields=['content'])
+    article.refresh_from_db()
+    assert (article.excerpt, article.word_count) == ('Rewritten short body', 3)
+
+    # Rows written before the column existed are filled by the backfill.
+    Article.objects.update(excerpt='', word_count=0)
+    call_command('backfill_excerpts', batch_size=1)
+    article.refresh_from_db()
+    assert (article.excerpt, article.word_count) == ('Rewritten short body', 3)
+
+    client.force_login(reader)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('reader_dashboard'))
+    assert b'Rewritten short body' in response.content
+    assert not any('"news_app_article"."content"' in q['sql'] for q in queries.captured_queries)
+
+
+@pytest.mark.django_db
+def test_digest_readers_get_one_email_per_period(client, mailoutbox):
+    from datetime import timedelta
+    from django.utils import timezone
+    from . import approval, digests
+
+    publisher = Publisher.objects.create(name='Tech News')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    readers = {}
+    for frequency in ('instant', 'hourly', 'daily'):
+        reader = readers[frequency] = CustomUser.objects.create_user(
+            username=frequency, email=f'{frequency}@example.com', password='pass', role='reader'
+        )
+        reader.subscribed_publishers.add(publisher)
+        reader.subscribed_journalists.add(journalist)
+        client.force_login(reader)
+        client.post(reverse('set_notification_frequency'), {'frequency': frequency})
+    assert CustomUser.objects.get(username='daily').notification_frequency == 'daily'
+
+    body = 'Long body ' * 200
+    articles = [
+        Article.objects.create(title=f'Story {i}', content=body, publisher=publisher, journalist=journalist)
+        for i in range(3)
+    ]
+    approval.approve([a.id for a in articles])
+    call_command('send_outbox')
+    assert sorted(m.to[0] for m in mailoutbox) == ['instant@example.com'] * 3
+    mailoutbox.clear()
+
+    later = timezone.now() + timedelta(hours=1)
+    assert digests.send('hourly', now=later) == (1, 1)
+    [digest] = mailoutbox
+    assert digest.to == ['hourly@example.com']
+    assert digest.subject == 'Your hourly digest: 3 new articles'
+    assert all(f'Story {i}' in digest.body for i in range(3))
+    assert body not in digest.body
+    # Nothing new in the same period; the daily reader waits for midnight.
+    assert digests.send('hourly', now=later) == (0, 0)
+    assert digests.send('daily', now=later + timedelta(days=1)) == (1, 1)
+    assert mailoutbox[-1].to == ['daily@example.com']
+    call_command('send_digests', frequencies=['hourly'])
+    assert digests.prune(now=later + digests.RETENTION) == 3
+
+
+@pytest.mark.django_db
+def test_login_and_session_user_avoid_user_and_group_queries(client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    user = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    assert list(user.groups.values_list('name', flat=True)) == ['reader']
+
+    def login():
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('login'), {'username': 'reader', 'password': 'pass'})
+        assert response.status_code == 302
+        return [q['sql'] for q in queries.captured_queries]
+
+    first = login()
+    assert not any('auth_group' in sql for sql in first)
+    assert sum('UPDATE "news_app_customuser"' in sql for sql in first) == 1
+    client.logout()
+    # A second sign-in within NEWS_LAST_LOGIN_INTERVAL reads the user row only.
+    second = login()
+    assert sum(sql.startswith('SELECT') and 'news_app_customuser' in sql for sql in second) == 1
+    assert not any('UPDATE "news_app_customuser"' in sql for sql in second)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(reverse('search_articles')).status_code == 200
+    assert not any('news_app_customuser' in q['sql'] for q in queries.captured_queries)
+
+    # Saving without a role change leaves groups alone; changing it moves them.
+    user.refresh_from_db()
+    user.email = 'reader@example.com'
+    with CaptureQueriesContext(connection) as queries:
+        user.save()
+    assert not any('auth_group' in q['sql'] for q in queries.captured_queries)
+    user.role = 'journalist'
+    user.save()
+    assert list(user.groups.values_list('name', flat=True)) == ['journalist']
+    assert client.get(reverse('search_articles')).status_code == 302
+
+    # Counter updates behind the instance's back drop the cached user too.
+    from . import backends, counters
+    cached = backends.CachedModelBackend()
+    assert cached.get_user(user.pk).article_count == 0
+    counters.adjust(CustomUser, 'article_count', {user.pk: 2})
+    assert cached.get_user(user.pk).article_count == 2
+
+
+@pytest.mark.django_db
+def test_cached_user_is_dropped_again_when_the_save_commits(django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+    from django.db import transaction
+    from . import backends
+
+    user = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    cached = backends.CachedModelBackend()
+    cached.get_user(user.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            user.email = 'reader@example.com'
+            user.save()
+            # A request served before the commit caches the row again.
+            cache.set(backends.user_key(user.pk), user)
+        assert cache.get(backends.user_key(user.pk)) is not None
+    assert cache.get(backends.user_key(user.pk)) is None
+
+
+@pytest.mark.django_db
+def test_admin_pages_cost_the_same_as_tables_grow(client, monkeypatch):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from . import pagination
+
+    admin = CustomUser.objects.create_superuser(username='admin', password='pass', role='editor')
+    client.force_login(admin)
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+
+    def add_sources(n, offset):
+        publishers = Publisher.objects.bulk_create(Publisher(name=f'Paper {offset + i}') for i in range(n))
+        Article.objects.bulk_create(
+            Article(title=f'Story {offset + i}', content='Body', publisher=publishers[i % n], journalist=journalist)
+            for i in range(n * 3)
+        )
+
+    def cost(url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(queries), response.content.decode()
+
+    changelist = reverse('admin:news_app_article_changelist')
+    change = reverse('admin:news_app_customuser_change', args=[journalist.pk])
+    add_sources(3, 0)
+    cost(changelist), cost(change)  # warm the session user and content type caches
+    few = cost(changelist)[0], cost(change)[0]
+    add_sources(60, 3)
+    assert (cost(changelist)[0], cost(change)[0]) == few
+
+    # The sidebar lists the busiest publishers only; the change form no
+    # longer renders an <option> per article.
+    html = cost(changelist)[1]
+    assert html.count('publisher__id__exact=') == 20
+    assert 'Story 62' not in cost(change)[1]
+
+    # Large unfiltered tables take their total from the table statistics.
+    monkeypatch.setattr(pagination, 'estimated_count', lambda model, using='default': 123456)
+    assert '123456' in cost(changelist)[1]
+    assert '123456' not in cost(changelist + '?is_approved__exact=0')[1]
+
+
+@pytest.mark.django_db
+def test_views_are_buffered_and_trending_decays(client, monkeypatch, caplog):
+    from datetime import timedelta
+    from django.db import DatabaseError, connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+    from . import readership
+
+    monkeypatch.setattr(readership, 'FLUSH_INTERVAL', 3600)
+    readership.drain()
+    publisher = Publisher.objects.create(name='Tech News')
+    old, new, later = (
+        Article.objects.create(title=title, content='Body', publisher=publisher, is_approved=True)
+        for title in ('Old', 'New', 'Later')
+    )
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    client.force_login(reader)
+    api = APIClient()
+    api.force_authenticate(user=reader)
+
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(2):
+            assert client.get(reverse('article_detail', args=[old.id])).status_code == 200
+        assert api.get(reverse('article-detail', args=[old.id])).status_code == 200
+        assert client.get(reverse('article_detail', args=[new.id])).status_code == 200
+    assert not any(q['sql'].startswith('UPDATE') for q in queries.captured_queries)
+
+    now = timezone.now()
+    assert readership.flush(now) == 4
+    old.refresh_from_db()
+    assert old.view_count == 3
+    assert [a.id for a in readership.trending()] == [old.id, new.id]
+
+    # Two views two half-lives later outweigh three views now.
+    api.get(reverse('article-detail', args=[later.id]))
+    api.get(reverse('article-detail', args=[later.id]))
+    readership.flush(now + timedelta(seconds=2 * readership.HALF_LIFE))
+    with CaptureQueriesContext(connection) as queries:
+        response = api.get(reverse('article-trending'), {'publisher': publisher.id})
+    assert [a['id'] for a in response.data['results']] == [later.id, old.id, new.id]
+    assert not any('COUNT(' in q['sql'] or 'SUM(' in q['sql'] for q in queries.captured_queries)
+
+    # A full save does not write back the stale in-memory counters.
+    new.title = 'Renamed'
+    new.save()
+    new.refresh_from_db()
+    assert new.view_count == 1
+
+    # Rebasing keeps the ranking and drops scores that decayed away.
+    api.get(reverse('article-detail', args=[new.id]))
+    readership.flush(now + timedelta(seconds=40 * readership.HALF_LIFE))
+    assert [a.id for a in readership.trending(publisher.id)] == [new.id]
+    assert 1 <= Article.objects.get(id=new.id).trending_score < 2
+
+    # A failing flush keeps the views and still serves the page.
+    def broken(now=None):
+        raise DatabaseError('primary is down')
+    flush = readership.flush
+    monkeypatch.setattr(readership, 'flush', broken)
+    monkeypatch.setattr(readership, 'FLUSH_INTERVAL', 0)
+    assert client.get(reverse('article_detail', args=[old.id])).status_code == 200
+    assert 'Flushing buffered article views failed' in caplog.text
+    monkeypatch.setattr(readership, 'flush', flush)
+    monkeypatch.setattr(readership, 'FLUSH_INTERVAL', 3600)
+
+    # Flushes refresh the busiest publishers' lists; the command refreshes the rest.
+    from django.core.cache import cache
+    quiet = Publisher.objects.create(name='Quiet News')
+    other = Article.objects.create(title='Other', content='Body', publisher=quiet, is_approved=True)
+    readership.drain()
+    readership.record(new)
+    readership.record(new)
+    readership.record(other)
+    cache.clear()
+    monkeypatch.setattr(readership, 'REFRESH_LIMIT', 1)
+    readership.flush(now + timedelta(seconds=40 * readership.HALF_LIFE))
+    assert cache.get(readership._list_key(publisher.id)) == [new.id]
+    assert cache.get(readership._list_key(quiet.id)) is None
+    call_command('refresh_trending')
+    assert cache.get(readership._list_key(quiet.id)) == [other.id]
+
+
+@pytest.mark.django_db
+def test_suggestions_come_from_co_subscriptions(client):
+    np = pytest.importorskip('numpy')
+    from .models import Suggestion
+    from . import recommendations
+
+    keys, counts = recommendations.cooccurrence(np.array([0, 2, 3]), np.array([0, 1, 1]), 2)
+    assert keys.tolist() == [0, 1, 2, 3] and counts.tolist() == [1, 1, 1, 2]
+    keys, counts = recommendations.merge(keys, counts, np.array([3]), np.array([4]))
+    assert keys.tolist() == [0, 1, 2, 3] and counts.tolist() == [1, 1, 1, 6]
+    nearest, weights = recommendations.neighbours(keys, counts, 2, limit=1)
+    assert nearest.tolist() == [[1], [0]]
+    assert np.allclose(weights, [[1 / np.sqrt(6)], [1 / np.sqrt(6)]])
+    # Only reached, unfollowed items are scored; nothing is readers x items.
+    rows, cols, scores = recommendations.score(np.array([0, 1, 1]), np.array([0]), nearest, weights, 2)
+    assert rows.tolist() == [0] and cols.tolist() == [1] and np.allclose(scores, weights[0])
+    rows, cols, scores = recommendations.best(np.array([0, 0, 0, 1]), np.array([0, 1, 2, 0]), np.array([.1, .3, .2, 0]), 2)
+    assert rows.tolist() == [0, 0] and cols.tolist() == [1, 2]
+
+    tech, world, sport = (Publisher.objects.create(name=name) for name in ('Tech', 'World', 'Sport'))
+    writer, columnist = (
+        CustomUser.objects.create_user(username=name, password='pass', role='journalist')
+        for name in ('writer', 'columnist')
+    )
+    readers = [
+        CustomUser.objects.create_user(username=f'r{i}', password='pass', role='reader') for i in range(5)
+    ]
+    for reader in readers[:3]:
+        reader.subscribed_publishers.add(tech, world)
+    readers[2].subscribed_journalists.add(writer)
+    readers[3].subscribed_publishers.add(tech)
+    newcomer = readers[4]
+    sport.subscribers.add(readers[0])
+
+    # Chunks smaller than the reader count give the same result as one pass.
+    assert recommendations.build(chunk_size=2) == recommendations.build(chunk_size=100)
+    suggested = Suggestion.objects.filter(reader=readers[3]).order_by('-score')
+    assert [s.publisher_id for s in suggested if s.publisher_id] == [world.id, sport.id]
+    assert [s.journalist_id for s in suggested if s.journalist_id] == [writer.id]
+    assert not Suggestion.objects.filter(reader=newcomer).exists()
+
+    client.force_login(readers[3])
+    response = client.get(reverse('reader_dashboard'))
+    assert [p.id for p in response.context['suggested_publishers']] == [world.id, sport.id]
+    assert [j.id for j in response.context['suggested_journalists']] == [writer.id]
+    assert response.content.count(b'Unsubscribe') == 1
+    assert columnist.username not in response.content.decode()
+
+    # Without stored suggestions the most followed sources are offered.
+    client.force_login(newcomer)
+    response = client.get(reverse('reader_dashboard'))
+    assert response.context['suggested_publishers'][0] == tech
+
+
+@pytest.mark.django_db
+def test_near_duplicates_are_refused_on_submission_and_import(client, django_assert_num_queries, monkeypatch):
+    import io
+    import json
+    import random
+    from .models import Fingerprint
+    from . import duplicates, importing
+
+    rng = random.Random(7)
+    vocabulary = [f'term{i}' for i in range(400)]
+    wire = [rng.choice(vocabulary) for _ in range(300)]
+    edited = list(wire)
+    for position in (40, 120, 250):
+        edited[position] = 'changed'
+    other = ' '.join(rng.choice(vocabulary) for _ in range(300))
+
+    publisher = Publisher.objects.create(name='Wire')
+    journalist = CustomUser.objects.create_user(username='writer', password='pass', role='journalist')
+    # Shares a band with the edited text, but fewer than the original does.
+    loose = Article.objects.create(
+        title='Storm hits coast', content=' '.join(wire[:200] + [f'filler{i}' for i in range(100)]),
+        publisher=publisher, journalist=journalist,
+    )
+    original = Article.objects.create(
+        title='Storm hits coast', content=' '.join(wire), publisher=publisher, journalist=journalist
+    )
+    assert Fingerprint.objects.filter(article=original).exists()
+
+    # Candidates are ranked by shared bands before signatures are compared.
+    monkeypatch.setattr(duplicates, 'CANDIDATE_LIMIT', 1)
+    with django_assert_num_queries(2):
+        matches = duplicates.find('Storm hits the coast', ' '.join(edited))
+    assert [pk for pk, _ in matches] == [original.id]
+    monkeypatch.undo()
+    loose.delete()
+    assert duplicates.find('Markets rally', other) == []
+
+    client.force_login(journalist)
+    response = client.post(reverse('create_article'), {
+        'title': 'Storm hits the coast', 'content': ' '.join(edited), 'publisher': publisher.id,
+    })
+    assert response.status_code == 200
+    assert 'near-duplicate of &quot;Storm hits coast&quot;' in response.content.decode()
+    assert Article.objects.count() == 1
+
+    records = [
+        {'title': 'Storm update', 'content': ' '.join(edited), 'publisher': 'Wire'},
+        {'title': 'Markets rally', 'content': other, 'publisher': 'Wire'},
+        {'title': 'Markets rally again', 'content': other, 'publisher': 'Wire'},
+    ]
+    rejects = io.StringIO()
+    result = importing.import_articles(io.StringIO('\n'.join(map(json.dumps, records))), rejects=rejects)
+    assert (result.imported, result.rejected) == (1, 2)
+    assert [json.loads(line)['errors']['duplicate_of'] for line in rejects.getvalue().splitlines()] == [
+        [f'Near-duplicate of article {original.id}.'],
+        ["Near-duplicate of 'Markets rally' earlier in this import."],
+    ]
+
+    # Rejected articles no longer block resubmissions; edits re-fingerprint.
+    Article.objects.filter(pk=original.pk).update(is_rejected=True)
+    assert duplicates.find('Storm hits the coast', ' '.join(edited)) == []
+    original.refresh_from_db()
+    original.is_rejected = False
+    original.content = 'A completely different story'
+    original.save()
+    assert duplicates.find('Storm hits the coast', ' '.join(edited)) == []
+
+    Fingerprint.objects.all().delete()
+    call_command('rebuild_duplicate_index', stdout=io.StringIO())
+    assert Fingerprint.objects.count() == Article.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_editing_an_approved_article_does_not_fan_out_again():
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    publisher = Publisher.objects.create(name='Tech News')
+    other = Publisher.objects.create(name='World News')
+    reader = CustomUser.objects.create_user(username='reader', password='pass', role='reader')
+    reader.subscribed_publishers.add(publisher)
+    article = Article.objects.create(title='Breaking', content='Content', publisher=publisher)
+    article.is_approved = True
+    article.save()
+    assert timeline.reader_feed(reader) == [article]
+
+    article = Article.objects.get(pk=article.pk)
+    article.title = 'Breaking (updated)'
+    with CaptureQueriesContext(connection) as queries:
+        article.save()
+    assert not any('news_app_feedentry' in q['sql'] for q in queries.captured_queries)
+
+    # Moving the article to another source still updates the timelines.
+    article.publisher = other
+    article.save()
+    assert timeline.reader_feed(reader) == []
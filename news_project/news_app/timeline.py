@@ -0,0 +1,271 @@
+"""
+Materialized reader timelines.
+
+Each reader owns a bounded list of ``FeedEntry`` rows pointing at the
+approved articles from the publishers and journalists they follow. The
+entries are fanned out when an article is approved and back-filled or
+pruned when a subscription changes, so reading a dashboard is a single
+indexed range scan on ``(reader, created_at)``.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Article, CustomUser, FeedEntry
+
+
+FEED_MAX_LENGTH = getattr(settings, 'NEWS_FEED_MAX_LENGTH', 500)
+BATCH_SIZE = 1000
+
+PublisherSubscription = CustomUser.subscribed_publishers.through
+JournalistFollow = CustomUser.subscribed_journalists.through
+
+
+def publisher_audiences(publisher_ids):
+    """
+    Map each publisher ID to the set of user IDs subscribed to it.
+
+    Args:
+        publisher_ids (Iterable[int]): Publisher primary keys.
+
+    Returns:
+        dict: ``{publisher_id: {user_id, ...}}``.
+    """
+    audiences = defaultdict(set)
+    rows = PublisherSubscription.objects.filter(
+        publisher_id__in=set(publisher_ids)
+    ).values_list('publisher_id', 'customuser_id')
+    for publisher_id, user_id in rows.iterator(chunk_size=BATCH_SIZE):
+        audiences[publisher_id].add(user_id)
+    return audiences
+
+
+def journalist_audiences(journalist_ids):
+    """
+    Map each journalist ID to the set of user IDs following them.
+
+    Args:
+        journalist_ids (Iterable[int]): Journalist primary keys.
+
+    Returns:
+        dict: ``{journalist_id: {user_id, ...}}``.
+    """
+    audiences = defaultdict(set)
+    rows = JournalistFollow.objects.filter(
+        to_customuser_id__in={pk for pk in journalist_ids if pk is not None}
+    ).values_list('to_customuser_id', 'from_customuser_id')
+    for journalist_id, user_id in rows.iterator(chunk_size=BATCH_SIZE):
+        audiences[journalist_id].add(user_id)
+    return audiences
+
+
+def article_audiences(articles):
+    """
+    Resolve the readers of several articles with two set-based queries.
+
+    Args:
+        articles (Iterable[Article]): Articles to resolve.
+
+    Returns:
+        dict: ``{article_id: {user_id, ...}}``.
+    """
+    articles = list(articles)
+    by_publisher = publisher_audiences(a.publisher_id for a in articles)
+    by_journalist = journalist_audiences(a.journalist_id for a in articles)
+    return {
+        a.id: by_publisher.get(a.publisher_id, set()) | by_journalist.get(a.journalist_id, set())
+        for a in articles
+    }
+
+
+def fan_out(articles):
+    """
+    Insert approved articles into the timelines of everyone who follows
+    their publisher or journalist.
+
+    Existing entries are left untouched, so calling this twice for the same
+    article is harmless.
+
+    Args:
+        articles (Iterable[Article]): Approved articles.
+
+    Returns:
+        int: Number of entries written.
+    """
+    articles = [a for a in articles if a.is_approved]
+    if not articles:
+        return 0
+
+    audiences = article_audiences(articles)
+    entries = [
+        FeedEntry(reader_id=reader_id, article_id=article.id, created_at=article.created_at)
+        for article in articles
+        for reader_id in audiences[article.id]
+    ]
+    FeedEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    trim({entry.reader_id for entry in entries})
+    return len(entries)
+
+
+def retract(article_ids):
+    """
+    Remove articles from every timeline, e.g. when they are unapproved.
+
+    Args:
+        article_ids (Iterable[int]): Article primary keys.
+    """
+    FeedEntry.objects.filter(article_id__in=list(article_ids)).delete()
+
+
+def trim(reader_ids, max_length=None):
+    """
+    Keep at most ``max_length`` entries per reader, dropping the oldest.
+
+    Only readers whose timeline is over the limit by more than a small slack
+    are touched, found with one grouped query per batch of readers. The slack
+    means a reader at the cap is trimmed once every few approvals instead of
+    on every one; reads are capped at ``max_length`` regardless.
+
+    Args:
+        reader_ids (Iterable[int]): Readers whose timelines may have grown.
+        max_length (int, optional): Override for ``NEWS_FEED_MAX_LENGTH``.
+    """
+    max_length = max_length or FEED_MAX_LENGTH
+    reader_ids = list(reader_ids)
+    for start in range(0, len(reader_ids), BATCH_SIZE):
+        over_limit = (
+            FeedEntry.objects.filter(reader_id__in=reader_ids[start:start + BATCH_SIZE])
+            .values('reader_id')
+            .annotate(total=Count('id'))
+            .filter(total__gt=max_length + max(1, max_length // 10))
+            .values_list('reader_id', flat=True)
+        )
+        for reader_id in list(over_limit):
+            stale = list(
+                FeedEntry.objects.filter(reader_id=reader_id)
+                .order_by('-created_at', '-article_id')
+                .values_list('id', flat=True)[max_length:]
+            )
+            FeedEntry.objects.filter(id__in=stale).delete()
+
+
+def backfill(reader_id, publisher_ids=(), journalist_ids=()):
+    """
+    Copy the most recent approved articles of newly followed sources into a
+    reader's timeline.
+
+    Args:
+        reader_id (int): Reader who subscribed.
+        publisher_ids (Iterable[int]): Publishers just subscribed to.
+        journalist_ids (Iterable[int]): Journalists just followed.
+    """
+    source = Q(publisher_id__in=list(publisher_ids)) | Q(journalist_id__in=list(journalist_ids))
+    recent = (
+        Article.objects.filter(is_approved=True)
+        .filter(source)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:FEED_MAX_LENGTH]
+    )
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(reader_id=reader_id, article_id=pk, created_at=created) for pk, created in recent],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim([reader_id])
+
+
+def prune(reader_id, publisher_ids=(), journalist_ids=()):
+    """
+    Remove entries that a reader no longer follows any source for.
+
+    An article stays in the timeline if the reader still follows either its
+    publisher or its journalist.
+
+    Args:
+        reader_id (int): Reader who unsubscribed.
+        publisher_ids (Iterable[int]): Publishers just unsubscribed from.
+        journalist_ids (Iterable[int]): Journalists just unfollowed.
+    """
+    still_publishers = PublisherSubscription.objects.filter(
+        customuser_id=reader_id
+    ).values('publisher_id')
+    still_journalists = JournalistFollow.objects.filter(
+        from_customuser_id=reader_id
+    ).values('to_customuser_id')
+
+    dropped = Q(article__publisher_id__in=list(publisher_ids)) | Q(
+        article__journalist_id__in=list(journalist_ids)
+    )
+    kept = Q(article__publisher_id__in=still_publishers) | Q(
+        article__journalist_id__in=still_journalists
+    )
+    stale = list(
+        FeedEntry.objects.filter(reader_id=reader_id)
+        .filter(dropped)
+        .exclude(kept)
+        .values_list('id', flat=True)
+    )
+    FeedEntry.objects.filter(id__in=stale).delete()
+
+
+def rebuild(reader_ids):
+    """
+    Recompute timelines from scratch for the given readers.
+
+    Args:
+        reader_ids (Iterable[int]): Readers to rebuild.
+
+    Returns:
+        int: Number of readers rebuilt.
+    """
+    rebuilt = 0
+    for reader_id in reader_ids:
+        publisher_ids = PublisherSubscription.objects.filter(
+            customuser_id=reader_id
+        ).values_list('publisher_id', flat=True)
+        journalist_ids = JournalistFollow.objects.filter(
+            from_customuser_id=reader_id
+        ).values_list('to_customuser_id', flat=True)
+        with transaction.atomic():
+            FeedEntry.objects.filter(reader_id=reader_id).delete()
+            backfill(reader_id, list(publisher_ids), list(journalist_ids))
+        rebuilt += 1
+    return rebuilt
+
+
+def reader_entries(reader):
+    """
+    Return a reader's timeline entries with their articles joined in.
+
+    Args:
+        reader (CustomUser): The reader.
+
+    Returns:
+        QuerySet: ``FeedEntry`` rows, newest first, with the article bodies
+        deferred.
+    """
+    return (
+        FeedEntry.objects.filter(reader=reader)
+        .select_related('article__publisher', 'article__journalist')
+        .defer('article__content')
+        .order_by('-created_at', '-article_id')
+    )
+
+
+def reader_feed(reader, limit=None):
+    """
+    Return the newest articles in a reader's timeline.
+
+    Args:
+        reader (CustomUser): The reader.
+        limit (int, optional): Maximum number of articles to return.
+
+    Returns:
+        list[Article]: Articles, newest first, with publisher and
+        journalist already joined.
+    """
+    entries = reader_entries(reader)[:limit or FEED_MAX_LENGTH]
+    return [entry.article for entry in entries]
@@ -6,21 +6,34 @@ and authentication.
 """
 
 
-from django.urls import path
+from django.urls import include, path
 from django.contrib.auth.views import LogoutView
 from . import views
 from news_app.views import CustomLogoutView
+from rest_framework.routers import DefaultRouter
+from . import api, feeds
+
+router = DefaultRouter()
+router.register('articles', api.ArticleViewSet, basename='article')
+router.register('publishers', api.PublisherViewSet, basename='publisher')
+router.register('journalists', api.JournalistViewSet, basename='journalist')
 
 urlpatterns = [
     # Redirect to role-specific dashboard   
     path('', views.redirect_dashboard, name='redirect_dashboard'),
 
+    # Articles
+    path('articles/<int:article_id>/', views.article_detail, name='article_detail'),
+
     # Reader URLs
     path('reader/', views.reader_dashboard, name='reader_dashboard'),
+    path('reader/search/', views.search_articles, name='search_articles'),
+    path('reader/events/', views.reader_events, name='reader_events'),
     path('reader/subscribe/<int:publisher_id>/', views.subscribe_publisher, name='subscribe_publisher'),
     path('reader/unsubscribe/<int:publisher_id>/', views.unsubscribe_publisher, name='unsubscribe_publisher'),
     path('reader/follow/<int:journalist_id>/', views.follow_journalist, name='follow_journalist'),
     path('reader/unfollow/<int:journalist_id>/', views.unfollow_journalist, name='unfollow_journalist'),
+    path('reader/notifications/', views.set_notification_frequency, name='set_notification_frequency'),
 
     # Journalist URLs
     path('journalist/', views.journalist_dashboard, name='journalist_dashboard'),
@@ -29,6 +42,20 @@ urlpatterns = [
     # Editor URLs
     path('editor/', views.editor_dashboard, name='editor_dashboard'),
     path('editor/approve/<int:article_id>/', views.approve_article, name='approve_article'),
+    path('editor/approve/', views.approve_selected_articles, name='approve_selected_articles'),
+    path('editor/reject/', views.reject_selected_articles, name='reject_selected_articles'),
+    path('editor/claim/', views.claim_articles, name='claim_articles'),
+    path('editor/release/', views.release_articles, name='release_articles'),
+
+    # Feeds and exports
+    path('feeds/publishers/<int:pk>/rss/', feeds.publisher_rss, name='publisher_rss'),
+    path('feeds/publishers/<int:pk>/atom/', feeds.publisher_atom, name='publisher_atom'),
+    path('feeds/journalists/<int:pk>/rss/', feeds.journalist_rss, name='journalist_rss'),
+    path('feeds/journalists/<int:pk>/atom/', feeds.journalist_atom, name='journalist_atom'),
+    path('export/articles/', views.export_articles, name='export_articles'),
+
+    # REST API
+    path('api/', include(router.urls)),
 
     # Auth URLs
     path('login/', views.CustomLoginView.as_view(), name='login'),
@@ -1,10 +1,25 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import logging
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.views import LoginView, LogoutView
 from django.urls import reverse
+from django.utils import timezone
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
 
-from .models import Article, CustomUser, Publisher
+from .models import NOTIFICATION_CHOICES, Article, CustomUser, Publisher
 from .forms import ArticleForm
+from . import (
+    backends, conditional, exports, moderation, outbox, push, readership, recommendations, search,
+    subscriptions, timeline,
+)
+from .pagination import apaginate
+
+
+logger = logging.getLogger(__name__)
 
 
 def is_reader(user):
@@ -17,42 +32,135 @@ def is_editor(user):
     return user.role == 'editor'
 
 
+# Templates may still touch lazy relations and the session user, so async
+# views render in a worker thread once their queries are done.
+arender = sync_to_async(render)
+
+
 @login_required
 @user_passes_test(is_reader)
-def reader_dashboard(request):
+@conditional.conditional_page(conditional.reader_stamps)
+async def reader_dashboard(request):
     """
     Display the dashboard for readers, showing articles from
     subscribed publishers and journalists.
 
+    Articles are read from the reader's materialized timeline (see
+    ``news_app.timeline``) rather than joined from the subscriptions, one
+    keyset page at a time. Besides the reader's own subscriptions, only a
+    bounded list of suggested sources is shown (see
+    ``news_app.recommendations``).
+
     Args:
         request (HttpRequest): The HTTP request object.
 
     Returns:
         HttpResponse: Rendered dashboard template with articles.
     """
-    from django.db.models import Q
-    subscribed_publishers = request.user.subscribed_publishers.all()
-    subscribed_journalists = request.user.subscribed_journalists.all()
+    user = await request.auser()
+    page = await apaginate(
+        timeline.reader_entries(user), request, keys=('created_at', 'article_id')
+    )
+    articles = [entry.article for entry in page]
+
+    # Subscription checks in the template use cached ID sets, not queries.
+    state = await subscriptions.aget_state(user)
+
+    publishers = [publisher async for publisher in Publisher.objects.filter(pk__in=state.publisher_ids)]
+    journalists = [
+        journalist async for journalist in CustomUser.objects.filter(pk__in=state.journalist_ids)
+    ]
+    suggested_publishers, suggested_journalists = await recommendations.asuggested(user, state)
+
+    return await arender(request, 'news_app/reader_dashboard.html', {
+        'articles': articles,
+        'page': page,
+        'publishers': publishers,
+        'journalists': journalists,
+        'suggested_publishers': suggested_publishers,
+        'suggested_journalists': suggested_journalists,
+        'subscribed_publisher_ids': state.publisher_ids,
+        'followed_journalist_ids': state.journalist_ids,
+        'notification_choices': NOTIFICATION_CHOICES,
+    })
 
-    articles = Article.objects.filter(
-        is_approved=True
-    ).filter(
-        Q(publisher__in=subscribed_publishers) | Q(journalist__in=subscribed_journalists)
-    ).order_by('-created_at')
 
-    all_publishers = Publisher.objects.all()
-    all_journalists = CustomUser.objects.filter(role='journalist')
+@login_required
+@user_passes_test(is_reader)
+async def reader_events(request):
+    """
+    Stream newly approved articles from the reader's subscriptions as
+    Server-Sent Events.
 
-    return render(request, 'news_app/reader_dashboard.html', {
-        'articles': articles,
-        'publishers': all_publishers,
-        'journalists': all_journalists
+    Only served over ASGI, where an idle stream costs no thread; elsewhere
+    the response is 204, which tells ``EventSource`` not to reconnect.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        StreamingHttpResponse: The ``text/event-stream`` response.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(push.stream(await request.auser()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop proxies such as nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+@user_passes_test(is_reader)
+def search_articles(request):
+    """
+    Full-text search over approved articles, best match first.
+
+    Args:
+        request (HttpRequest): Request carrying ``q`` and an optional ``page``.
+
+    Returns:
+        HttpResponse: Rendered search results template.
+    """
+    query = request.GET.get('q', '').strip()
+    page_number = request.GET.get('page', '1')
+    page = search.search(query, page_number if page_number.isdigit() else 1)
+    return render(request, 'news_app/search.html', {
+        'query': query,
+        'articles': page.items,
+        'page': page,
+    })
+
+
+@login_required
+def article_detail(request, article_id):
+    """
+    Show an approved article next to its publisher's trending articles.
+
+    The view is counted in the ``readership`` buffer rather than written
+    to the database on every request.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        article_id (int): ID of the article.
+
+    Returns:
+        HttpResponse: Rendered article template.
+    """
+    article = get_object_or_404(
+        Article.objects.select_related('publisher', 'journalist'), id=article_id, is_approved=True
+    )
+    readership.record(article)
+    trending = [other for other in readership.trending(article.publisher_id) if other.id != article.id]
+    return render(request, 'news_app/article_detail.html', {
+        'article': article,
+        'trending': trending[:5],
     })
 
 
 @login_required
 @user_passes_test(is_reader)
-def subscribe_publisher(request, publisher_id):
+async def subscribe_publisher(request, publisher_id):
     """
     Subscribe the logged-in reader to a publisher.
 
@@ -63,14 +171,15 @@ def subscribe_publisher(request, publisher_id):
     Returns:
         HttpResponseRedirect: Redirects to reader dashboard.
     """
-    publisher = get_object_or_404(Publisher, id=publisher_id)
-    request.user.subscribed_publishers.add(publisher)
+    publisher = await aget_object_or_404(Publisher, id=publisher_id)
+    user = await request.auser()
+    await user.subscribed_publishers.aadd(publisher)
     return redirect('reader_dashboard')
 
 
 @login_required
 @user_passes_test(is_reader)
-def unsubscribe_publisher(request, publisher_id):
+async def unsubscribe_publisher(request, publisher_id):
     """
     Unsubscribe the logged-in reader from a publisher.
 
@@ -81,13 +190,14 @@ def unsubscribe_publisher(request, publisher_id):
     Returns:
         HttpResponseRedirect: Redirects to reader dashboard.
     """
-    publisher = get_object_or_404(Publisher, id=publisher_id)
-    request.user.subscribed_publishers.remove(publisher)
+    publisher = await aget_object_or_404(Publisher, id=publisher_id)
+    user = await request.auser()
+    await user.subscribed_publishers.aremove(publisher)
     return redirect('reader_dashboard')
 
 @login_required
 @user_passes_test(is_reader)
-def follow_journalist(request, journalist_id):
+async def follow_journalist(request, journalist_id):
     """
     Follow a journalist as a reader.
 
@@ -98,13 +208,14 @@ def follow_journalist(request, journalist_id):
     Returns:
         HttpResponseRedirect: Redirects to reader dashboard.
     """
-    journalist = get_object_or_404(CustomUser, id=journalist_id, role='journalist')
-    request.user.subscribed_journalists.add(journalist)
+    journalist = await aget_object_or_404(CustomUser, id=journalist_id, role='journalist')
+    user = await request.auser()
+    await user.subscribed_journalists.aadd(journalist)
     return redirect('reader_dashboard')
 
 @login_required
 @user_passes_test(is_reader)
-def unfollow_journalist(request, journalist_id):
+async def unfollow_journalist(request, journalist_id):
     """
     Unfollow a journalist as a reader.
 
@@ -115,14 +226,43 @@ def unfollow_journalist(request, journalist_id):
     Returns:
         HttpResponseRedirect: Redirects to reader dashboard.
     """
-    journalist = get_object_or_404(CustomUser, id=journalist_id, role='journalist')
-    request.user.subscribed_journalists.remove(journalist)
+    journalist = await aget_object_or_404(CustomUser, id=journalist_id, role='journalist')
+    user = await request.auser()
+    await user.subscribed_journalists.aremove(journalist)
+    return redirect('reader_dashboard')
+
+
+@login_required
+@user_passes_test(is_reader)
+@require_POST
+async def set_notification_frequency(request):
+    """
+    Choose between one email per article and an hourly or daily digest.
+
+    Args:
+        request (HttpRequest): POST request carrying ``frequency``.
+
+    Returns:
+        HttpResponseRedirect: Redirects to reader dashboard.
+    """
+    frequency = request.POST.get('frequency')
+    if frequency not in dict(NOTIFICATION_CHOICES):
+        return HttpResponse(status=400)
+    user = await request.auser()
+    if frequency != user.notification_frequency:
+        # Start the first digest now rather than with articles already emailed.
+        await CustomUser.objects.filter(pk=user.pk).aupdate(
+            notification_frequency=frequency, digest_sent_until=timezone.now(),
+        )
+        await sync_to_async(backends.forget)([user.pk])
+        await sync_to_async(conditional.touch)([f'reader:{user.pk}'])
     return redirect('reader_dashboard')
 
 
 @login_required
 @user_passes_test(is_journalist)
-def journalist_dashboard(request):
+@conditional.conditional_page(conditional.journalist_stamps)
+async def journalist_dashboard(request):
     """
     Display articles authored by the logged-in journalist.
 
@@ -132,8 +272,12 @@ def journalist_dashboard(request):
     Returns:
         HttpResponse: Rendered dashboard template with articles.
     """
-    articles = Article.objects.filter(journalist=request.user).order_by('-created_at')
-    return render(request, 'news_app/journalist_dashboard.html', {'articles': articles})
+    user = await request.auser()
+    page = await apaginate(Article.objects.filter(journalist=user).defer('content'), request)
+    return await arender(request, 'news_app/journalist_dashboard.html', {
+        'articles': page.items,
+        'page': page,
+    })
 
 
 @login_required
@@ -162,9 +306,10 @@ def create_article(request):
 
 @login_required
 @user_passes_test(is_editor)
-def editor_dashboard(request):
+@conditional.conditional_page(conditional.editor_stamps)
+async def editor_dashboard(request):
     """
-    Display unapproved articles for editors to review.
+    Display the editor's claimed review batch and an overview of the queue.
 
     Args:
         request (HttpRequest): The HTTP request object.
@@ -172,13 +317,70 @@ def editor_dashboard(request):
     Returns:
         HttpResponse: Rendered editor dashboard template.
     """
-    articles = Article.objects.filter(is_approved=False).order_by('-created_at')
-    return render(request, 'news_app/editor_dashboard.html', {'articles': articles})
+    batch = [
+        article async for article in moderation.held_by(request.user).select_related('journalist').defer('content')
+    ]
+    # The overview only lists titles, so the article bodies are not loaded.
+    page = await apaginate(
+        moderation.pending().select_related('journalist').defer('content'), request
+    )
+    return await arender(request, 'news_app/editor_dashboard.html', {
+        'batch': batch,
+        'pending_count': await sync_to_async(moderation.pending_count)(),
+        'articles': page.items,
+        'page': page,
+    })
 
 
 @login_required
 @user_passes_test(is_editor)
-def approve_article(request, article_id):
+@require_POST
+async def claim_articles(request):
+    """
+    Claim the next batch of pending articles for the editor.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponseRedirect: Redirects to editor dashboard.
+    """
+    await sync_to_async(moderation.claim)(request.user)
+    return redirect('editor_dashboard')
+
+
+@login_required
+@user_passes_test(is_editor)
+@require_POST
+async def release_articles(request):
+    """
+    Hand the editor's claimed batch back to the queue.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponseRedirect: Redirects to editor dashboard.
+    """
+    await sync_to_async(moderation.release)(request.user)
+    return redirect('editor_dashboard')
+
+
+def notify(request, article_ids):
+    """
+    Start the timeline fan-out and approval emails in the background when
+    served over ASGI.
+
+    Under WSGI the event loop of an async view ends with the request, so the
+    ``send_outbox`` worker delivers the queued rows instead.
+    """
+    if isinstance(request, ASGIRequest):
+        outbox.dispatch(article_ids)
+
+
+@login_required
+@user_passes_test(is_editor)
+async def approve_article(request, article_id):
     """
     Approve an article as an editor.
 
@@ -189,12 +391,74 @@ def approve_article(request, article_id):
     Returns:
         HttpResponseRedirect: Redirects to editor dashboard.
     """
-    article = get_object_or_404(Article, id=article_id)
-    article.is_approved = True
-    article.save()
+    # Notifications and timeline fan-out are queued in the same transaction
+    # by the bulk approval service.
+    article = await aget_object_or_404(Article, id=article_id)
+    if await sync_to_async(moderation.decide)(request.user, [article.id]):
+        notify(request, [article.id])
     return redirect('editor_dashboard')
 
 
+@login_required
+@user_passes_test(is_editor)
+@require_POST
+async def approve_selected_articles(request):
+    """
+    Approve every article ticked on the editor dashboard in one request.
+
+    Args:
+        request (HttpRequest): POST request carrying ``article_ids``.
+
+    Returns:
+        HttpResponseRedirect: Redirects to editor dashboard.
+    """
+    article_ids = [int(pk) for pk in request.POST.getlist('article_ids') if pk.isdigit()]
+    if await sync_to_async(moderation.decide)(request.user, article_ids):
+        notify(request, article_ids)
+    return redirect('editor_dashboard')
+
+
+@login_required
+@user_passes_test(is_editor)
+@require_POST
+async def reject_selected_articles(request):
+    """
+    Reject every article ticked on the editor dashboard in one request.
+
+    Args:
+        request (HttpRequest): POST request carrying ``article_ids``.
+
+    Returns:
+        HttpResponseRedirect: Redirects to editor dashboard.
+    """
+    article_ids = [int(pk) for pk in request.POST.getlist('article_ids') if pk.isdigit()]
+    await sync_to_async(moderation.decide)(request.user, article_ids, approve=False)
+    return redirect('editor_dashboard')
+
+
+@login_required
+@user_passes_test(is_editor)
+@require_GET
+async def export_articles(request):
+    """
+    Stream every approved article as NDJSON (default) or CSV to editors.
+
+    Args:
+        request (HttpRequest): GET request; ``?format=csv`` selects CSV.
+
+    Returns:
+        StreamingHttpResponse: The export, produced chunk by chunk.
+    """
+    fmt = request.GET.get('format', 'ndjson')
+    if fmt not in exports.FORMATS:
+        raise Http404("Unknown export format.")
+    # WSGI consumes async iterators whole, so it gets the sync generator.
+    export = exports.aexport if isinstance(request, ASGIRequest) else exports.export
+    response = StreamingHttpResponse(export(fmt), content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="articles.{fmt}"'
+    return response
+
+
 @login_required
 def redirect_dashboard(request):
     """
@@ -225,8 +489,7 @@ class CustomLoginView(LoginView):
     def get_success_url(self):
         """Redirect users to their role-specific dashboard after login"""
         role = getattr(self.request.user, 'role', None)
-        # Debug log for development
-        print(f"DEBUG: Logged in as {self.request.user.username}, role={role}") 
+        logger.debug("Logged in as %s, role=%s", self.request.user.username, role)
 
         if role == 'reader':
             return reverse('reader_dashboard')
@@ -21,6 +21,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "news_app.middleware.QueryInstrumentationMiddleware",
+    "news_app.routers.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -53,15 +55,38 @@ WSGI_APPLICATION = "news_project.wsgi.application"
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': os.environ.get('DJANGO_DB_ENGINE', 'django.db.backends.mysql'),
         'NAME': os.environ.get('DJANGO_DB_NAME', 'newsdb'),
         'USER': os.environ.get('DJANGO_DB_USER', 'newsuser'),
         'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', 'newspass'),
         'HOST': os.environ.get('DJANGO_DB_HOST', 'db'),
-        'PORT': '3306'
+        'PORT': '3306',
+        # Persistent connections belong to a thread. Under ASGI (the Docker
+        # image) sync_to_async runs queries on a pool of threads, each keeping
+        # its own connection for the whole age, and MySQL's max_connections is
+        # soon exhausted. Connections are therefore closed after every request
+        # by default. Set DJANGO_DB_CONN_MAX_AGE (e.g. 60) when serving WSGI, or
+        # under ASGI behind a connection pooler such as ProxySQL. Reused
+        # connections are checked first.
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DJANGO_DB_CONN_HEALTH_CHECKS', '1') == '1',
     }
 }
 
+# Comma-separated read replicas: hosts for MySQL, file names for SQLite.
+# They are added as ``replica1``, ``replica2``... and mirror ``default`` in tests.
+for index, location in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')), start=1):
+    replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    replica['NAME' if 'sqlite' in replica['ENGINE'] else 'HOST'] = location.strip()
+    DATABASES[f'replica{index}'] = replica
+
+DATABASE_ROUTERS = ['news_app.routers.ReplicaRouter']
+
+# Aliases safe GET requests may read from, and how long a client that has
+# just written keeps reading from the primary.
+NEWS_DB_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+NEWS_DB_PIN_SECONDS = int(os.environ.get('DJANGO_DB_PIN_SECONDS', 15))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -79,4 +104,105 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+AUTH_USER_MODEL = "news_app.CustomUser"
+
+# Session users are served from the cache (news_app.backends). ModelBackend
+# stays listed so sessions created before the switch remain valid.
+AUTHENTICATION_BACKENDS = [
+    "news_app.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+SESSION_ENGINE = os.environ.get(
+    "DJANGO_SESSION_ENGINE", "django.contrib.sessions.backends.cached_db"
+)
+
 
+
+# Shared cache for subscription state and other per-user data. Use a
+# cross-process backend (Redis/Memcached) in production so invalidations
+# reach every worker.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", ""),
+    }
+}
+
+
+# --- News app ---
+# Maximum number of articles kept in each reader's materialized timeline.
+NEWS_FEED_MAX_LENGTH = int(os.environ.get('NEWS_FEED_MAX_LENGTH', 500))
+
+# Per-request query/latency instrumentation (Server-Timing header and a JSON
+# log line on the "news_app.metrics" logger). Off by default: it exposes
+# timings to clients and counts every query; set NEWS_INSTRUMENTATION=1 in
+# development. The benchmarks turn it on for themselves.
+NEWS_INSTRUMENTATION = os.environ.get('NEWS_INSTRUMENTATION', '0') == '1'
+# Maximum SQL queries per view, keyed by URL name. Exceeding a budget logs a
+# warning, or raises QueryBudgetExceeded when NEWS_QUERY_BUDGET_STRICT is on.
+NEWS_QUERY_BUDGETS = {
+    'reader_dashboard': 10,
+    'journalist_dashboard': 6,
+    'editor_dashboard': 7,
+    'admin:news_app_article_changelist': 12,
+    'admin:news_app_publisher_changelist': 12,
+    'admin:news_app_customuser_changelist': 12,
+    'admin:news_app_article_change': 12,
+    'admin:news_app_customuser_change': 12,
+    'article_detail': 4,
+}
+NEWS_QUERY_BUDGET_STRICT = os.environ.get('NEWS_QUERY_BUDGET_STRICT', '0') == '1'
+
+# Server-Sent Events push of approvals: broker class, seconds between the
+# DatabaseBroker's polls and seconds between keepalive comments. The default
+# DatabaseBroker reaches every worker; LocalBroker only reaches connections in
+# the same process and suits a single-process server.
+NEWS_PUSH_BROKER = os.environ.get('NEWS_PUSH_BROKER', 'news_app.push.DatabaseBroker')
+NEWS_PUSH_POLL_INTERVAL = float(os.environ.get('NEWS_PUSH_POLL_INTERVAL', 1))
+NEWS_PUSH_KEEPALIVE = int(os.environ.get('NEWS_PUSH_KEEPALIVE', 15))
+
+# Seconds a cached session user is kept, and the minimum age of last_login
+# before a sign-in rewrites it.
+NEWS_USER_CACHE_TIMEOUT = int(os.environ.get('NEWS_USER_CACHE_TIMEOUT', 15 * 60))
+NEWS_LAST_LOGIN_INTERVAL = int(os.environ.get('NEWS_LAST_LOGIN_INTERVAL', 60 * 60))
+
+# Editor moderation queue: articles per claimed batch and seconds a claim lasts
+# before another editor may take the articles over.
+NEWS_MODERATION_BATCH = int(os.environ.get('NEWS_MODERATION_BATCH', 20))
+NEWS_MODERATION_LEASE = int(os.environ.get('NEWS_MODERATION_LEASE', 15 * 60))
+
+# Article views are buffered in each process and written at most this many
+# seconds apart; trending scores halve every NEWS_TRENDING_HALF_LIFE seconds
+# and the trending lists hold NEWS_TRENDING_SIZE articles. A flush recomputes
+# at most NEWS_TRENDING_REFRESH_LIMIT publisher lists; the refresh_trending
+# command recomputes the rest.
+NEWS_VIEW_FLUSH_INTERVAL = int(os.environ.get('NEWS_VIEW_FLUSH_INTERVAL', 30))
+NEWS_TRENDING_HALF_LIFE = int(os.environ.get('NEWS_TRENDING_HALF_LIFE', 6 * 60 * 60))
+NEWS_TRENDING_SIZE = int(os.environ.get('NEWS_TRENDING_SIZE', 20))
+NEWS_TRENDING_REFRESH_LIMIT = int(os.environ.get('NEWS_TRENDING_REFRESH_LIMIT', 20))
+
+# Reader suggestions: readers loaded per chunk by build_suggestions, and
+# publishers and journalists suggested to each reader.
+NEWS_SUGGESTION_CHUNK = int(os.environ.get('NEWS_SUGGESTION_CHUNK', 1000))
+NEWS_SUGGESTIONS = int(os.environ.get('NEWS_SUGGESTIONS', 5))
+
+# Estimated shingle similarity at which a submitted or imported article is
+# treated as a near-duplicate of an existing one.
+NEWS_DUPLICATE_THRESHOLD = float(os.environ.get('NEWS_DUPLICATE_THRESHOLD', 0.8))
+
+# Admin changelists report the table-statistics row estimate instead of an
+# exact COUNT(*) for unfiltered tables at least this large.
+NEWS_ADMIN_ESTIMATE_THRESHOLD = int(os.environ.get('NEWS_ADMIN_ESTIMATE_THRESHOLD', 10000))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "news_app.metrics": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
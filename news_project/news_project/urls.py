@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.urls import path, include
 from news_app import views
 
@@ -6,4 +7,7 @@ urlpatterns = [
     path('', views.redirect_dashboard, name='redirect_dashboard'),  # optional
     path('', include('news_app.urls')),
     path('admin/', admin.site.urls),
-]
\ No newline at end of file
+]
+
+# Serve static files in DEBUG under servers other than runserver (e.g. uvicorn).
+urlpatterns += staticfiles_urlpatterns()
\ No newline at end of file